@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Analyze many repositories (a list or a whole org) through a running server's /analyze/batch
+
+Results are written as NDJSON, one line per repository. With --output, an
+interrupted run is resumed by running the same command again: the batch id is
+read back from the file and only repositories without a result are analyzed.
+"""
+import argparse
+import json
+import os
+import sys
+
+import requests
+
+
+def read_output(path: str) -> tuple:
+    """(batch id, repositories already written) from an earlier run's output file"""
+    batch_id, written = None, set()
+    if not os.path.exists(path):
+        return batch_id, written
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Last line of a run that was killed mid-write
+                continue
+            if record.get('type') == 'batch':
+                batch_id = record['id']
+            elif record.get('type') == 'result':
+                written.add(record['repo'])
+    return batch_id, written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('repos', nargs='*', help='GitHub URLs or owner/repo names')
+    parser.add_argument('--org', help='analyze every public repository of this org or user')
+    parser.add_argument('--file', help='file with one repository per line')
+    parser.add_argument('--server', default=os.environ.get('REPO_READER_URL', 'http://127.0.0.1:5000'))
+    parser.add_argument('--ref', help='branch, tag or SHA to analyze in every repository')
+    parser.add_argument('--scope', choices=('sample', 'repository'))
+    parser.add_argument('--backend', choices=('github', 'git'), help='read files through the API or local git clones')
+    parser.add_argument('--no-incremental', action='store_true', help='always analyze from scratch')
+    parser.add_argument('--include-forks', action='store_true')
+    parser.add_argument('--include-archived', action='store_true')
+    parser.add_argument('--output', help='NDJSON file to write (and resume from); default stdout')
+    parser.add_argument('--resume', metavar='BATCH_ID', help='continue an earlier batch')
+    args = parser.parse_args()
+
+    repos = list(args.repos)
+    if args.file:
+        with open(args.file) as f:
+            repos.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+
+    batch_id, written = read_output(args.output) if args.output else (None, set())
+    batch_id = args.resume or batch_id
+    if batch_id:
+        body = {'batch_id': batch_id}
+        print(f"⏯️  Resuming batch {batch_id} ({len(written)} results already written)", file=sys.stderr)
+    elif repos or args.org:
+        body = {'repos': repos, 'org': args.org, 'ref': args.ref, 'scope': args.scope,
+                'backend': args.backend, 'include_forks': args.include_forks, 'include_archived': args.include_archived}
+        if args.no_incremental:
+            body['incremental'] = False
+    else:
+        parser.error('give repositories, --file or --org (or --resume)')
+
+    out = open(args.output, 'a') if args.output else sys.stdout
+    try:
+        with requests.post(f"{args.server.rstrip('/')}/analyze/batch", json=body, stream=True,
+                           timeout=(10, None)) as response:
+            if response.status_code != 200:
+                print(f"❌ {response.json().get('error', response.status_code)}", file=sys.stderr)
+                return 1
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                record = json.loads(line)
+                if record['type'] == 'batch':
+                    batch_id = record['id']
+                    print(f"📦 Batch {batch_id}: {record['pending']} of {record['total']} repositories to analyze",
+                          file=sys.stderr)
+                    if written:
+                        continue
+                elif record['type'] == 'result':
+                    if record['repo'] in written:
+                        continue
+                    mark = '✅' if record['status_code'] == 200 else '❌'
+                    print(f"{mark} {record['repo']}", file=sys.stderr)
+                else:
+                    stopped = f", stopped: {record['stopped']}" if record['stopped'] else ''
+                    print(f"🏁 {record['done']} done, {record['failed']} failed, {record['pending']} pending "
+                          f"in {record['elapsed_s']}s{stopped}", file=sys.stderr)
+                out.write(json.dumps(record) + '\n')
+                out.flush()
+    except requests.RequestException as e:
+        resume = "run the same command again" if args.output else f"use --resume {batch_id}"
+        print(f"❌ Connection to the server failed: {e}\n   To continue, {resume}", file=sys.stderr)
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,31 +1,73 @@
 
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, request, jsonify
 import os
+import json
+import queue
+import threading
 from dotenv import load_dotenv
 from github_fetcher import GitHubFetcher
+from local_git_fetcher import LocalGitFetcher
 from summarizer import CodeSummarizer
 from writer import ReportWriter
-import tempfile
+from pipeline import AnalysisPipeline
+from jobs import JobQueue
+from batch import BatchRunner
+import time
 import zipfile
 from datetime import datetime
 from utils.token_tracker import token_tracker
+from utils.summary_cache import summary_cache
+from utils.token_counter import token_counter
+from utils.analysis_store import analysis_store
+from utils.metrics import metrics, STAGE_SECONDS
+from utils.rate_limiter import RateLimitExceeded
 from utils.token_validator_quiet import QuietTokenValidator
 
 # Load environment variables
 load_dotenv()
 
-# Quick silent token validation
+# Token validation runs in the background so startup never waits on the network;
+# /health reports the cached result
 print("🚀 Starting GitHub Repo Reader...")
 token_validator = QuietTokenValidator()
-token_validator.print_simple_status()
+token_validator.refresh_in_background(announce=True)
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY') or 'dev-key-change-in-production'
 
 # Initialize components
 github_fetcher = GitHubFetcher()
+# Shallow local mirrors; repository metadata still comes from the REST API
+local_git_fetcher = LocalGitFetcher(metadata=github_fetcher)
 code_summarizer = CodeSummarizer()
 report_writer = ReportWriter()
+analysis_pipeline = AnalysisPipeline(github_fetcher, code_summarizer)
+
+# 'tree' lists the whole repository through the Git Trees API, 'contents' only the root
+LISTING_MODE = os.environ.get('GITHUB_LISTING_MODE', 'tree')
+MAX_ANALYZED_FILES = int(os.environ.get('MAX_ANALYZED_FILES', 10))
+# Above this many candidate code files, contents come from the repository tarball instead
+BULK_DOWNLOAD_THRESHOLD = int(os.environ.get('BULK_DOWNLOAD_THRESHOLD', 20))
+# 'sample' summarizes the MAX_ANALYZED_FILES highest-ranked files; 'repository'
+# covers every file, with model summaries for the top ones within the budgets below
+ANALYSIS_SCOPES = ('sample', 'repository')
+ANALYSIS_SCOPE = os.environ.get('ANALYSIS_SCOPE', 'sample')
+REPO_MAX_FILES = int(os.environ.get('REPO_MAX_FILES', 5000))
+REPO_SUMMARY_FILES = int(os.environ.get('REPO_SUMMARY_FILES', 25))
+REPO_TOKEN_BUDGET = int(os.environ.get('REPO_TOKEN_BUDGET', 50000))
+REPO_TIME_BUDGET = float(os.environ.get('REPO_TIME_BUDGET', 60))
+# Timed stages of run_analysis, reported as analysis_stage_seconds on /metrics
+ANALYSIS_STAGES = ('repo_info', 'diff', 'listing', 'files', 'commits', 'contributors', 'rate_limit', 'total')
+# 'github' reads files through the REST API, 'git' from local shallow mirrors
+FETCH_BACKENDS = {'github': github_fetcher, 'git': local_git_fetcher}
+FETCH_BACKEND = os.environ.get('FETCH_BACKEND', 'github')
+# Re-analyses update the last stored result from the commit diff unless disabled
+INCREMENTAL_ANALYSIS = os.environ.get('INCREMENTAL_ANALYSIS', 'true').lower() not in ('false', '0', 'no')
+RATE_LIMIT_ERROR = 'GitHub API rate limit exceeded. Please try again later or add a GitHub token for higher limits.'
+
+def elapsed_ms(start: float) -> float:
+    """Milliseconds since a time.perf_counter() reading"""
+    return round((time.perf_counter() - start) * 1000, 1)
 
 def parse_github_url(github_url: str) -> tuple:
     """Parse GitHub URL to extract owner and repo"""
@@ -63,199 +105,575 @@ def parse_github_url(github_url: str) -> tuple:
 def index():
     return render_template('index.html')
 
+def parse_analyze_request(data: dict) -> tuple:
+    """Validate an /analyze style JSON body, returning (owner, repo, ref, options)"""
+    github_url = (data or {}).get('github_url')
+    if not github_url:
+        raise ValueError('GitHub URL is required')
+    owner, repo = parse_github_url(github_url)
+    return owner, repo, data.get('ref') or None, parse_analysis_options(data)
+
+def parse_analysis_options(data: dict) -> dict:
+    """Validated run_analysis options (scope, incremental, backend) from a request body or query"""
+    scope = data.get('scope') or ANALYSIS_SCOPE
+    if scope not in ANALYSIS_SCOPES:
+        raise ValueError(f"Unknown scope \"{scope}\"; expected one of: {', '.join(ANALYSIS_SCOPES)}")
+    backend = data.get('backend') or FETCH_BACKEND
+    if backend not in FETCH_BACKENDS:
+        raise ValueError(f"Unknown backend \"{backend}\"; expected one of: {', '.join(FETCH_BACKENDS)}")
+    incremental = str(data.get('incremental', INCREMENTAL_ANALYSIS)).lower() not in ('false', '0', 'no')
+    return {'scope': scope, 'incremental': incremental, 'backend': backend}
+
+def analyze_changed_files(owner: str, repo: str, ref: str, scope: str, previous: dict, diff: dict, report,
+                          fetcher=None) -> tuple:
+    """Update a stored analysis from a diff, returning (results, usage, timings, coverage) like a full run.
+
+    Changed files are re-analyzed the way they were before (model or rule-based
+    summary); added files take free summary slots of the scope, and removed
+    files are dropped. Everything else is carried forward unchanged.
+    """
+    prev_result = previous['result']
+    changes = diff['files'] if diff else []
+    removed = {change['previous_path'] for change in changes if change['previous_path']}
+    removed |= {change['path'] for change in changes if change['status'] == 'removed'}
+    changed = [change for change in changes
+               if change['status'] != 'removed' and code_summarizer.is_code_file(change['name'])]
+
+    entries = [entry for entry in prev_result['file_analysis'] if entry['path'] not in removed]
+    position_by_path = {entry['path']: position for position, entry in enumerate(entries)}
+    coverage = dict(prev_result['coverage'])
+    skipped = [item for item in coverage['skipped'] if item['path'] not in removed]
+    summary_limit = REPO_SUMMARY_FILES if scope == 'repository' else MAX_ANALYZED_FILES
+    # Entries with a reason were given a rule-based summary on purpose
+    summarized = sum(1 for entry in entries if not entry.get('reason'))
+
+    files, targets, rule_based = [], [], {}
+    for change in changed:
+        position = position_by_path.get(change['path'])
+        if position is None:
+            if scope == 'sample' and len(entries) >= MAX_ANALYZED_FILES:
+                if not any(item['path'] == change['path'] for item in skipped):
+                    skipped.append({'path': change['path'], 'reason': 'summarize_limit'})
+                continue
+            entries.append(None)
+            position = len(entries) - 1
+            if summarized >= summary_limit:
+                rule_based[len(files)] = 'summarize_limit'
+            else:
+                summarized += 1
+        elif entries[position].get('reason'):
+            rule_based[len(files)] = entries[position]['reason']
+        files.append({'name': change['name'], 'path': change['path'], 'type': 'file', 'size': 0, 'sha': change['sha']})
+        targets.append(position)
+
+    def merge(index: int, entry: dict) -> dict:
+        # Ranking details stay from the run that ranked the file
+        old = entries[targets[index]] or {}
+        return {**{key: old[key] for key in ('rank', 'score', 'signals') if key in old}, **entry}
+
+    report('listing', total_files=len(entries))
+    for position in sorted(set(range(len(entries))) - set(targets)):
+        report('file', index=position, file=entries[position])
+    new_entries, usage, timings = analysis_pipeline.analyze_changes(
+        owner, repo, ref, files, rule_based,
+        on_result=lambda index, entry: report('file', index=targets[index], file=merge(index, entry)),
+        fetcher=fetcher)
+    for index, entry in enumerate(new_entries):
+        entries[targets[index]] = merge(index, entry) if entry else None
+    results = [entry for entry in entries if entry]
+
+    analyzed_paths = {file_info['path'] for file_info in files}
+    coverage['skipped'] = [item for item in skipped if item['path'] not in analyzed_paths]
+    coverage['total_files'] += sum(1 if change['status'] == 'added' else -1 for change in changes
+                                   if change['status'] in ('added', 'removed') and code_summarizer.is_code_file(change['name']))
+    if 'methods' in coverage:
+        coverage['methods'], coverage['reasons'] = {}, {}
+        for entry in results:
+            coverage['methods'][entry['method']] = coverage['methods'].get(entry['method'], 0) + 1
+            if entry.get('reason'):
+                coverage['reasons'][entry['reason']] = coverage['reasons'].get(entry['reason'], 0) + 1
+    coverage['incremental'] = {
+        'base_sha': previous['commit_sha'],
+        'changed_files': len(changes),
+        'reanalyzed_files': len(files),
+        'removed_files': len(removed),
+        'carried_forward': len(results) - sum(1 for entry in new_entries if entry)
+    }
+    timings['fetch_mode'] = 'incremental'
+    return results, usage, timings, coverage
+
+def run_analysis(owner: str, repo: str, ref: str = None, progress=None, scope: str = None,
+                 incremental: bool = True, repo_info: dict = None, backend: str = None) -> tuple:
+    """Run the full repository analysis, returning (response body, HTTP status).
+
+    scope is one of ANALYSIS_SCOPES, defaulting to ANALYSIS_SCOPE. With
+    incremental, a stored analysis of an earlier commit is updated from the
+    diff instead of starting over.
+
+    progress, if given, is called as progress(stage, **details) as each stage
+    of the analysis completes, with that stage's data in details, and as
+    progress('file', index=..., file=...) for each summarized file. File
+    calls come from pipeline worker threads.
+
+    repo_info, in the get_repo_info shape, saves the repository lookup when
+    the caller already has it (batch runs get it from the owner listing).
+    backend is one of FETCH_BACKENDS, defaulting to FETCH_BACKEND; it decides
+    where listings, file contents, commits and diffs are read from.
+
+    When the GitHub rate limit refuses a request the analysis needs, the
+    result is a 429 rather than an analysis with files missing. Commits and
+    contributors are low priority: when those requests are shed, the
+    sections are left empty and named in coverage['shed_sections'].
+    """
+    try:
+        return run_analysis_stages(owner, repo, ref, progress, scope, incremental, repo_info, backend)
+    except RateLimitExceeded:
+        return {'error': RATE_LIMIT_ERROR}, 429
+
+def run_analysis_stages(owner: str, repo: str, ref: str, progress, scope: str, incremental: bool,
+                        repo_info: dict, backend: str) -> tuple:
+    """The stages of run_analysis; RateLimitExceeded from a required request propagates"""
+    fetcher = FETCH_BACKENDS[backend or FETCH_BACKEND]
+    # Local git reads are not GitHub API calls; its repository metadata may still come from the API
+    api_call = 1 if fetcher is github_fetcher else 0
+    metadata_call = 1 if api_call or local_git_fetcher.metadata else 0
+    report = progress or (lambda stage, **details: None)
+    request_start = time.perf_counter()
+
+    # Initialize token usage tracking
+    token_usage = {
+        'github_api_calls': 0,
+        'github_rate_limit_remaining': 0,
+        'github_rate_limit_reset': None,
+        'huggingface_api_calls': 0,
+        'huggingface_tokens_used': 0,
+        'model_input_tokens': 0,
+        'model_output_tokens': 0,
+        'model_cost': 0.0,
+        'total_cost_estimate': 0.0
+    }
+    
+    timings = {}
+
+    # Fetch repository data: one GraphQL round trip covers repo info, the tree
+    # and recent commits when a token is configured, otherwise plain REST
+    start = time.perf_counter()
+    overview = fetcher.get_repo_overview(owner, repo, ref, commit_limit=5)
+    if overview:
+        repo_data = overview['repo_info']
+        tree_ref = overview['tree_oid']
+        token_usage['github_graphql_rate_limit_remaining'] = overview['rate_limit']['remaining']
+    else:
+        repo_data = repo_info or fetcher.get_repo_info(owner, repo)
+        tree_ref = None
+    if overview or not repo_info:
+        token_usage['github_api_calls'] += metadata_call
+    timings['repo_info_ms'] = elapsed_ms(start)
+    
+    if not repo_data:
+        rate_limit_info = github_fetcher.get_rate_limit_info()
+        if rate_limit_info and rate_limit_info['remaining'] == 0:
+            return {'error': RATE_LIMIT_ERROR}, 429
+        else:
+            return {
+                'error': f'Repository "{owner}/{repo}" not found or is private. Please check the URL and ensure the repository is public.'
+            }, 404
+    report('repo_info', repo_info=repo_data)
+    ref = ref or repo_data['default_branch']
+    tree_ref = tree_ref or ref
+    
+    scope = scope or ANALYSIS_SCOPE
+    on_result = lambda index, entry: report('file', index=index, file=entry)
+
+    # With a stored analysis of this repo, ref and scope, unchanged files are
+    # carried forward and only the files changed since then are re-analyzed
+    start = time.perf_counter()
+    store_key = analysis_store.make_key(owner, repo, ref, scope)
+    if overview:
+        head_sha = overview['head_sha']
+    else:
+        head_sha = fetcher.get_commit_sha(owner, repo, ref)
+        token_usage['github_api_calls'] += api_call
+    previous = analysis_store.latest(store_key) if head_sha and incremental else None
+    diff = None
+    if previous and previous['commit_sha'] != head_sha:
+        diff = fetcher.compare_commits(owner, repo, previous['commit_sha'], head_sha)
+        token_usage['github_api_calls'] += api_call
+        # Only a fast-forward comparison lists every change since the stored commit
+        if not diff or not diff['complete'] or diff['status'] not in ('ahead', 'identical'):
+            previous = None
+    timings['diff_ms'] = elapsed_ms(start)
+
+    if previous:
+        analysis_results, files_usage, files_timings, coverage = analyze_changed_files(
+            owner, repo, ref, scope, previous, diff, report, fetcher=fetcher)
+    else:
+        # Get file structure and content
+        start = time.perf_counter()
+        files_data = None
+        if LISTING_MODE == 'tree':
+            # Whole tree in one call (more only if GitHub truncates the listing)
+            files_data = fetcher.get_repo_tree(owner, repo, tree_ref)
+            token_usage['github_api_calls'] += api_call
+        if files_data is None:
+            files_data = fetcher.get_repo_files(owner, repo, ref=ref)
+            token_usage['github_api_calls'] += api_call
+        timings['listing_ms'] = elapsed_ms(start)
+    
+        # Analyze code files: contents are fetched and summarized concurrently
+        code_files = [
+            file_info for file_info in files_data
+            if file_info['type'] == 'file' and code_summarizer.is_code_file(file_info['name'])
+        ]
+        if scope == 'repository':
+            over_limit = code_files[REPO_MAX_FILES:]
+            code_files = code_files[:REPO_MAX_FILES]
+            report('listing', total_files=len(code_files))
+            analysis_results, files_usage, files_timings, coverage = analysis_pipeline.analyze_repository(
+                owner, repo, ref, code_files, readme=analysis_pipeline.ranker.find_readme(files_data),
+                summarize_limit=REPO_SUMMARY_FILES, token_budget=REPO_TOKEN_BUDGET, time_budget=REPO_TIME_BUDGET,
+                on_result=on_result, fetcher=fetcher)
+            coverage['total_files'] += len(over_limit)
+            coverage['skipped'] += [{'path': file_info['path'], 'reason': 'file_limit'} for file_info in over_limit]
+        else:
+            # Without contents, ranking uses path and size signals only
+            ranked = analysis_pipeline.ranker.rank(code_files)
+            coverage = {
+                'mode': 'sample',
+                'total_files': len(code_files),
+                'summarize_limit': MAX_ANALYZED_FILES,
+                'skipped': [{'path': item['file']['path'], 'reason': 'summarize_limit'} for item in ranked[MAX_ANALYZED_FILES:]]
+            }
+            code_files = [item['file'] for item in ranked[:MAX_ANALYZED_FILES]]
+            report('listing', total_files=len(code_files))
+            # Counted over every candidate, not the capped sample, since the
+            # threshold is meant to be larger than MAX_ANALYZED_FILES
+            if len(ranked) > BULK_DOWNLOAD_THRESHOLD:
+                # One streamed tarball is cheaper than a contents call per file
+                analysis_results, files_usage, files_timings = analysis_pipeline.analyze_archive(
+                    owner, repo, ref, code_files, on_result=on_result, fetcher=fetcher)
+            else:
+                analysis_results, files_usage, files_timings = analysis_pipeline.analyze_files(
+                    owner, repo, code_files, ref=ref, on_result=on_result, fetcher=fetcher)
+    if not api_call:
+        # The pipeline counts a request per fetched file or archive
+        files_usage['github_api_calls'] = 0
+    for key, value in files_usage.items():
+        token_usage[key] += value
+    timings.update(files_timings)
+    report('files', analyzed_files=len(analysis_results))
+    
+    # Get commit history (already there if it came with the GraphQL overview);
+    # it and contributors are left out rather than failing the analysis when
+    # the rate limit sheds them
+    shed_sections = []
+    start = time.perf_counter()
+    if overview:
+        commits = overview['commits']
+    else:
+        try:
+            commits = fetcher.get_recent_commits(owner, repo, limit=5, ref=ref)
+            token_usage['github_api_calls'] += api_call
+        except RateLimitExceeded:
+            commits = []
+            shed_sections.append('commits')
+    timings['commits_ms'] = elapsed_ms(start)
+    report('commits', commits=commits)
+    
+    # Get contributors
+    start = time.perf_counter()
+    try:
+        contributors = fetcher.get_contributors(owner, repo)
+        token_usage['github_api_calls'] += metadata_call
+    except RateLimitExceeded:
+        contributors = []
+        shed_sections.append('contributors')
+    timings['contributors_ms'] = elapsed_ms(start)
+    report('contributors', contributors=contributors)
+    coverage['shed_sections'] = shed_sections
+    
+    # Get GitHub rate limit info (tracked from response headers, no extra call)
+    start = time.perf_counter()
+    rate_limit_info = github_fetcher.get_rate_limit_info()
+    if rate_limit_info:
+        token_usage['github_rate_limit_remaining'] = rate_limit_info.get('remaining', 0)
+        token_usage['github_rate_limit_reset'] = rate_limit_info.get('reset_time', None)
+    timings['rate_limit_ms'] = elapsed_ms(start)
+    
+    # Calculate estimated costs
+    token_usage['model_cost'] = round(token_usage['model_cost'], 6)
+    token_usage['total_cost_estimate'] = calculate_cost_estimate(token_usage)
+    
+    # Record usage in tracker
+    token_tracker.record_usage(token_usage)
+    
+    # Get usage summary for display
+    usage_summary = token_tracker.get_usage_summary()
+    
+    # Get rate limit status
+    rate_limit_status = token_tracker.get_rate_limit_status(
+        token_usage['github_rate_limit_remaining'],
+        rate_limit_info['limit'] if rate_limit_info else (5000 if github_fetcher.headers.get('Authorization') else 60)
+    )
+    
+    timings['total_ms'] = elapsed_ms(request_start)
+    for stage in ANALYSIS_STAGES:
+        if f'{stage}_ms' in timings:
+            STAGE_SECONDS.observe(timings[f'{stage}_ms'] / 1000, stage=stage)
+
+    result = {
+        'repo_info': repo_data,
+        'ref': ref,
+        'file_analysis': analysis_results,
+        'commits': commits,
+        'contributors': contributors,
+        'total_files_analyzed': len(analysis_results),
+        'coverage': coverage,
+        'token_usage': token_usage,
+        'usage_summary': usage_summary,
+        'rate_limit_status': rate_limit_status,
+        'timings': timings,
+        'analyzed_at': datetime.now().isoformat(timespec='seconds')
+    }
+    if head_sha:
+        result['commit_sha'] = head_sha
+        result['analysis_id'] = analysis_store.save(store_key, head_sha, result)
+    
+    return result, 200
+
+# Background analyses for POST /jobs
+job_queue = JobQueue(run_analysis)
+# Multi-repository runs for POST /analyze/batch, sharing the fetcher's session, caches and rate limit
+batch_runner = BatchRunner(run_analysis, github_fetcher)
+
+def github_cache_hit_ratio():
+    stats = github_fetcher.response_cache.get_stats()
+    lookups = stats['revalidated'] + stats['misses']
+    return stats['revalidated'] / lookups if lookups else None
+
+metrics.gauge('cache_hit_ratio', 'Hit ratio of the summary cache and GitHub conditional-request cache',
+              lambda: {(('cache', 'summary'),): summary_cache.get_stats()['hit_ratio'],
+                       (('cache', 'github'),): github_cache_hit_ratio()})
+metrics.gauge('queue_depth', 'Tasks waiting for a worker, by pool',
+              lambda: {**{(('pool', pool),): depth for pool, depth in analysis_pipeline.queue_depths().items()},
+                       (('pool', 'jobs'),): job_queue.get_stats()['queued']})
+metrics.gauge('jobs_inflight', 'Queued or running background analyses', lambda: job_queue.get_stats()['inflight'])
+metrics.gauge('github_rate_limit_remaining', 'REST rate limit budget left, from response headers',
+              lambda: github_fetcher.scheduler.get_state()['remaining'])
+metrics.gauge('llm_concurrency_limit', 'Current adaptive concurrency limit of each summarizer backend',
+              lambda: {(('backend', name),): backend.limiter.get_state()['limit']
+                       for name, backend in code_summarizer.backends.items()})
+metrics.gauge('llm_circuit_open', 'Whether a summarizer backend is cut off by its circuit breaker (1) or not (0)',
+              lambda: {(('backend', name),): 0 if backend.breaker.allow() else 1
+                       for name, backend in code_summarizer.backends.items()})
+
 @app.route('/analyze', methods=['POST'])
 def analyze_repo():
     try:
-        data = request.get_json()
-        github_url = data.get('github_url')
-        
-        if not github_url:
-            return jsonify({'error': 'GitHub URL is required'}), 400
-        
         try:
-            owner, repo = parse_github_url(github_url)
+            owner, repo, ref, options = parse_analyze_request(request.get_json())
         except ValueError as e:
             return jsonify({'error': str(e)}), 400
         
-        # Initialize token usage tracking
-        token_usage = {
-            'github_api_calls': 0,
-            'github_rate_limit_remaining': 0,
-            'github_rate_limit_reset': None,
-            'huggingface_api_calls': 0,
-            'huggingface_tokens_used': 0,
-            'total_cost_estimate': 0.0
-        }
-        
-        # Fetch repository data
-        repo_data = github_fetcher.get_repo_info(owner, repo)
-        token_usage['github_api_calls'] += 1
-        
-        if not repo_data:
-            rate_limit_info = github_fetcher.get_rate_limit_info()
-            if rate_limit_info and rate_limit_info['remaining'] == 0:
-                return jsonify({
-                    'error': 'GitHub API rate limit exceeded. Please try again later or add a GitHub token for higher limits.'
-                }), 429
-            else:
-                return jsonify({
-                    'error': f'Repository "{owner}/{repo}" not found or is private. Please check the URL and ensure the repository is public.'
-                }), 404
-        
-        # Get file structure and content
-        files_data = github_fetcher.get_repo_files(owner, repo)
-        token_usage['github_api_calls'] += 1
-        
-        # Analyze code files
-        analysis_results = []
-        analyzed_count = 0
-        
-        for file_info in files_data[:10]:
-            if file_info['type'] == 'file' and code_summarizer.is_code_file(file_info['name']):
-                content = github_fetcher.get_file_content(owner, repo, file_info['path'])
-                token_usage['github_api_calls'] += 1
-                
-                if content:
-                    summary, ai_usage = code_summarizer.summarize_code(content, file_info['name'])
-                    token_usage['huggingface_api_calls'] += ai_usage.get('api_calls', 0)
-                    token_usage['huggingface_tokens_used'] += ai_usage.get('tokens_used', 0)
-                    
-                    analysis_results.append({
-                        'file': file_info['name'],
-                        'path': file_info['path'],
-                        'summary': summary,
-                        'size': file_info.get('size', 0),
-                        'tokens_used': ai_usage.get('tokens_used', 0)
-                    })
-                    analyzed_count += 1
-        
-        # Get commit history
-        commits = github_fetcher.get_recent_commits(owner, repo, limit=5)
-        token_usage['github_api_calls'] += 1
-        
-        # Get contributors
-        contributors = github_fetcher.get_contributors(owner, repo)
-        token_usage['github_api_calls'] += 1
-        
-        # Get GitHub rate limit info
-        rate_limit_info = github_fetcher.get_rate_limit_info()
-        if rate_limit_info:
-            token_usage['github_rate_limit_remaining'] = rate_limit_info.get('remaining', 0)
-            token_usage['github_rate_limit_reset'] = rate_limit_info.get('reset_time', None)
-        
-        # Calculate estimated costs
-        token_usage['total_cost_estimate'] = calculate_cost_estimate(token_usage)
-        
-        # Record usage in tracker
-        token_tracker.record_usage(token_usage)
-        
-        # Get usage summary for display
-        usage_summary = token_tracker.get_usage_summary()
-        
-        # Get rate limit status
-        rate_limit_status = token_tracker.get_rate_limit_status(
-            token_usage['github_rate_limit_remaining'],
-            5000 if github_fetcher.headers.get('Authorization') else 60
-        )
-        
-        result = {
-            'repo_info': repo_data,
-            'file_analysis': analysis_results,
-            'commits': commits,
-            'contributors': contributors,
-            'total_files_analyzed': len(analysis_results),
-            'token_usage': token_usage,
-            'usage_summary': usage_summary,
-            'rate_limit_status': rate_limit_status
-        }
-        
-        return jsonify(result)
+        result, status = run_analysis(owner, repo, ref, **options)
+        return jsonify(result), status
     
     except Exception as e:
         return jsonify({'error': f'Analysis failed: {str(e)}'}), 500
 
+def format_sse(event: str, data) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/analyze/stream')
+def analyze_stream():
+    """Stream an analysis as Server-Sent Events, one event per part as it is ready"""
+    try:
+        owner, repo, ref, options = parse_analyze_request(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    events = queue.Queue()
+
+    def run():
+        try:
+            result, status = run_analysis(owner, repo, ref, progress=lambda stage, **details: events.put((stage, details)),
+                                          **options)
+        except Exception as e:
+            result, status = {'error': f'Analysis failed: {str(e)}'}, 500
+        if status == 200:
+            events.put(('done', result))
+        else:
+            # Not 'error': EventSource reserves that name for connection failures
+            events.put(('analysis_error', {**result, 'status': status}))
+        events.put(None)
+
+    threading.Thread(target=run, daemon=True).start()
+
+    def stream():
+        # Opening comment so the client sees the connection before the first GitHub call returns
+        yield ': analysis started\n\n'
+        while True:
+            item = events.get()
+            if item is None:
+                break
+            yield format_sse(*item)
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def parse_batch_request(data: dict) -> str:
+    """Create a batch from an /analyze/batch body, or return the batch_id it resumes"""
+    data = data or {}
+    if data.get('batch_id'):
+        if not batch_runner.get(data['batch_id']):
+            raise LookupError(f'Batch "{data["batch_id"]}" not found')
+        return data['batch_id']
+
+    repos = data.get('repos') or []
+    if not isinstance(repos, list):
+        raise ValueError('repos must be a list of GitHub URLs or owner/repo names')
+    if not repos and not data.get('org'):
+        raise ValueError('A list of repos or an org is required')
+    return batch_runner.create(
+        repos=[parse_github_url(url) for url in repos],
+        owner=data.get('org'),
+        ref=data.get('ref') or None,
+        include_forks=bool(data.get('include_forks')),
+        include_archived=bool(data.get('include_archived')),
+        **parse_analysis_options(data)
+    )
+
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """Analyze a list of repositories or a whole org, streaming one JSON line per repository"""
+    try:
+        batch_id = parse_batch_request(request.get_json())
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except RateLimitExceeded:
+        # Listing the org's repositories ran out of budget before the batch was created
+        return jsonify({'error': RATE_LIMIT_ERROR}), 429
+
+    def stream():
+        for record in batch_runner.run(batch_id):
+            yield json.dumps(record) + '\n'
+
+    return Response(stream(), mimetype='application/x-ndjson',
+                    headers={'X-Batch-Id': batch_id, 'X-Accel-Buffering': 'no'})
+
+@app.route('/analyze/batch/<batch_id>')
+def get_batch(batch_id):
+    batch = batch_runner.get(batch_id)
+    if not batch:
+        return jsonify({'error': f'Batch "{batch_id}" not found'}), 404
+    return jsonify(batch)
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue an analysis and return its job id immediately"""
+    try:
+        owner, repo, ref, options = parse_analyze_request(request.get_json())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    job = job_queue.submit(owner, repo, ref, **options)
+    return jsonify(job), 202
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'error': f'Job "{job_id}" not found'}), 404
+    return jsonify(job)
+
 def calculate_cost_estimate(usage):
     """Calculate estimated API costs"""
     github_cost = 0.0
-    hf_cost = (usage['huggingface_tokens_used'] / 1000) * 0.0002
-    return github_cost + hf_cost
+    # Each summarizer backend prices its own tokens (SUMMARY_<NAME>_COST_PER_1K)
+    model_cost = usage.get('model_cost', 0.0)
+    return round(github_cost + model_cost, 6)
+
+def load_export_result(analysis_id: str = None, job_id: str = None) -> tuple:
+    """The analysis result to export, or (None, error message, HTTP status)"""
+    if analysis_id:
+        stored = analysis_store.get(analysis_id)
+        if not stored:
+            return None, f'Analysis "{analysis_id}" not found', 404
+        return {**stored['result'], 'analysis_id': stored['id']}, None, 200
+    if job_id:
+        job = job_queue.get(job_id)
+        if not job:
+            return None, f'Job "{job_id}" not found', 404
+        if job['status'] != 'done':
+            return None, f'Job "{job_id}" is {job["status"]}, not done', 409
+        return job['result'], None, 200
+    return None, 'An analysis_id or job_id is required', 400
 
 @app.route('/export/<format>')
 def export_report(format):
+    """Stream a report for a stored analysis (?analysis_id=) or finished job (?job_id=)"""
+    if format not in ReportWriter.FORMATS:
+        return jsonify({'error': f'Unsupported format "{format}"'}), 400
+    result, error, status_code = load_export_result(request.args.get('analysis_id'), request.args.get('job_id'))
+    if result is None:
+        return jsonify({'error': error}), status_code
+
+    key = report_writer.report_key(result, format)
+    if key in request.if_none_match:
+        return Response(status=304)
     try:
-        sample_data = {
-            'repo_name': 'sample-repo',
-            'description': 'A sample repository for demonstration',
-            'analysis_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'files': [
-                {'name': 'main.py', 'summary': 'Main application entry point'},
-                {'name': 'utils.py', 'summary': 'Utility functions for data processing'}
-            ]
-        }
-        
-        if format == 'docx':
-            file_path = report_writer.create_docx_report(sample_data)
-            return send_file(file_path, as_attachment=True, download_name='repo_analysis.docx')
-        elif format == 'md':
-            file_path = report_writer.create_markdown_report(sample_data)
-            return send_file(file_path, as_attachment=True, download_name='repo_analysis.md')
-        else:
-            return jsonify({'error': 'Unsupported format'}), 400
-    
+        chunks = report_writer.stream(result, format, key)
+        # Pull the first chunk now so a rendering failure is still a JSON error, not a broken download
+        first = next(chunks, b'')
     except Exception as e:
         return jsonify({'error': f'Export failed: {str(e)}'}), 500
 
+    def body():
+        yield first
+        yield from chunks
+
+    content_type, extension = ReportWriter.FORMATS[format]
+    repo_name = (result.get('repo_info') or {}).get('name') or 'repo'
+    # content_type, not mimetype: FORMATS already carries the charset and Werkzeug would add another
+    response = Response(body(), content_type=content_type)
+    response.headers['Content-Disposition'] = f'attachment; filename="{repo_name}_analysis.{extension}"'
+    response.set_etag(key)
+    return response
+
 @app.route('/health')
 def health_check():
-    return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
+    return jsonify({
+        'status': 'healthy',
+        'timestamp': datetime.now().isoformat(),
+        'tokens': token_validator.get_cached_status(),
+        'summarizer': code_summarizer.get_status()
+    })
 
 @app.route('/usage-stats')
 def usage_stats():
     try:
         usage_summary = token_tracker.get_usage_summary()
+        usage_summary['summary_cache'] = summary_cache.get_stats()
+        usage_summary['github_cache'] = github_fetcher.response_cache.get_stats()
+        usage_summary['report_cache'] = report_writer.get_stats()
+        usage_summary['git_mirrors'] = local_git_fetcher.get_cache_stats()
+        usage_summary['token_counter'] = token_counter.get_stats()
         return jsonify(usage_summary)
     except Exception as e:
         return jsonify({'error': f'Failed to get usage stats: {str(e)}'}), 500
 
-if __name__ == '__main__':
-    print("🌐 Server starting on http://127.0.0.1:5000")
-    app.run(debug=True, host='0.0.0.0', port=5000)
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text exposition of latency histograms, cache hit ratios and queue depths"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
-from flask import Flask, render_template, request, send_from_directory
-from document_generator import RepoDocumentGenerator
-import os
-
-app = Flask(__name__)
-app.config['OUTPUT_DIR'] = 'output'
-
-@app.route('/', methods=['GET', 'POST'])
-def index():
-    if request.method == 'POST':
-        # Get filters from form
-        filters = {
-            'language': request.form.get('language'),
-            'min_stars': int(request.form.get('min_stars')) if request.form.get('min_stars') else None
-        }
-        sort_by = request.form.get('sort_by', 'updated')
-        
-        # Generate report
-        generator = RepoDocumentGenerator()
-        report = generator.generate_all(output_dir=app.config['OUTPUT_DIR'], 
-                                     filters=filters, 
-                                     sort_by=sort_by)
-        
-        return render_template('report.html', 
-                            report=report,
-                            filters=filters,
-                            sort_by=sort_by)
-    
-    return render_template('index.html')
-
-@app.route('/download/<filename>')
-def download(filename):
-    return send_from_directory(app.config['OUTPUT_DIR'], filename)
+@app.route('/rate-limit-stats')
+def rate_limit_stats():
+    return jsonify(github_fetcher.scheduler.get_state())
 
 if __name__ == '__main__':
-    os.makedirs(app.config['OUTPUT_DIR'], exist_ok=True)
-    app.run(debug=True)
-
+    print("🌐 Server starting on http://127.0.0.1:5000")
+    app.run(debug=True, host='0.0.0.0', port=5000)
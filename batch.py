@@ -0,0 +1,205 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+class BatchStore:
+    """Batches and the per-repository outcome of each, in a local SQLite file.
+
+    Every repository is written as pending when the batch is created and
+    updated as soon as its analysis finishes, so a batch interrupted by a
+    crash or disconnect can be resumed with only the unfinished ones.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.environ.get('BATCH_STORE_PATH', 'batch_store.db')
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS batches (id TEXT PRIMARY KEY, spec TEXT NOT NULL, '
+                         'created_at TEXT NOT NULL)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS batch_items (batch_id TEXT NOT NULL, position INTEGER NOT NULL, '
+                         'owner TEXT NOT NULL, repo TEXT NOT NULL, repo_info TEXT, status TEXT NOT NULL, '
+                         'line TEXT, updated_at TEXT NOT NULL, PRIMARY KEY (batch_id, position))')
+
+    def create(self, spec: Dict, repos: List[Dict]) -> str:
+        """Store a batch of {'owner', 'repo', 'repo_info'} entries, all pending"""
+        batch_id = uuid.uuid4().hex
+        now = datetime.now().isoformat()
+        with self._lock, self._db:
+            self._db.execute('INSERT INTO batches (id, spec, created_at) VALUES (?, ?, ?)',
+                             (batch_id, json.dumps(spec), now))
+            self._db.executemany(
+                'INSERT INTO batch_items (batch_id, position, owner, repo, repo_info, status, updated_at) '
+                "VALUES (?, ?, ?, ?, ?, 'pending', ?)",
+                [(batch_id, position, item['owner'], item['repo'],
+                  json.dumps(item['repo_info']) if item.get('repo_info') else None, now)
+                 for position, item in enumerate(repos)])
+        return batch_id
+
+    def get(self, batch_id: str) -> Optional[Dict]:
+        """Batch spec, creation time and status counts"""
+        with self._lock:
+            row = self._db.execute('SELECT spec, created_at FROM batches WHERE id = ?', (batch_id,)).fetchone()
+            if row is None:
+                return None
+            counts = dict(self._db.execute('SELECT status, COUNT(*) FROM batch_items WHERE batch_id = ? '
+                                           'GROUP BY status', (batch_id,)).fetchall())
+        return {'id': batch_id, 'spec': json.loads(row[0]), 'created_at': row[1],
+                'total': sum(counts.values()), 'counts': counts}
+
+    def items(self, batch_id: str) -> List[Dict]:
+        with self._lock:
+            rows = self._db.execute('SELECT position, owner, repo, repo_info, status, line FROM batch_items '
+                                    'WHERE batch_id = ? ORDER BY position', (batch_id,)).fetchall()
+        return [{'position': position, 'owner': owner, 'repo': repo,
+                 'repo_info': json.loads(repo_info) if repo_info else None,
+                 'status': status, 'line': json.loads(line) if line else None}
+                for position, owner, repo, repo_info, status, line in rows]
+
+    def finish(self, batch_id: str, position: int, status: str, line: Dict) -> None:
+        with self._lock, self._db:
+            self._db.execute('UPDATE batch_items SET status = ?, line = ?, updated_at = ? '
+                             'WHERE batch_id = ? AND position = ?',
+                             (status, json.dumps(line), datetime.now().isoformat(), batch_id, position))
+
+class BatchRunner:
+    """Analyzes many repositories on one shared worker pool, streaming one record per repository.
+
+    All batches share the pool (BATCH_WORKERS) and, through the runner's
+    GitHubFetcher, one session, response cache and rate-limit budget. When
+    the budget runs out, remaining repositories stay pending and the batch
+    stops, so it can be resumed once the limit resets.
+    """
+
+    def __init__(self, runner: Callable, fetcher, workers: int = None, store: Optional[BatchStore] = None):
+        self.runner = runner
+        self.fetcher = fetcher
+        self.workers = workers or int(os.environ.get('BATCH_WORKERS', 3))
+        self.max_repos = int(os.environ.get('BATCH_MAX_REPOS', 500))
+        self.store = store or BatchStore()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='batch')
+
+    def create(self, repos: Optional[List[tuple]] = None, owner: Optional[str] = None, ref: Optional[str] = None,
+               include_forks: bool = False, include_archived: bool = False, **options) -> str:
+        """Create a batch from (owner, repo) pairs or all public repositories of an owner.
+
+        Raises ValueError if neither is given, the owner cannot be listed or
+        there are more than BATCH_MAX_REPOS repositories, and RateLimitExceeded
+        if the rate limit runs out while listing the owner.
+        """
+        entries, seen = [], set()
+        if owner:
+            listed = self.fetcher.list_owner_repos(owner, include_forks=include_forks,
+                                                   include_archived=include_archived, limit=self.max_repos + 1)
+            if listed is None:
+                raise ValueError(f'Organization or user "{owner}" not found')
+            for repo_info in listed:
+                repo_owner, repo_name = repo_info['full_name'].split('/', 1)
+                entries.append({'owner': repo_owner, 'repo': repo_name, 'repo_info': repo_info})
+        for repo_owner, repo_name in repos or []:
+            entries.append({'owner': repo_owner, 'repo': repo_name, 'repo_info': None})
+
+        unique = []
+        for entry in entries:
+            key = (entry['owner'].lower(), entry['repo'].lower())
+            if key not in seen:
+                seen.add(key)
+                unique.append(entry)
+        if not unique:
+            raise ValueError('No repositories to analyze')
+        if len(unique) > self.max_repos:
+            raise ValueError(f'Batch has more than {self.max_repos} repositories (BATCH_MAX_REPOS)')
+
+        spec = {'owner': owner, 'ref': ref, 'options': options}
+        return self.store.create(spec, unique)
+
+    def get(self, batch_id: str) -> Optional[Dict]:
+        return self.store.get(batch_id)
+
+    def run(self, batch_id: str) -> Iterator[Dict]:
+        """Run a batch's pending repositories, yielding NDJSON records.
+
+        The first record describes the batch; results already stored by an
+        earlier run come next (marked resumed), then each new result as it
+        finishes, then a summary. Results are stored by the worker that
+        produced them, so closing the iterator cancels repositories that have
+        not started while started ones still finish and are stored.
+        """
+        batch = self.store.get(batch_id)
+        if batch is None:
+            raise KeyError(batch_id)
+        spec = batch['spec']
+        items = self.store.items(batch_id)
+        pending = [item for item in items if item['status'] == 'pending']
+        start = time.perf_counter()
+        calls_before = self.fetcher.scheduler.get_state()['requests']
+
+        yield {'type': 'batch', 'id': batch_id, 'total': len(items), 'pending': len(pending),
+               'workers': self.workers}
+        for item in items:
+            if item['status'] != 'pending':
+                yield {**item['line'], 'resumed': True}
+
+        counts = {'done': 0, 'failed': 0}
+        rate_limited = False
+        queue = list(pending)
+        futures = set()
+        try:
+            while queue or futures:
+                # Keep at most one repository per worker in flight, so a rate-limit stop leaves the rest pending
+                while queue and not rate_limited and len(futures) < self.workers:
+                    item = queue.pop(0)
+                    futures.add(self._pool.submit(self._analyze, batch_id, item, spec))
+                if not futures:
+                    break
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    futures.remove(future)
+                    status, line = future.result()
+                    if status == 'rate_limited':
+                        rate_limited = True
+                        continue
+                    counts[status] += 1
+                    yield line
+        finally:
+            for future in futures:
+                future.cancel()
+
+        yield {
+            'type': 'summary',
+            'id': batch_id,
+            'done': counts['done'],
+            'failed': counts['failed'],
+            'pending': len(pending) - counts['done'] - counts['failed'],
+            'stopped': 'rate_limited' if rate_limited else None,
+            'github_requests': self.fetcher.scheduler.get_state()['requests'] - calls_before,
+            'elapsed_s': round(time.perf_counter() - start, 2)
+        }
+
+    def _analyze(self, batch_id: str, item: Dict, spec: Dict) -> tuple:
+        """Run and store one analysis, returning ('done' | 'failed' | 'rate_limited', NDJSON record).
+
+        A rate-limited repository is not stored, so it stays pending for a resume.
+        """
+        repo_name = f"{item['owner']}/{item['repo']}"
+        try:
+            result, status_code = self.runner(item['owner'], item['repo'], spec.get('ref'),
+                                              repo_info=item['repo_info'], **spec.get('options', {}))
+        except Exception as e:
+            result, status_code = {'error': f'Analysis failed: {str(e)}'}, 500
+
+        if status_code == 429:
+            return 'rate_limited', None
+        if status_code == 200:
+            status, line = 'done', {'type': 'result', 'repo': repo_name, 'status_code': status_code, 'result': result}
+        else:
+            status, line = 'failed', {'type': 'result', 'repo': repo_name, 'status_code': status_code,
+                                      'error': result.get('error')}
+        self.store.finish(batch_id, item['position'], status, line)
+        return status, line
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-call connections vs pooled keep-alive session in GitHubFetcher
+
+Runs a local stub of the GitHub REST API and replays the calls /analyze makes
+for one repository, once with a fresh connection per request (the old
+module-level requests.get behaviour) and once with the fetcher's pooled session.
+"""
+import argparse
+import base64
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from github_fetcher import GitHubFetcher
+
+FILES = [f"module_{i}.py" for i in range(10)]
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded stub that counts accepted TCP connections"""
+    daemon_threads = True
+
+    def __init__(self, address, connect_delay: float):
+        super().__init__(address, StubHandler)
+        self.connect_delay = connect_delay
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without TCP_NODELAY a
+    # kept-alive connection stalls on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        # Model the TCP+TLS handshake cost a real api.github.com connection pays
+        time.sleep(self.server.connect_delay)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split('?')[0].rstrip('/')
+        if path == '/rate_limit':
+            body = {'resources': {'core': {'limit': 5000, 'remaining': 4999, 'reset': int(time.time()) + 3600}}}
+        elif path.endswith('/commits'):
+            body = [{'sha': 'a' * 40, 'html_url': '', 'commit': {'message': 'msg', 'author': {'name': 'dev', 'date': '2024-01-01T00:00:00Z'}}}]
+        elif path.endswith('/contributors'):
+            body = [{'login': 'dev', 'contributions': 1, 'avatar_url': '', 'html_url': ''}]
+        elif path.endswith('/contents'):
+            body = [{'name': name, 'path': name, 'type': 'file', 'size': 20} for name in FILES]
+        elif '/contents/' in path:
+            body = {'encoding': 'base64', 'content': base64.b64encode(b'def main():\n    pass\n').decode()}
+        else:
+            body = {'name': 'repo', 'full_name': 'owner/repo', 'stargazers_count': 0, 'forks_count': 0,
+                    'created_at': '', 'updated_at': '', 'size': 1, 'default_branch': 'main'}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class UnpooledSession:
+    """Stand-in for the pre-session fetcher: a new connection for every call"""
+
+    def get(self, url, **kwargs):
+        return requests.get(url, **kwargs)
+
+    def close(self):
+        pass
+
+
+def run_analysis(fetcher: GitHubFetcher) -> None:
+    """Replay the GitHub calls one /analyze request makes"""
+    fetcher.get_repo_info('owner', 'repo')
+    for file_info in fetcher.get_repo_files('owner', 'repo'):
+        fetcher.get_file_content('owner', 'repo', file_info['path'])
+    fetcher.get_recent_commits('owner', 'repo', limit=5)
+    fetcher.get_contributors('owner', 'repo')
+    fetcher.get_rate_limit_info()
+
+
+def measure(server: StubServer, fetcher: GitHubFetcher, analyses: int, concurrency: int) -> dict:
+    server.connections = 0
+    timings = []
+
+    def one():
+        start = time.perf_counter()
+        run_analysis(fetcher)
+        timings.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(one) for _ in range(analyses)]:
+            future.result()
+    fetcher.close()
+
+    timings.sort()
+    return {
+        'mean_ms': round(statistics.mean(timings) * 1000, 2),
+        'p95_ms': round(timings[int(len(timings) * 0.95) - 1] * 1000, 2),
+        'connections_per_analysis': round(server.connections / analyses, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--analyses', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--connect-delay-ms', type=float, default=20.0,
+                        help='simulated handshake cost per new connection')
+    args = parser.parse_args()
+
+    server = StubServer(('127.0.0.1', 0), args.connect_delay_ms / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    results = {
+        'before (requests.get)': measure(server, GitHubFetcher(base_url=base_url, session=UnpooledSession()),
+                                         args.analyses, args.concurrency),
+        'after (pooled session)': measure(server, GitHubFetcher(base_url=base_url),
+                                          args.analyses, args.concurrency)
+    }
+    server.shutdown()
+
+    for label, stats in results.items():
+        print(f"{label:<24} mean {stats['mean_ms']:>8} ms  p95 {stats['p95_ms']:>8} ms  "
+              f"connections/analysis {stats['connections_per_analysis']}")
+
+
+if __name__ == '__main__':
+    main()
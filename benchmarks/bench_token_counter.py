@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: token estimators, speed and error against a tiktoken reference
+
+Reads the source files under --path and counts each one with the old
+4-characters-per-token rule, the regex estimator, tiktoken (when installed
+and the encoding is cached locally) and the cached TokenCounter on a repeat
+lookup.
+Prints microseconds per file and throughput, and, when the --reference
+encoding is in the local tiktoken cache (TIKTOKEN_CACHE_DIR), each
+estimator's mean and p95 absolute error and its overall bias.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.token_counter import TokenCounter, estimate_tokens, load_local_encoding
+
+EXTENSIONS = ('.py', '.js', '.ts', '.go', '.rs', '.java', '.html', '.css', '.md', '.sh', '.json', '.yml')
+SKIP_DIRS = {'.git', '__pycache__', 'node_modules', 'git_mirrors', 'results', 'venv', '.venv'}
+
+
+def load_corpus(path: str, limit: int) -> list:
+    texts = []
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+        for name in sorted(files):
+            if not name.endswith(EXTENSIONS):
+                continue
+            try:
+                with open(os.path.join(root, name), encoding='utf-8') as f:
+                    text = f.read()
+            except (OSError, UnicodeDecodeError):
+                continue
+            if text.strip():
+                texts.append(text)
+            if len(texts) >= limit:
+                return texts
+    return texts
+
+
+def load_encoding(name: str):
+    try:
+        return load_local_encoding(name)
+    except (ImportError, FileNotFoundError) as e:
+        print(f"reference encoding {name} unavailable ({e}); errors are not reported\n")
+        return None
+
+
+def timed(fn, texts, repeat: int) -> tuple:
+    best, counts = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        counts = [fn(text) for text in texts]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, counts
+
+
+def errors(counts, reference) -> tuple:
+    """(mean absolute % error, p95 absolute % error, total bias %)"""
+    relative = sorted(abs(count - ref) / ref * 100 for count, ref in zip(counts, reference) if ref)
+    p95 = relative[min(int(len(relative) * 0.95), len(relative) - 1)]
+    bias = (sum(counts) - sum(reference)) / sum(reference) * 100
+    return sum(relative) / len(relative), p95, bias
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--path', default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        help='directory of source files to count (default: this repository)')
+    parser.add_argument('--limit', type=int, default=500, help='most files to read')
+    parser.add_argument('--reference', default='cl100k_base', help='tiktoken encoding counted as exact')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement, best is reported')
+    args = parser.parse_args()
+
+    texts = load_corpus(args.path, args.limit)
+    if not texts:
+        parser.error(f'no source files under {args.path}')
+    megabytes = sum(len(text) for text in texts) / (1024 * 1024)
+    print(f"{len(texts)} files, {megabytes:.2f} MB")
+
+    encoding = load_encoding(args.reference)
+    estimators = [('chars // 4', lambda text: max(1, len(text) // 4)), ('regex estimate', estimate_tokens)]
+    if encoding is not None:
+        estimators.append((f'tiktoken {args.reference}', lambda text: len(encoding.encode_ordinary(text))))
+    counter = TokenCounter(method='tiktoken' if encoding is not None else 'estimate', encoding=args.reference,
+                           cache_size=len(texts) + 1)
+    for text in texts:
+        counter.count(text)
+    estimators.append(('TokenCounter (cached)', counter.count))
+
+    reference = [len(encoding.encode_ordinary(text)) for text in texts] if encoding is not None else None
+    print(f"  {'estimator':<26} {'us/file':>9} {'MB/s':>8}" +
+          (f"  {'mean err':>8} {'p95 err':>8} {'bias':>7}" if reference else ''))
+    for label, fn in estimators:
+        elapsed, counts = timed(fn, texts, args.repeat)
+        line = f"  {label:<26} {elapsed / len(texts) * 1e6:>9.1f} {megabytes / elapsed:>8.1f}"
+        if reference:
+            mean, p95, bias = errors(counts, reference)
+            line += f"  {mean:>7.1f}% {p95:>7.1f}% {bias:>+6.1f}%"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
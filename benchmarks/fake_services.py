@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the GitHub REST API and the Gemini model
+
+FakeGitHubServer answers the REST endpoints GitHubFetcher uses (repos,
+contents, commits, compare, contributors, rate_limit, git trees, tarball) for
+synthetic repositories generated on demand from their name, with configurable
+latency, ETags and a rate limit window. FakeGeminiModel has the
+generate_content interface CodeSummarizer calls and answers batch prompts in
+the JSON shape it expects. Run this file to serve the fake GitHub API, e.g. for
+GITHUB_API_URL=http://127.0.0.1:8765 python app.py.
+"""
+import argparse
+import base64
+import hashlib
+import io
+import json
+import random
+import re
+import tarfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit, unquote
+
+MODULE_TEMPLATE = '''"""{module} module of {repo}"""
+import os
+from typing import Dict, List
+
+from {neighbour} import helper_{neighbour}
+
+
+class {cls}:
+    """Keeps {module} state"""
+
+    def __init__(self, items: List[int]):
+        self.items = items
+
+    def process(self) -> int:
+        total = 0
+        for item in self.items:
+            if item > 0 and item % {n} == 0:
+                total += item
+        return total
+
+
+def helper_{module}(value: int) -> int:
+    return value * {n} if value else 0
+'''
+
+
+def git_sha(kind: str, data: bytes) -> str:
+    """Git object id of a blob or tree with the given contents"""
+    return hashlib.sha1(f"{kind} {len(data)}\0".encode() + data).hexdigest()
+
+
+class SyntheticRepo:
+    """A deterministic repository of Python modules in a few packages, plus a README"""
+
+    def __init__(self, owner: str, name: str, files: int, file_size: int, dirs: int = 4):
+        self.owner, self.name = owner, name
+        seed = hashlib.sha1(f"{owner}/{name}".encode()).hexdigest()
+        self.head_sha = hashlib.sha1(f"commit {seed}".encode()).hexdigest()
+        self.files: Dict[str, bytes] = {
+            'README.md': f"# {name}\n\nSynthetic repository. Start with `main.py` and `pkg0/module0.py`.\n".encode()
+        }
+        for n in range(files - 1):
+            directory = 'main' if n == 0 else f"pkg{n % dirs}/module{n}"
+            module = directory.rsplit('/', 1)[-1]
+            neighbour = f"module{max(n - 1, 1)}"
+            text = MODULE_TEMPLATE.format(module=module, repo=name, neighbour=neighbour,
+                                          cls=f"Handler{n}", n=n % 7 + 2)
+            # Pad with comments (varying per repo, so every repository has new blob SHAs) up to the requested size
+            padding = f"# {seed} padding line for {module}\n"
+            while len(text) < file_size:
+                text += padding
+            self.files[f"{directory}.py"] = text.encode()
+        self.blob_shas = {path: git_sha('blob', data) for path, data in self.files.items()}
+
+        self.dirs = {''}
+        for path in self.files:
+            parts = path.split('/')[:-1]
+            for depth in range(1, len(parts) + 1):
+                self.dirs.add('/'.join(parts[:depth]))
+        # Trees are addressed by a made-up id per directory; only stable lookups matter here
+        self.tree_shas = {directory: git_sha('tree', f"{seed}:{directory}".encode()) for directory in self.dirs}
+        self._tarball = None
+        self._lock = threading.Lock()
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.owner}/{self.name}"
+
+    def children(self, directory: str) -> List[Dict]:
+        """Direct entries of a directory as {path, name, type ('file'/'dir'), size, sha}"""
+        prefix = f"{directory}/" if directory else ''
+        entries = []
+        for sub in sorted(self.dirs):
+            if sub and sub.startswith(prefix) and '/' not in sub[len(prefix):]:
+                entries.append({'path': sub, 'name': sub.rsplit('/', 1)[-1], 'type': 'dir', 'size': 0,
+                                'sha': self.tree_shas[sub]})
+        for path in sorted(self.files):
+            if path.startswith(prefix) and '/' not in path[len(prefix):]:
+                entries.append({'path': path, 'name': path.rsplit('/', 1)[-1], 'type': 'file',
+                                'size': len(self.files[path]), 'sha': self.blob_shas[path]})
+        return entries
+
+    def tree(self, directory: str, recursive: bool) -> List[Dict]:
+        """Git Trees API entries under a directory, with paths relative to it"""
+        prefix = f"{directory}/" if directory else ''
+        entries = []
+        pending = [directory]
+        while pending:
+            current = pending.pop(0)
+            for entry in self.children(current):
+                item = {'path': entry['path'][len(prefix):], 'sha': entry['sha']}
+                if entry['type'] == 'dir':
+                    item.update(mode='040000', type='tree')
+                    if recursive:
+                        pending.append(entry['path'])
+                else:
+                    item.update(mode='100644', type='blob', size=entry['size'])
+                entries.append(item)
+        return entries
+
+    def directory_for_tree(self, sha: str) -> Optional[str]:
+        if sha in ('HEAD', 'main', self.head_sha):
+            return ''
+        for directory, tree_sha in self.tree_shas.items():
+            if tree_sha == sha:
+                return directory
+        return None
+
+    def tarball(self) -> bytes:
+        """gzip'd tar with GitHub's "<owner>-<repo>-<sha>/" top-level directory, built once"""
+        with self._lock:
+            if self._tarball is None:
+                buffer = io.BytesIO()
+                root = f"{self.owner}-{self.name}-{self.head_sha[:7]}"
+                with tarfile.open(fileobj=buffer, mode='w:gz') as archive:
+                    for path, data in sorted(self.files.items()):
+                        member = tarfile.TarInfo(f"{root}/{path}")
+                        member.size = len(data)
+                        archive.addfile(member, io.BytesIO(data))
+                self._tarball = buffer.getvalue()
+            return self._tarball
+
+
+class FakeGitHubServer(ThreadingHTTPServer):
+    """Threaded fake of api.github.com serving SyntheticRepos, with latency and a rate limit.
+
+    Any /repos/<owner>/<name> exists and is generated on first use with
+    repo_files files of about file_size bytes. Each request sleeps latency
+    (plus up to jitter) seconds. The rate limit allows rate_limit requests per
+    rate_window seconds; like GitHub, 304 replies and /rate_limit do not count.
+    Every /orgs/<org>/repos lists org_repos repositories. calls counts
+    requests per endpoint.
+    """
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), repo_files: int = 40, file_size: int = 2000,
+                 latency: float = 0.0, jitter: float = 0.0, rate_limit: int = 5000, rate_window: float = 3600,
+                 org_repos: int = 10):
+        super().__init__(address, FakeGitHubHandler)
+        self.org_repos = org_repos
+        self.repo_files = repo_files
+        self.file_size = file_size
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.calls = Counter()
+        self._repos: Dict[str, SyntheticRepo] = {}
+        self._used = 0
+        self._reset = time.time() + rate_window
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def start(self) -> 'FakeGitHubServer':
+        threading.Thread(target=self.serve_forever, name='fake-github', daemon=True).start()
+        return self
+
+    def repository(self, owner: str, name: str) -> SyntheticRepo:
+        key = f"{owner}/{name}".lower()
+        with self._lock:
+            repo = self._repos.get(key)
+        if repo is None:
+            # Built outside the lock; a concurrent duplicate is identical and harmless
+            repo = SyntheticRepo(owner, name, self.repo_files, self.file_size)
+            with self._lock:
+                repo = self._repos.setdefault(key, repo)
+        return repo
+
+    def count(self, endpoint: str, counted: bool) -> Dict[str, str]:
+        """Record a call and return its X-RateLimit-* headers; remaining -1 means over the limit"""
+        with self._lock:
+            self.calls[endpoint] += 1
+            now = time.time()
+            if now >= self._reset:
+                self._used, self._reset = 0, now + self.rate_window
+            if counted:
+                self._used += 1
+            remaining = self.rate_limit - self._used
+        return {'X-RateLimit-Limit': str(self.rate_limit), 'X-RateLimit-Remaining': str(max(remaining, -1)),
+                'X-RateLimit-Reset': str(int(self._reset))}
+
+    def reset_rate_limit(self, rate_limit: Optional[int] = None) -> None:
+        """Start a new rate limit window, optionally with a different limit"""
+        with self._lock:
+            if rate_limit is not None:
+                self.rate_limit = rate_limit
+            self._used, self._reset = 0, time.time() + self.rate_window
+
+    def rate_limit_state(self) -> Dict:
+        with self._lock:
+            return {'limit': self.rate_limit, 'remaining': max(self.rate_limit - self._used, 0),
+                    'reset': int(self._reset)}
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {'calls': dict(self.calls), 'total_calls': sum(self.calls.values())}
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server: FakeGitHubServer = self.server
+        if server.latency or server.jitter:
+            time.sleep(server.latency + random.random() * server.jitter)
+
+        url = urlsplit(self.path)
+        parts = [unquote(part) for part in url.path.strip('/').split('/')]
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        if parts[0] != 'repos':
+            endpoint = parts[0]
+        else:
+            endpoint = parts[3] if len(parts) > 3 else 'repo'
+
+        # /rate_limit is free on GitHub; conditional requests are charged only when they miss
+        response = self.route(parts, query)
+        status, body, content_type = response
+        etag = None
+        if status == 200 and content_type == 'application/json':
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        not_modified = etag is not None and self.headers.get('If-None-Match') == etag
+        headers = server.count(endpoint, counted=endpoint != 'rate_limit' and not not_modified)
+        if int(headers['X-RateLimit-Remaining']) < 0 and endpoint != 'rate_limit':
+            headers['X-RateLimit-Remaining'] = '0'
+            status, body, content_type = 403, json.dumps({'message': 'API rate limit exceeded'}).encode(), \
+                'application/json'
+            etag, not_modified = None, False
+
+        self.send_response(304 if not_modified else status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if etag:
+            self.send_header('ETag', etag)
+        if not_modified:
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def route(self, parts: List[str], query: Dict[str, str]) -> tuple:
+        server: FakeGitHubServer = self.server
+        if parts == ['rate_limit']:
+            return self.json({'resources': {'core': server.rate_limit_state()}})
+        if parts[0] == 'orgs' and len(parts) == 3 and parts[2] == 'repos':
+            per_page, page = int(query.get('per_page', 30)), int(query.get('page', 1))
+            names = [f"repo-{n}" for n in range(server.org_repos)][(page - 1) * per_page:page * per_page]
+            return self.json([self.repo_info(server.repository(parts[1], name)) for name in names])
+        if len(parts) < 3 or parts[0] != 'repos':
+            return self.json({'message': 'Not Found'}, 404)
+
+        repo = server.repository(parts[1], parts[2])
+        rest = parts[3:]
+        if not rest:
+            return self.json(self.repo_info(repo))
+        if rest[0] == 'contents':
+            path = '/'.join(rest[1:])
+            if path in repo.files:
+                data = repo.files[path]
+                return self.json({'name': path.rsplit('/', 1)[-1], 'path': path, 'type': 'file', 'size': len(data),
+                                  'sha': repo.blob_shas[path], 'encoding': 'base64',
+                                  'content': base64.b64encode(data).decode()})
+            if path in repo.dirs:
+                return self.json(repo.children(path))
+        elif rest[:2] == ['git', 'trees'] and len(rest) == 3:
+            directory = repo.directory_for_tree(rest[2])
+            if directory is not None:
+                return self.json({'sha': repo.tree_shas[directory], 'truncated': False,
+                                  'tree': repo.tree(directory, recursive=bool(query.get('recursive')))})
+        elif rest == ['commits']:
+            per_page = int(query.get('per_page', 30))
+            return self.json([self.commit(repo, n) for n in range(min(per_page, 5))])
+        elif rest[0] == 'commits' and len(rest) == 2:
+            if self.headers.get('Accept') == 'application/vnd.github.sha':
+                return 200, repo.head_sha.encode(), 'text/plain'
+            return self.json(self.commit(repo, 0))
+        elif rest[0] == 'compare' and len(rest) == 2:
+            base, _, head = rest[1].partition('...')
+            identical = base == head or {base, head} <= {repo.head_sha, 'main', 'HEAD'}
+            return self.json({'status': 'identical' if identical else 'diverged', 'ahead_by': 0, 'files': []})
+        elif rest == ['contributors']:
+            return self.json([{'login': f"dev{n}", 'contributions': 50 - n * 7, 'avatar_url': '',
+                               'html_url': f"https://github.com/dev{n}"} for n in range(5)])
+        elif rest[0] == 'tarball':
+            return 200, repo.tarball(), 'application/x-gzip'
+        return self.json({'message': 'Not Found'}, 404)
+
+    def json(self, body, status: int = 200) -> tuple:
+        return status, json.dumps(body).encode(), 'application/json'
+
+    def repo_info(self, repo: SyntheticRepo) -> Dict:
+        return {
+            'name': repo.name, 'full_name': repo.full_name, 'description': 'Synthetic benchmark repository',
+            'language': 'Python', 'stargazers_count': 42, 'forks_count': 7,
+            'created_at': '2024-01-01T00:00:00Z', 'updated_at': '2024-06-01T00:00:00Z',
+            'size': sum(len(data) for data in repo.files.values()) // 1024, 'default_branch': 'main',
+            'topics': ['benchmark'], 'license': {'name': 'MIT License'}, 'fork': False, 'archived': False
+        }
+
+    def commit(self, repo: SyntheticRepo, n: int) -> Dict:
+        sha = repo.head_sha if n == 0 else hashlib.sha1(f"{repo.head_sha}:{n}".encode()).hexdigest()
+        return {'sha': sha, 'html_url': f"https://github.com/{repo.full_name}/commit/{sha}",
+                'commit': {'message': f"Change {n}\n\nDetails", 'author': {'name': f"dev{n % 3}",
+                                                                         'date': '2024-06-01T00:00:00Z'}}}
+
+
+class FakeGeminiModel:
+    """Stands in for genai.GenerativeModel: sleeps like a model call and returns summaries.
+
+    Latency is latency seconds plus per_1k_tokens seconds for every 1000
+    prompt tokens (estimated at 4 characters per token). Batch prompts get a
+    JSON object with one summary per "=== File N: name" section.
+    """
+
+    BATCH_SECTION = re.compile(r'^=== File (\d+): (\S+)', re.MULTILINE)
+
+    def __init__(self, latency: float = 0.2, per_1k_tokens: float = 0.01):
+        self.latency = latency
+        self.per_1k_tokens = per_1k_tokens
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt: str, request_options: dict = None):
+        prompt_tokens = len(prompt) // 4
+        time.sleep(self.latency + self.per_1k_tokens * prompt_tokens / 1000)
+        with self._lock:
+            self.calls += 1
+
+        sections = self.BATCH_SECTION.findall(prompt)
+        if sections:
+            text = json.dumps({file_id: f"Defines the handler and helper of {name}." for file_id, name in sections})
+        else:
+            text = "Defines a handler class and helper function for the module."
+        output_tokens = len(text) // 4
+        usage = SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=output_tokens,
+                                total_token_count=prompt_tokens + output_tokens)
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--files', type=int, default=40, help='files per synthetic repository')
+    parser.add_argument('--file-size', type=int, default=2000, help='approximate bytes per source file')
+    parser.add_argument('--latency-ms', type=float, default=30.0)
+    parser.add_argument('--jitter-ms', type=float, default=10.0)
+    parser.add_argument('--rate-limit', type=int, default=5000, help='requests per window')
+    parser.add_argument('--rate-window', type=float, default=3600, help='window length in seconds')
+    parser.add_argument('--org-repos', type=int, default=10, help='repositories listed for any organization')
+    args = parser.parse_args()
+
+    server = FakeGitHubServer(('127.0.0.1', args.port), repo_files=args.files, file_size=args.file_size,
+                              latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                              rate_limit=args.rate_limit, rate_window=args.rate_window, org_repos=args.org_repos)
+    print(f"Fake GitHub API on {server.url} (any /repos/<owner>/<name> exists)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Load test: drive /analyze end to end against the local GitHub and Gemini fakes
+
+Starts FakeGitHubServer, loads the Flask app with GITHUB_API_URL pointing at
+it and FakeGeminiModel in place of Gemini, serves it on a local port and sends
+--analyses POST /analyze requests at --concurrency. Reports throughput,
+p50/p95/p99 latency and GitHub/model calls per analysis, and writes them as
+JSON (--output) so runs can be compared (--baseline prints the differences).
+
+By default every request analyzes a different synthetic repository, so caches
+are cold; --warm repeats one repository to measure the cached path.
+"""
+import argparse
+import contextlib
+import importlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_services import FakeGeminiModel, FakeGitHubServer
+
+
+def percentile(values, fraction: float) -> float:
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    rank = max(int(round(fraction * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def state_environment(state_dir: str) -> dict:
+    """Environment variables that keep the app's on-disk state (caches, stores, ledger) in state_dir"""
+    return {
+        'SUMMARY_CACHE_PATH': os.path.join(state_dir, 'summary_cache.db'),
+        'ANALYSIS_STORE_PATH': os.path.join(state_dir, 'analysis_store.db'),
+        'TOKEN_USAGE_PATH': os.path.join(state_dir, 'token_usage.jsonl'),
+        'BATCH_STORE_PATH': os.path.join(state_dir, 'batch_store.db'),
+        'GIT_MIRROR_DIR': os.path.join(state_dir, 'git_mirrors'),
+    }
+
+
+def load_app(state_dir: str, github_url: str):
+    """Import app.py with its on-disk state (caches, stores, ledger) kept in state_dir.
+
+    Modules read these paths when they are first imported, so state_dir only
+    applies to the ones app.py is the first to import.
+    """
+    os.environ.update({
+        'GITHUB_API_URL': github_url,
+        # GraphQL is not faked; without a token the fetcher uses REST only
+        'GITHUB_TOKEN': '',
+        'GEMINI_API_KEY': 'fake',
+        **state_environment(state_dir)
+    })
+    return importlib.import_module('app')
+
+
+def serve(flask_app):
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, flask_app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='app-server', daemon=True).start()
+    return server
+
+
+def run_load(app_url: str, repos, scope: str, concurrency: int) -> tuple:
+    """POST /analyze once per repo name; returns (per-request records, wall seconds)"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    session.mount('http://', adapter)
+
+    def one(name: str) -> dict:
+        body = {'github_url': f"https://github.com/bench/{name}", 'scope': scope, 'incremental': False}
+        start = time.perf_counter()
+        try:
+            response = session.post(f"{app_url}/analyze", json=body, timeout=300)
+            ok = response.status_code == 200
+            data = response.json() if ok else {}
+            status = response.status_code
+        except requests.RequestException:
+            ok, data, status = False, {}, None
+        return {'seconds': time.perf_counter() - start, 'ok': ok, 'status': status,
+                'files': data.get('total_files_analyzed', 0)}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        records = list(pool.map(one, repos))
+    return records, time.perf_counter() - start
+
+
+def summarize(records, wall: float, github_stats: dict, model_calls: int, analyses: int) -> dict:
+    latencies = [record['seconds'] for record in records if record['ok']]
+    report = {
+        'analyses': analyses,
+        'succeeded': len(latencies),
+        'failed': analyses - len(latencies),
+        'wall_seconds': round(wall, 3),
+        'throughput_per_s': round(len(latencies) / wall, 3) if wall else None,
+        'latency_ms': None,
+        'files_per_analysis': round(sum(record['files'] for record in records) / analyses, 2),
+        'github_calls_per_analysis': round(github_stats['total_calls'] / analyses, 2),
+        'github_calls_by_endpoint': {endpoint: round(count / analyses, 2)
+                                     for endpoint, count in sorted(github_stats['calls'].items())},
+        'model_calls_per_analysis': round(model_calls / analyses, 2)
+    }
+    if latencies:
+        report['latency_ms'] = {
+            'p50': round(percentile(latencies, 0.50) * 1000, 1),
+            'p95': round(percentile(latencies, 0.95) * 1000, 1),
+            'p99': round(percentile(latencies, 0.99) * 1000, 1),
+            'max': round(max(latencies) * 1000, 1)
+        }
+    return report
+
+
+def print_report(results: dict, baseline: dict = None) -> None:
+    def delta(path):
+        if not baseline:
+            return ''
+        old, new = baseline['results'], results['results']
+        for key in path:
+            old, new = (old or {}).get(key), (new or {}).get(key)
+        if not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or not old:
+            return ''
+        return f"  ({(new - old) / old * 100:+.1f}% vs baseline)"
+
+    report = results['results']
+    print(f"analyses {report['analyses']} ok {report['succeeded']} failed {report['failed']} "
+          f"in {report['wall_seconds']} s")
+    print(f"throughput            {report['throughput_per_s']} analyses/s{delta(['throughput_per_s'])}")
+    if report['latency_ms']:
+        for name in ('p50', 'p95', 'p99'):
+            print(f"latency {name}           {report['latency_ms'][name]} ms{delta(['latency_ms', name])}")
+    print(f"github calls/analysis {report['github_calls_per_analysis']}{delta(['github_calls_per_analysis'])}  "
+          f"{report['github_calls_by_endpoint']}")
+    print(f"model calls/analysis  {report['model_calls_per_analysis']}{delta(['model_calls_per_analysis'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--analyses', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--scope', choices=('sample', 'repository'), default='sample')
+    parser.add_argument('--warm', action='store_true', help='analyze the same repository every time')
+    parser.add_argument('--files', type=int, default=40, help='files per synthetic repository')
+    parser.add_argument('--file-size', type=int, default=2000, help='approximate bytes per source file')
+    parser.add_argument('--github-latency-ms', type=float, default=30.0)
+    parser.add_argument('--github-jitter-ms', type=float, default=10.0)
+    parser.add_argument('--rate-limit', type=int, default=5000, help='GitHub requests per window')
+    parser.add_argument('--rate-window', type=float, default=3600, help='rate limit window in seconds')
+    parser.add_argument('--llm-latency-ms', type=float, default=300.0)
+    parser.add_argument('--llm-ms-per-1k-tokens', type=float, default=20.0)
+    parser.add_argument('--output', help='JSON results file (default benchmarks/results/load_test-<time>.json)')
+    parser.add_argument('--baseline', help='earlier JSON results to compare against')
+    args = parser.parse_args()
+
+    github = FakeGitHubServer(repo_files=args.files, file_size=args.file_size,
+                              latency=args.github_latency_ms / 1000, jitter=args.github_jitter_ms / 1000,
+                              rate_limit=args.rate_limit, rate_window=args.rate_window).start()
+    model = FakeGeminiModel(latency=args.llm_latency_ms / 1000, per_1k_tokens=args.llm_ms_per_1k_tokens / 1000)
+
+    # The app reports progress with print(); only the results below are wanted
+    with tempfile.TemporaryDirectory(prefix='load_test-') as state_dir, open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull):
+        app_module = load_app(state_dir, github.url)
+        app_module.code_summarizer.model = model
+        app_server = serve(app_module.app)
+        app_url = f"http://127.0.0.1:{app_server.server_port}"
+
+        repos = ['warm-repo'] * args.analyses if args.warm else [f"repo-{n}" for n in range(args.analyses)]
+        if args.warm:
+            # Prime the caches so every measured request takes the cached path
+            run_load(app_url, repos[:1], args.scope, 1)
+        github_before, model_before = github.get_stats(), model.calls
+        records, wall = run_load(app_url, repos, args.scope, args.concurrency)
+        github_after = github.get_stats()
+
+        app_server.shutdown()
+        app_module.token_tracker.close()
+
+    calls = {endpoint: count - github_before['calls'].get(endpoint, 0)
+             for endpoint, count in github_after['calls'].items()}
+    github_stats = {'calls': {endpoint: count for endpoint, count in calls.items() if count},
+                    'total_calls': github_after['total_calls'] - github_before['total_calls']}
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'config': {name: value for name, value in vars(args).items() if name not in ('output', 'baseline')},
+        'results': summarize(records, wall, github_stats, model.calls - model_before, args.analyses)
+    }
+    github.shutdown()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results',
+                                         f"load_test-{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+import ast
+import os
+import re
+from typing import Dict, List, Optional, Tuple, Union
+
+# Comment syntaxes, replaced by blank lines before matching so commented-out
+# code is not counted and line anchors still line up
+C_COMMENTS = re.compile(r'//[^\n]*|/\*.*?\*/', re.DOTALL)
+HASH_COMMENTS = re.compile(r'#[^\n]*')
+PHP_COMMENTS = re.compile(r'//[^\n]*|#[^\n]*|/\*.*?\*/', re.DOTALL)
+SQL_COMMENTS = re.compile(r'--[^\n]*|/\*.*?\*/', re.DOTALL)
+MARKUP_COMMENTS = re.compile(r'<!--.*?-->', re.DOTALL)
+
+# Keywords that look like calls or typed declarations but are control flow
+NOT_A_FUNCTION = r'(?!(?:if|for|while|switch|catch|return|new|else|do|try|sizeof|using|lock|foreach)\b)'
+
+# A rule is one pattern or a tuple of patterns whose counts add up. re only skips ahead
+# quickly to a match candidate when every alternative starts with a literal, so
+# alternations mixing a ^ anchor or a leading \b with other branches are split into
+# separate patterns, and keyword rules check the word boundary behind the keyword
+# ((?<!\wif) rather than \bif); each pattern is then one fast scan of the text.
+C_DECISIONS = (r'(?:if(?<!\wif)|for(?<!\wfor)|while(?<!\wwhile)|case(?<!\wcase)|catch(?<!\wcatch))\b',
+               r'&&|\|\|', r'\?(?![.?:])')
+
+Rule = Union[str, Tuple[str, ...], None]
+
+def _rules(functions: Rule, classes: Rule, imports: Rule, decisions: Rule, docs: Rule,
+           comments: Optional[re.Pattern]) -> Dict:
+    compile_rule = lambda rule: tuple(re.compile(pattern, re.MULTILINE)
+                                      for pattern in ((rule,) if isinstance(rule, str) else rule)) if rule else None
+    return {
+        'functions': compile_rule(functions),
+        'classes': compile_rule(classes),
+        'imports': compile_rule(imports),
+        'decisions': compile_rule(decisions),
+        'docs': compile_rule(docs),
+        'comments': comments
+    }
+
+JS_RULES = _rules(
+    # Methods are matched up to their brace without crossing a function keyword or an
+    # arrow, so a definition is counted by only one of the two patterns
+    functions=(r'function(?<!\wfunction)\b\s*\*?\s*[\w$]*\s*\(|=>',
+               r'^[ \t]*(?:(?:async|static|get|set|public|private|protected)\s+)*(?!function\b)' + NOT_A_FUNCTION
+               + r'[A-Za-z_$][\w$]*\s*\((?:[^)\n=]|=(?!>))*\)\s*(?::\s*(?:[^{\n=]|=(?!>))+)?\{'),
+    classes=r'^[ \t]*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?(?:class|interface|enum)\s+[\w$]+',
+    imports=(r'^[ \t]*import\b', r'require(?<!\wrequire)\s*\('),
+    decisions=C_DECISIONS,
+    docs=r'/\*\*',
+    comments=C_COMMENTS
+)
+
+JVM_RULES = _rules(
+    functions=r'^[ \t]*(?:@\w+\s+)*(?:(?:public|private|protected|internal|static|final|abstract|synchronized|override|'
+              r'virtual|async|extern|sealed|unsafe|open|suspend|inline)\s+)*(?:fun\s+[\w.<>]+\s*\(|def\s+\w+|func\s+\w+|'
+              + NOT_A_FUNCTION + r'[\w<>\[\].,?]+\s+' + NOT_A_FUNCTION + r'\w+\s*\([^;{)]*\)\s*(?:throws\s+[\w.,\s]+)?\{)',
+    classes=r'^[ \t]*(?:(?:public|private|protected|internal|static|final|abstract|sealed|data|open|partial)\s+)*'
+            r'(?:class|interface|enum|struct|record|object|trait|protocol|extension)\s+\w+',
+    imports=r'^[ \t]*(?:import|using)\s+[\w.]',
+    decisions=C_DECISIONS,
+    docs=r'/\*\*|^[ \t]*///',
+    comments=C_COMMENTS
+)
+
+C_RULES = _rules(
+    functions=r'^' + NOT_A_FUNCTION + r'[A-Za-z_][\w \t\*&:<>,~]*?\b' + NOT_A_FUNCTION
+              + r'[\w:~]+\s*\([^;{}()]*(?:\([^)]*\)[^;{}()]*)*\)\s*(?:const\s*)?(?:noexcept\s*)?(?:override\s*)?\{',
+    classes=r'^[ \t]*(?:typedef\s+)?(?:class|struct|union|enum)\s+\w+[^;(]*\{',
+    imports=r'^[ \t]*#\s*include\b',
+    decisions=C_DECISIONS,
+    docs=r'/\*\*|^[ \t]*///',
+    comments=C_COMMENTS
+)
+
+LANGUAGE_RULES = {
+    # Only used for Python that ast cannot parse or that is over ast_max_bytes
+    'Python': _rules(
+        functions=r'^[ \t]*(?:async[ \t]+)?def[ \t]+\w+',
+        classes=r'^[ \t]*class[ \t]+\w+',
+        imports=r'^[ \t]*(?:import[ \t]+\w|from[ \t]+[\w.]+[ \t]+import\b)',
+        decisions=r'\b(?:if|elif|for|while|except|and|or|assert)\b',
+        docs=r'^[ \t]*(?:async[ \t]+)?(?:def|class)\b[^\n]*:[ \t]*\n[ \t]*[rRuU]?(?:"""|\'\'\')',
+        comments=HASH_COMMENTS
+    ),
+    'JavaScript': JS_RULES,
+    'TypeScript': JS_RULES,
+    'React JSX': JS_RULES,
+    'React TSX': JS_RULES,
+    'Java': JVM_RULES,
+    'C#': JVM_RULES,
+    'Kotlin': JVM_RULES,
+    'Swift': JVM_RULES,
+    'Scala': JVM_RULES,
+    'C': C_RULES,
+    'C++': C_RULES,
+    'Go': _rules(
+        functions=r'^func\b',
+        classes=r'^type\s+\w+\s+(?:struct|interface)\b',
+        imports=r'^import\s+(?:[\w.]+\s+)?"|^\s+(?:[\w.]+\s+)?"[\w./-]+"\s*$',
+        decisions=r'\b(?:if|for|case|select)\b|&&|\|\|',
+        docs=r'^//\s*[A-Z]\w*\s',
+        comments=None
+    ),
+    'Rust': _rules(
+        functions=r'^[ \t]*(?:(?:pub(?:\([^)]*\))?|const|async|unsafe|extern\s+"[^"]*")\s+)*fn\s+\w+',
+        classes=r'^[ \t]*(?:pub(?:\([^)]*\))?\s+)?(?:struct|enum|trait|union)\s+\w+',
+        imports=r'^[ \t]*(?:pub(?:\([^)]*\))?\s+)?use\s+[\w:{]',
+        decisions=(r'(?:if(?<!\wif)|for(?<!\wfor)|while(?<!\wwhile)|loop(?<!\wloop))\b', r'=>|&&|\|\|',
+                   r'\?(?=[;.)\s])'),
+        docs=r'^[ \t]*//[/!]',
+        comments=None
+    ),
+    'PHP': _rules(
+        functions=r'\bfunction\s+&?\w+\s*\(',
+        classes=r'^[ \t]*(?:abstract\s+|final\s+)?(?:class|interface|trait|enum)\s+\w+',
+        imports=r'^[ \t]*(?:use\s+[\w\\]+|(?:require|include)(?:_once)?\b)',
+        decisions=r'\b(?:if|elseif|for|foreach|while|case|catch)\b|&&|\|\||\?(?![>?:])',
+        docs=r'/\*\*',
+        comments=PHP_COMMENTS
+    ),
+    'Ruby': _rules(
+        functions=r'^[ \t]*def\s+',
+        classes=r'^[ \t]*(?:class|module)\s+[A-Z]',
+        imports=r'^[ \t]*require(?:_relative)?\b',
+        decisions=r'\b(?:if|unless|elsif|while|until|for|when|rescue)\b|&&|\|\|',
+        docs=None,
+        comments=HASH_COMMENTS
+    ),
+    'Shell Script': _rules(
+        functions=r'^[ \t]*(?:function\s+[\w-]+|[\w-]+\s*\(\s*\))',
+        classes=None,
+        imports=r'^[ \t]*(?:source|\.)\s+\S',
+        decisions=r'\b(?:if|elif|for|while|until|case)\b|&&|\|\|',
+        docs=None,
+        comments=HASH_COMMENTS
+    ),
+    'SQL': _rules(
+        functions=r'^[ \t]*CREATE\s+(?:OR\s+REPLACE\s+)?(?:FUNCTION|PROCEDURE|TRIGGER)\b',
+        classes=r'^[ \t]*CREATE\s+(?:OR\s+REPLACE\s+)?(?:TABLE|VIEW)\b',
+        imports=None,
+        decisions=r'\b(?:CASE|WHEN|IF|WHILE|AND|OR)\b',
+        docs=None,
+        comments=SQL_COMMENTS
+    ),
+    'HTML': _rules(None, None, r'<script\b[^>]*\bsrc=|<link\b[^>]*\bhref=', None, None, MARKUP_COMMENTS),
+    'CSS': _rules(None, None, r'^[ \t]*@import\b', None, None, C_COMMENTS),
+    'SCSS': _rules(r'^[ \t]*@(?:mixin|function)\s+', None, r'^[ \t]*@(?:import|use|forward)\b', r'^[ \t]*@(?:if|else if|each|for|while)\b',
+                   None, C_COMMENTS),
+}
+
+# Case-insensitive keywords in SQL
+LANGUAGE_RULES['SQL'] = {name: tuple(re.compile(pattern.pattern, pattern.flags | re.IGNORECASE) for pattern in rule)
+                         if isinstance(rule, tuple) else rule
+                         for name, rule in LANGUAGE_RULES['SQL'].items()}
+
+# Extensions _get_file_type reports as plain 'Code' that still have a rule table
+EXTENSION_LANGUAGES = {'h': 'C', 'hpp': 'C++', 'cc': 'C++', 'scala': 'Scala', 'bash': 'Shell Script', 'less': 'CSS'}
+
+PYTHON_FUNCTIONS = {ast.FunctionDef, ast.AsyncFunctionDef}
+PYTHON_IMPORTS = {ast.Import, ast.ImportFrom}
+PYTHON_DECISIONS = {ast.If, ast.For, ast.AsyncFor, ast.While, ast.IfExp, ast.ExceptHandler, ast.Assert}
+PYTHON_MATCH_CASE = getattr(ast, 'match_case', None)
+# Nodes that can hold no definitions or branches, so the walk does not descend into them
+PYTHON_LEAVES = {ast.Name, ast.Constant, ast.Load, ast.Store, ast.Del, ast.alias, ast.arg,
+                 ast.Pass, ast.Break, ast.Continue}
+COMMENT_PREFIXES = ['# ', '// ', '/* ', '* ', '"""', "'''"]
+
+class CodeAnalyzer:
+    """Structural analysis of source files: ast for Python, precompiled regex tables for the rest"""
+
+    def __init__(self, ast_max_bytes: int = None):
+        self.ast_max_bytes = ast_max_bytes or int(os.environ.get('ANALYZER_AST_MAX_BYTES', 1024 * 1024))
+
+    def analyze(self, code_content: str, language: str, filename: str = '') -> Dict:
+        """Count functions, classes, imports and docstrings and estimate cyclomatic complexity"""
+        ext = filename.lower().rsplit('.', 1)[-1] if '.' in filename else ''
+        language = EXTENSION_LANGUAGES.get(ext, language) if language == 'Code' else language
+
+        analysis = None
+        if language == 'Python':
+            analysis = self._analyze_python(code_content)
+        if analysis is None:
+            analysis = self._analyze_with_rules(code_content, LANGUAGE_RULES.get(language))
+
+        lines = code_content.splitlines()
+        analysis['lines'] = len(lines)
+        analysis['language'] = language
+        if not analysis.get('purpose'):
+            analysis['purpose'] = self._find_purpose(lines)
+
+        definitions = analysis['functions'] + analysis['classes']
+        complexity = analysis['cyclomatic_complexity']
+        if definitions > 10 or complexity > 50:
+            analysis['complexity'] = 'high'
+        elif definitions > 3 or complexity > 15:
+            analysis['complexity'] = 'medium'
+        else:
+            analysis['complexity'] = 'low'
+        return analysis
+
+    def _analyze_python(self, code_content: str) -> Optional[Dict]:
+        if len(code_content) > self.ast_max_bytes:
+            # Parsing costs far more than scanning; very large modules get the regex table
+            return None
+        try:
+            tree = ast.parse(code_content)
+        except (SyntaxError, ValueError):
+            # Python 2 or broken files fall back to the regex rules
+            return None
+
+        analysis = {'functions': 0, 'classes': 0, 'imports': 0, 'docstrings': 0, 'purpose': ''}
+        module_doc = ast.get_docstring(tree)
+        if module_doc:
+            analysis['docstrings'] += 1
+            first_line = module_doc.strip().splitlines()[0]
+            analysis['purpose'] = first_line[:100] + ('...' if len(first_line) > 100 else '')
+
+        # One pass over the tree; scopes[0] is module-level code, then one entry per function
+        scopes = [1]
+        stack = [(node, 0) for node in ast.iter_child_nodes(tree)]
+        while stack:
+            node, scope = stack.pop()
+            node_type = type(node)
+            if node_type in PYTHON_LEAVES:
+                continue
+            if node_type in PYTHON_FUNCTIONS:
+                analysis['functions'] += 1
+                analysis['docstrings'] += ast.get_docstring(node) is not None
+                scope = len(scopes)
+                scopes.append(1)
+            elif node_type is ast.ClassDef:
+                analysis['classes'] += 1
+                analysis['docstrings'] += ast.get_docstring(node) is not None
+            elif node_type in PYTHON_IMPORTS:
+                analysis['imports'] += 1
+                continue
+            elif node_type in PYTHON_DECISIONS:
+                scopes[scope] += 1
+            elif node_type is ast.BoolOp:
+                scopes[scope] += len(node.values) - 1
+            elif node_type is ast.comprehension:
+                scopes[scope] += 1 + len(node.ifs)
+            elif node_type is PYTHON_MATCH_CASE:
+                scopes[scope] += 1
+            stack.extend((child, scope) for child in ast.iter_child_nodes(node))
+
+        analysis['cyclomatic_complexity'] = sum(scopes)
+        analysis['max_function_complexity'] = max(scopes[1:], default=0)
+        return analysis
+
+    def _analyze_with_rules(self, code_content: str, rules: Optional[Dict]) -> Dict:
+        analysis = {'functions': 0, 'classes': 0, 'imports': 0, 'docstrings': 0,
+                    'cyclomatic_complexity': 0, 'purpose': ''}
+        if rules is None:
+            return analysis
+
+        if rules['docs']:
+            analysis['docstrings'] = sum(len(pattern.findall(code_content)) for pattern in rules['docs'])
+        code = code_content
+        if rules['comments']:
+            code = rules['comments'].sub(lambda match: '\n' * match.group().count('\n'), code)
+
+        for key in ('functions', 'classes', 'imports'):
+            if rules[key]:
+                analysis[key] = sum(len(pattern.findall(code)) for pattern in rules[key])
+        if rules['decisions']:
+            analysis['cyclomatic_complexity'] = 1 + sum(len(pattern.findall(code)) for pattern in rules['decisions'])
+        return analysis
+
+    def _find_purpose(self, lines: List[str]) -> str:
+        # Look for purpose in comments
+        for line in lines[:15]:
+            s = line.strip()
+            if any(s.startswith(p) for p in COMMENT_PREFIXES):
+                comment = s
+                for p in COMMENT_PREFIXES:
+                    comment = comment.replace(p, '').strip()
+                if len(comment) > 20 and not comment.lower().startswith(('todo', 'fixme', 'hack')):
+                    return comment[:100] + ('...' if len(comment) > 100 else '')
+        return ''
@@ -0,0 +1,113 @@
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+
+# File names that usually start a program or define a package's public surface
+ENTRY_POINT_NAMES = {
+    'main.py', '__main__.py', 'app.py', 'manage.py', 'wsgi.py', 'asgi.py', 'server.py', 'cli.py', '__init__.py',
+    'index.js', 'index.ts', 'index.jsx', 'index.tsx', 'main.js', 'main.ts', 'app.js', 'app.ts', 'server.js',
+    'main.go', 'main.rs', 'lib.rs', 'mod.rs', 'main.c', 'main.cpp', 'program.cs', 'main.java', 'application.java',
+    'index.php', 'main.swift', 'main.kt', 'main.rb'
+}
+# Directories whose files are rarely what a reader wants explained first
+LOW_VALUE_DIRS = {
+    'test', 'tests', '__tests__', 'spec', 'specs', 'testdata', 'fixtures', 'docs', 'doc', 'examples', 'example',
+    'vendor', 'node_modules', 'third_party', 'dist', 'build', 'migrations', '.github'
+}
+# Data, markup and config files: listed as code, but worth less than source
+LOW_VALUE_EXTENSIONS = {'json', 'yml', 'yaml', 'xml', 'md', 'css', 'scss', 'less', 'html', 'lock'}
+README_NAMES = ('readme.md', 'readme.rst', 'readme.txt', 'readme')
+
+IDENTIFIER = re.compile(r'[A-Za-z_][\w-]{2,}')
+
+class FileRanker:
+    """Orders repository files by how much a summary of them tells a reader about the project"""
+
+    def find_readme(self, files: List[Dict]) -> Optional[Dict]:
+        """The top-level README in a listing, if there is one"""
+        for file_info in files:
+            if file_info['type'] == 'file' and '/' not in file_info['path'] \
+                    and file_info['name'].lower() in README_NAMES:
+                return file_info
+        return None
+
+    def rank(self, files: List[Dict], contents: Optional[Dict[str, str]] = None,
+             readme: Optional[str] = None) -> List[Dict]:
+        """Score files from highest to lowest importance.
+
+        Without contents only path and size signals are used; with them, files
+        are also scored by how many other files mention their module name.
+        Returns dicts with file, score and reasons (human-readable signals).
+        """
+        references = self._reference_counts(files, contents) if contents else {}
+        readme_text = readme.lower() if readme else ''
+
+        ranked = []
+        for file_info in files:
+            path = file_info['path']
+            name = file_info['name'].lower()
+            ext = name.rsplit('.', 1)[-1] if '.' in name else ''
+            directories = [part.lower() for part in path.split('/')[:-1]]
+            score, reasons = 0.0, []
+
+            if name in ENTRY_POINT_NAMES:
+                score += 5
+                reasons.append('entry point')
+            if readme_text and (path.lower() in readme_text or
+                                (len(name) > 6 and name in readme_text)):
+                score += 4
+                reasons.append('mentioned in README')
+            refs = references.get(path, 0)
+            if refs:
+                score += 2 * math.log2(1 + refs)
+                reasons.append(f'referenced by {refs} file(s)')
+
+            size = file_info.get('size') or 0
+            if size < 200:
+                score -= 2
+            else:
+                score += min(math.log2(1 + size / 1024), 4)
+
+            score -= min(0.5 * max(len(directories) - 1, 0), 2)
+            if any(directory in LOW_VALUE_DIRS for directory in directories):
+                score -= 4
+                reasons.append('test, docs or vendored code')
+            if ext in LOW_VALUE_EXTENSIONS:
+                score -= 3
+                reasons.append('data or markup')
+
+            ranked.append({'file': file_info, 'score': round(score, 2), 'reasons': reasons})
+
+        # Stable on ties, so listing order (shallow paths first) breaks them
+        ranked.sort(key=lambda item: -item['score'])
+        return ranked
+
+    def _reference_counts(self, files: List[Dict], contents: Dict[str, str]) -> Dict[str, int]:
+        """How many other files contain each file's module name as an identifier"""
+        document_frequency = Counter()
+        identifiers = {}
+        for path, text in contents.items():
+            identifiers[path] = set(IDENTIFIER.findall(text))
+            document_frequency.update(identifiers[path])
+
+        counts = {}
+        for file_info in files:
+            module = self._module_name(file_info['path'])
+            if not module:
+                continue
+            count = document_frequency.get(module, 0)
+            if module in identifiers.get(file_info['path'], ()):
+                count -= 1
+            if count > 0:
+                counts[file_info['path']] = count
+        return counts
+
+    def _module_name(self, path: str) -> Optional[str]:
+        # index.js and __init__.py are imported by their directory's name
+        directory, name = os.path.split(path)
+        stem = name.split('.', 1)[0]
+        if stem in ('index', '__init__', 'mod'):
+            stem = os.path.basename(directory)
+        return stem if len(stem) >= 3 else None
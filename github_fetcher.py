@@ -1,12 +1,78 @@
 import requests
 import base64
-from typing import Dict, List, Optional
+import tarfile
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 import os
-from datetime import datetime
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import DefaultCookiePolicy
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils.http_cache import ResponseCache
+from utils.rate_limiter import RateLimitExceeded, RateLimitScheduler
+from utils.metrics import GITHUB_REQUEST_SECONDS
+
+def create_session(pool_size: int = 20, max_retries: int = 3, backoff_factor: float = 0.3) -> requests.Session:
+    """Create a pooled keep-alive session with retry/backoff on transient errors"""
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    # pool_block keeps the number of open sockets per host at pool_size even
+    # when more Flask threads than that are issuing requests at once
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry, pool_block=True)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    # The session is shared between worker threads; refusing cookies keeps
+    # its only mutable per-request state out of the picture
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+# Everything /analyze needs before listing files, in a single round trip
+OVERVIEW_QUERY = """
+query($owner: String!, $name: String!, $expression: String!, $commits: Int!) {
+  rateLimit { limit remaining resetAt }
+  repository(owner: $owner, name: $name) {
+    name
+    nameWithOwner
+    description
+    stargazerCount
+    forkCount
+    createdAt
+    updatedAt
+    diskUsage
+    primaryLanguage { name }
+    licenseInfo { name }
+    repositoryTopics(first: 20) { nodes { topic { name } } }
+    defaultBranchRef { name }
+    object(expression: $expression) {
+      ... on Commit {
+        oid
+        tree { oid }
+        history(first: $commits) {
+          nodes { oid messageHeadline url author { name date } }
+        }
+      }
+    }
+  }
+}
+"""
 
 class GitHubFetcher:
-    def __init__(self):
-        self.base_url = "https://api.github.com"
+    def __init__(self, base_url: Optional[str] = None, session: Optional[requests.Session] = None,
+                 pool_size: Optional[int] = None, max_retries: Optional[int] = None,
+                 backoff_factor: Optional[float] = None, response_cache: Optional[ResponseCache] = None,
+                 scheduler: Optional[RateLimitScheduler] = None):
+        self.base_url = (base_url or os.environ.get('GITHUB_API_URL') or "https://api.github.com").rstrip('/')
         self.headers = {
             'Accept': 'application/vnd.github.v3+json',
             'User-Agent': 'GitHub-Repo-Reader'
@@ -14,54 +80,319 @@ class GitHubFetcher:
         
         # Add GitHub token if available (silently)
         github_token = os.environ.get('GITHUB_TOKEN')
+        self.github_token = None
         if github_token and github_token != 'your_github_token_here':
+            self.github_token = github_token
             self.headers['Authorization'] = f'token {github_token}'
+        self.graphql_url = os.environ.get('GITHUB_GRAPHQL_URL') or f"{self.base_url}/graphql"
+
+        # One pooled session per fetcher, reused by every request and thread
+        if session is None:
+            session = create_session(
+                pool_size=pool_size or int(os.environ.get('GITHUB_POOL_SIZE', 20)),
+                max_retries=max_retries if max_retries is not None else int(os.environ.get('GITHUB_MAX_RETRIES', 3)),
+                backoff_factor=backoff_factor if backoff_factor is not None else float(os.environ.get('GITHUB_RETRY_BACKOFF', 0.3))
+            )
+        self.session = session
+
+        # ETag/Last-Modified cache; 304 replies do not count against the rate limit
+        self.response_cache = response_cache or ResponseCache()
+
+        # Rate limit budget tracked from response headers
+        self.scheduler = scheduler or RateLimitScheduler()
+
+    def _get(self, url: str, timeout: int = 10, priority: Optional[str] = 'high', **kwargs) -> requests.Response:
+        """Issue a GET through the shared session, revalidating cached responses.
+
+        priority is 'high' or 'low' for budgeted requests (low ones are shed
+        first when the rate limit runs low) or None for calls that do not
+        count against the limit. Raises RateLimitExceeded when the scheduler
+        refuses the request or GitHub answers it with a rate limit error; the
+        public methods let it through instead of reporting missing data.
+        """
+        if priority is not None:
+            self.scheduler.acquire(priority)
+        with GITHUB_REQUEST_SECONDS.time(endpoint=self._endpoint(url), status='error') as labels:
+            response = self._send(url, timeout, reserved=priority is not None, **kwargs)
+            labels['status'] = response.status_code
+        self.scheduler.update(response.headers)
+        if response.status_code in (403, 429) and self._rate_limited(response):
+            response.close()
+            raise RateLimitExceeded(f'GitHub answered {response.status_code}: rate limit exceeded')
+        return response
+
+    def _rate_limited(self, response: requests.Response) -> bool:
+        """Whether a 403/429 is GitHub's primary or secondary rate limit rather than a permission error"""
+        if 'Retry-After' in response.headers:
+            return True
+        try:
+            return int(response.headers['X-RateLimit-Remaining']) <= 0
+        except (KeyError, ValueError):
+            return False
+
+    def _endpoint(self, url: str) -> str:
+        """Low-cardinality metric label for a request URL, e.g. 'contents' or 'rate_limit'"""
+        parts = url[len(self.base_url):].strip('/').split('/') if url.startswith(self.base_url) else ['other']
+        if parts[0] == 'repos':
+            return parts[3] if len(parts) > 3 else 'repo'
+        return parts[0]
+
+    def _send(self, url: str, timeout: int, reserved: bool = False, **kwargs) -> requests.Response:
+        request_headers = {**self.headers, **kwargs.pop('headers', {})}
+        if kwargs.get('stream'):
+            return self.session.get(url, headers=request_headers, timeout=timeout, **kwargs)
+
+        # Extra headers such as Accept change the representation, so they are part of the key
+        variant = {**(kwargs.get('params') or {}), **{name: value for name, value in request_headers.items()
+                                                       if self.headers.get(name) != value}}
+        key = self.response_cache.make_key(url, variant, self.headers.get('Authorization'))
+        cached = self.response_cache.get(key)
+        headers = {**request_headers, **self.response_cache.validators(cached)} if cached else request_headers
+
+        response = self.session.get(url, headers=headers, timeout=timeout, **kwargs)
+        if response.status_code == 304 and cached:
+            if reserved:
+                # Conditional requests answered 304 do not count against the rate limit
+                self.scheduler.release()
+            return self.response_cache.revalidated(cached, response)
+
+        self.response_cache.record_miss()
+        if response.status_code == 200:
+            self.response_cache.store(key, response)
+        return response
+
+    def close(self) -> None:
+        """Release pooled connections"""
+        self.session.close()
     
     def get_repo_info(self, owner: str, repo: str) -> Optional[Dict]:
         """Get basic repository information"""
         try:
             url = f"{self.base_url}/repos/{owner}/{repo}"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self._get(url)
             
             if response.status_code == 200:
-                data = response.json()
-                return {
-                    'name': data['name'],
-                    'full_name': data['full_name'],
-                    'description': data.get('description', 'No description available'),
-                    'language': data.get('language', 'Unknown'),
-                    'stars': data['stargazers_count'],
-                    'forks': data['forks_count'],
-                    'created_at': data['created_at'],
-                    'updated_at': data['updated_at'],
-                    'size': data['size'],
-                    'default_branch': data['default_branch'],
-                    'topics': data.get('topics', []),
-                    'license': data.get('license', {}).get('name', 'No license') if data.get('license') else 'No license'
-                }
+                return self._repo_info(response.json())
             return None
                 
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            return None
+
+    def _repo_info(self, data: Dict) -> Dict:
+        return {
+            'name': data['name'],
+            'full_name': data['full_name'],
+            'description': data.get('description', 'No description available'),
+            'language': data.get('language', 'Unknown'),
+            'stars': data['stargazers_count'],
+            'forks': data['forks_count'],
+            'created_at': data['created_at'],
+            'updated_at': data['updated_at'],
+            'size': data['size'],
+            'default_branch': data['default_branch'],
+            'topics': data.get('topics', []),
+            'license': data.get('license', {}).get('name', 'No license') if data.get('license') else 'No license'
+        }
+
+    def list_owner_repos(self, owner: str, include_forks: bool = False, include_archived: bool = False,
+                         limit: Optional[int] = None) -> Optional[List[Dict]]:
+        """Public repositories of an organization (or, failing that, a user).
+
+        Entries have the get_repo_info shape, so callers analyzing them can
+        skip the per-repository lookup. Returns None if the owner is unknown.
+        """
+        try:
+            for kind in ('orgs', 'users'):
+                url = f"{self.base_url}/{kind}/{owner}/repos"
+                repos, page = [], 1
+                while True:
+                    response = self._get(url, params={'per_page': 100, 'page': page, 'type': 'public'})
+                    if response.status_code != 200:
+                        break
+                    items = response.json()
+                    repos.extend(self._repo_info(item) for item in items
+                                 if (include_forks or not item.get('fork'))
+                                 and (include_archived or not item.get('archived')))
+                    if len(items) < 100 or (limit and len(repos) >= limit):
+                        return repos[:limit] if limit else repos
+                    page += 1
+                if page > 1:
+                    return repos
+            return None
+        except RateLimitExceeded:
+            raise
         except Exception as e:
             return None
     
-    def get_repo_files(self, owner: str, repo: str, path: str = "") -> List[Dict]:
+    def get_repo_overview(self, owner: str, repo: str, ref: Optional[str] = None, commit_limit: int = 10) -> Optional[Dict]:
+        """Get repo info, tree OID, recent commits and rate limit in one GraphQL call.
+
+        Returns {'repo_info', 'ref', 'head_sha', 'tree_oid', 'commits', 'rate_limit'} with the
+        same shapes as get_repo_info, get_recent_commits and get_rate_limit_info
+        (rate_limit is the GraphQL budget, not the REST one). Returns None when no
+        token is configured, since GraphQL requires one, or when the query fails;
+        callers fall back to the REST methods.
+        """
+        if not self.github_token:
+            return None
+        try:
+            variables = {'owner': owner, 'name': repo, 'expression': ref or 'HEAD', 'commits': commit_limit}
+            headers = {**self.headers, 'Authorization': f'bearer {self.github_token}'}
+            # GraphQL has its own points budget, so its headers are kept away from the REST scheduler
+            with GITHUB_REQUEST_SECONDS.time(endpoint='graphql', status='error') as labels:
+                response = self.session.post(self.graphql_url, json={'query': OVERVIEW_QUERY, 'variables': variables},
+                                             headers=headers, timeout=10)
+                labels['status'] = response.status_code
+            if response.status_code != 200:
+                return None
+
+            payload = response.json()
+            data = payload.get('data') or {}
+            repository = data.get('repository')
+            if payload.get('errors') or not repository or not repository.get('object'):
+                return None
+
+            target = repository['object']
+            license_info = repository.get('licenseInfo')
+            rate_limit = data['rateLimit']
+            reset = int(datetime.strptime(rate_limit['resetAt'], '%Y-%m-%dT%H:%M:%SZ')
+                        .replace(tzinfo=timezone.utc).timestamp())
+            return {
+                'repo_info': {
+                    'name': repository['name'],
+                    'full_name': repository['nameWithOwner'],
+                    'description': repository.get('description', 'No description available'),
+                    'language': (repository.get('primaryLanguage') or {}).get('name', 'Unknown'),
+                    'stars': repository['stargazerCount'],
+                    'forks': repository['forkCount'],
+                    'created_at': repository['createdAt'],
+                    'updated_at': repository['updatedAt'],
+                    'size': repository['diskUsage'],
+                    'default_branch': repository['defaultBranchRef']['name'],
+                    'topics': [node['topic']['name'] for node in repository['repositoryTopics']['nodes']],
+                    'license': license_info['name'] if license_info else 'No license'
+                },
+                'ref': ref or repository['defaultBranchRef']['name'],
+                'head_sha': target['oid'],
+                'tree_oid': target['tree']['oid'],
+                'commits': [
+                    {
+                        'sha': commit['oid'][:7],
+                        'message': commit['messageHeadline'],
+                        'author': commit['author']['name'],
+                        'date': commit['author']['date'],
+                        'url': commit['url']
+                    }
+                    for commit in target['history']['nodes']
+                ],
+                'rate_limit': {
+                    'limit': rate_limit['limit'],
+                    'remaining': rate_limit['remaining'],
+                    'reset': reset,
+                    'reset_time': datetime.fromtimestamp(reset).isoformat()
+                }
+            }
+        except Exception as e:
+            return None
+
+    def get_repo_files(self, owner: str, repo: str, path: str = "", ref: Optional[str] = None) -> List[Dict]:
         """Get repository file structure"""
         try:
             url = f"{self.base_url}/repos/{owner}/{repo}/contents/{path}"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self._get(url, params={'ref': ref} if ref else None)
             
             if response.status_code == 200:
                 return response.json()
             return []
                 
+        except RateLimitExceeded:
+            raise
         except Exception as e:
             return []
     
-    def get_file_content(self, owner: str, repo: str, file_path: str) -> Optional[str]:
+    def get_repo_tree(self, owner: str, repo: str, ref: str = "HEAD") -> Optional[List[Dict]]:
+        """Get the full file index of a repository via the Git Trees API.
+
+        Entries mirror the contents listing (name, path, type 'file'/'dir',
+        size) and add the git mode and blob SHA. Returns None if the tree
+        cannot be read, so callers can fall back to get_repo_files.
+        """
+        try:
+            data = self._get_tree(owner, repo, ref, recursive=True)
+            if data is None:
+                return None
+            if not data.get('truncated'):
+                return self._tree_entries(data['tree'], '')
+
+            # Listing was cut off: expand the tree level by level and fetch
+            # each subtree recursively in parallel instead
+            return self._walk_tree(owner, repo, ref)
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            return None
+
+    def _get_tree(self, owner: str, repo: str, sha: str, recursive: bool) -> Optional[Dict]:
+        url = f"{self.base_url}/repos/{owner}/{repo}/git/trees/{sha}"
+        params = {'recursive': 1} if recursive else None
+        response = self._get(url, params=params)
+        if response.status_code == 200:
+            return response.json()
+        return None
+
+    def _tree_entries(self, tree: List[Dict], prefix: str) -> List[Dict]:
+        entries = []
+        for item in tree:
+            # Submodules show up as 'commit' entries and have no content here
+            if item['type'] not in ('blob', 'tree'):
+                continue
+            path = prefix + item['path']
+            entries.append({
+                'name': path.rsplit('/', 1)[-1],
+                'path': path,
+                'type': 'file' if item['type'] == 'blob' else 'dir',
+                'size': item.get('size', 0),
+                'mode': item['mode'],
+                'sha': item['sha']
+            })
+        return entries
+
+    def _walk_tree(self, owner: str, repo: str, ref: str, max_workers: int = 8) -> List[Dict]:
+        entries = []
+        to_expand = [(ref, '')]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while to_expand:
+                # One level down, without recursion
+                subtrees = []
+                levels = pool.map(lambda item: self._get_tree(owner, repo, item[0], recursive=False), to_expand)
+                for (_, prefix), level in zip(to_expand, levels):
+                    if level is None:
+                        continue
+                    level_entries = self._tree_entries(level['tree'], prefix)
+                    entries.extend(level_entries)
+                    subtrees.extend((entry['sha'], entry['path'] + '/') for entry in level_entries if entry['type'] == 'dir')
+
+                # Each subtree in full; ones that are still too large get expanded next round
+                to_expand = []
+                listings = pool.map(lambda item: self._get_tree(owner, repo, item[0], recursive=True), subtrees)
+                for (sha, prefix), listing in zip(subtrees, listings):
+                    if listing is None:
+                        continue
+                    if listing.get('truncated'):
+                        to_expand.append((sha, prefix))
+                    else:
+                        entries.extend(self._tree_entries(listing['tree'], prefix))
+
+        return sorted(entries, key=lambda entry: entry['path'])
+
+    def get_file_content(self, owner: str, repo: str, file_path: str, ref: Optional[str] = None) -> Optional[str]:
         """Get content of a specific file"""
         try:
             url = f"{self.base_url}/repos/{owner}/{repo}/contents/{file_path}"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self._get(url, params={'ref': ref} if ref else None)
             
             if response.status_code == 200:
                 data = response.json()
@@ -72,15 +403,100 @@ class GitHubFetcher:
                     except UnicodeDecodeError:
                         return None
             return None
+        except RateLimitExceeded:
+            raise
         except Exception as e:
             return None
     
-    def get_recent_commits(self, owner: str, repo: str, limit: int = 10) -> List[Dict]:
+    def iter_tarball_files(self, owner: str, repo: str, ref: str = "HEAD",
+                           wanted: Optional[Callable[[str], bool]] = None,
+                           max_file_size: int = 1_000_000) -> Iterator[Tuple[str, bytes]]:
+        """Stream the repository tarball and yield (path, bytes) for wanted files.
+
+        Members are read straight off the response stream, so the archive is
+        never written to disk or held in memory as a whole. Paths are relative
+        to the repository root, as in the tree and contents listings.
+        """
+        try:
+            url = f"{self.base_url}/repos/{owner}/{repo}/tarball/{ref}"
+            with self._get(url, timeout=30, stream=True) as response:
+                if response.status_code != 200:
+                    return
+                response.raw.decode_content = True
+
+                with tarfile.open(fileobj=response.raw, mode='r|*') as archive:
+                    for member in archive:
+                        if not member.isfile() or member.size > max_file_size:
+                            continue
+                        # Drop the "<owner>-<repo>-<sha>/" directory GitHub wraps the tree in
+                        path = member.name.split('/', 1)[-1]
+                        if wanted is not None and not wanted(path):
+                            continue
+                        yield path, archive.extractfile(member).read()
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            return
+
+    def get_commit_sha(self, owner: str, repo: str, ref: str) -> Optional[str]:
+        """Resolve a branch, tag or SHA to a full commit SHA"""
+        try:
+            url = f"{self.base_url}/repos/{owner}/{repo}/commits/{ref}"
+            # The sha media type returns the bare SHA instead of the whole commit
+            response = self._get(url, headers={'Accept': 'application/vnd.github.sha'})
+            if response.status_code == 200:
+                return response.text.strip()
+            return None
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            return None
+
+    def compare_commits(self, owner: str, repo: str, base: str, head: str) -> Optional[Dict]:
+        """Files changed between two commits.
+
+        Returns {'status', 'ahead_by', 'files', 'complete'} where files holds
+        {'path', 'name', 'status', 'sha', 'previous_path'} and status is one of
+        added, modified, removed, renamed, copied, changed or unchanged.
+        complete is False when GitHub capped the file list (at 300 files), in
+        which case the caller cannot trust it to be the whole change.
+        """
+        try:
+            url = f"{self.base_url}/repos/{owner}/{repo}/compare/{base}...{head}"
+            response = self._get(url, timeout=30)
+            if response.status_code != 200:
+                return None
+
+            data = response.json()
+            files = data.get('files', [])
+            return {
+                'status': data.get('status'),
+                'ahead_by': data.get('ahead_by', 0),
+                'files': [
+                    {
+                        'path': item['filename'],
+                        'name': item['filename'].rsplit('/', 1)[-1],
+                        'status': item['status'],
+                        'sha': item.get('sha'),
+                        'previous_path': item.get('previous_filename')
+                    }
+                    for item in files
+                ],
+                'complete': len(files) < 300
+            }
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            return None
+
+    def get_recent_commits(self, owner: str, repo: str, limit: int = 10, ref: Optional[str] = None) -> List[Dict]:
         """Get recent commits"""
         try:
             url = f"{self.base_url}/repos/{owner}/{repo}/commits"
             params = {'per_page': limit}
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
+            if ref:
+                params['sha'] = ref
+            response = self._get(url, params=params, priority='low')
             
             if response.status_code == 200:
                 commits = response.json()
@@ -95,6 +511,8 @@ class GitHubFetcher:
                     for commit in commits
                 ]
             return []
+        except RateLimitExceeded:
+            raise
         except Exception as e:
             return []
     
@@ -102,7 +520,7 @@ class GitHubFetcher:
         """Get repository contributors"""
         try:
             url = f"{self.base_url}/repos/{owner}/{repo}/contributors"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self._get(url, priority='low')
             
             if response.status_code == 200:
                 contributors = response.json()
@@ -116,14 +534,24 @@ class GitHubFetcher:
                     for contributor in contributors[:10]
                 ]
             return []
+        except RateLimitExceeded:
+            raise
         except Exception as e:
             return []
 
-    def get_rate_limit_info(self) -> Optional[Dict]:
-        """Get current GitHub API rate limit information"""
+    def get_rate_limit_info(self, refresh: bool = False) -> Optional[Dict]:
+        """Get current GitHub API rate limit information.
+
+        Served from the budget tracked off earlier responses; /rate_limit is
+        only called when nothing is known yet or refresh is requested.
+        """
+        if not refresh:
+            known = self.scheduler.get_rate_limit_info()
+            if known:
+                return known
         try:
             url = f"{self.base_url}/rate_limit"
-            response = requests.get(url, headers=self.headers, timeout=5)
+            response = self._get(url, timeout=5, priority=None)
             
             if response.status_code == 200:
                 data = response.json()
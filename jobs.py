@@ -0,0 +1,161 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+# Progress stages reported by app.run_analysis, in order
+STAGES = ('repo_info', 'listing', 'files', 'commits', 'contributors')
+
+class MemoryJobStore:
+    """In-process job store keeping the most recent max_jobs records"""
+
+    def __init__(self, max_jobs: int = 500):
+        self.max_jobs = max_jobs
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def save(self, job: Dict) -> None:
+        with self._lock:
+            self._jobs[job['id']] = dict(job)
+            # dicts keep insertion order, so the first finished entries are the oldest
+            overflow = len(self._jobs) - self.max_jobs
+            for job_id in [job_id for job_id, record in self._jobs.items()
+                           if record['status'] in ('done', 'failed')][:max(overflow, 0)]:
+                del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+class SQLiteJobStore:
+    """Job store in a local SQLite file, so results survive restarts"""
+
+    def __init__(self, path: str, max_jobs: int = 500):
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, '
+                         'data TEXT NOT NULL, updated_at TEXT NOT NULL)')
+
+        # Workers live in this process; anything unfinished was lost with the last one
+        with self._lock, self._db:
+            for job_id, data in self._db.execute(
+                    "SELECT id, data FROM jobs WHERE status IN ('queued', 'running')").fetchall():
+                job = json.loads(data)
+                job.update(status='failed', error='Interrupted by server restart', status_code=500)
+                self._write(job)
+
+    def _write(self, job: Dict) -> None:
+        self._db.execute('INSERT OR REPLACE INTO jobs (id, status, data, updated_at) VALUES (?, ?, ?, ?)',
+                         (job['id'], job['status'], json.dumps(job), job['updated_at']))
+
+    def save(self, job: Dict) -> None:
+        with self._lock, self._db:
+            self._write(job)
+            self._db.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND id NOT IN "
+                "(SELECT id FROM jobs ORDER BY updated_at DESC LIMIT ?)", (self.max_jobs,))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute('SELECT data FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            return json.loads(row[0]) if row else None
+
+class JobQueue:
+    """Runs analyses on a bounded worker pool, merging identical in-flight requests"""
+
+    def __init__(self, runner: Callable, workers: int = None, store=None):
+        self.runner = runner
+        self.workers = workers or int(os.environ.get('JOB_WORKERS', 2))
+        if store is None:
+            store_path = os.environ.get('JOB_STORE_PATH')
+            store = SQLiteJobStore(store_path) if store_path else MemoryJobStore()
+        self.store = store
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._update_lock = threading.RLock()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+
+    def submit(self, owner: str, repo: str, ref: Optional[str] = None, **options) -> Dict:
+        """Queue an analysis, or return the job already running for the same repo, ref and options.
+
+        options are passed to the runner as keyword arguments.
+        """
+        key = (owner.lower(), repo.lower(), ref, tuple(sorted(options.items())))
+        with self._lock:
+            job_id = self._inflight.get(key)
+            if job_id:
+                job = self.store.get(job_id)
+                if job:
+                    return job
+
+            now = datetime.now().isoformat()
+            job = {
+                'id': uuid.uuid4().hex,
+                'status': 'queued',
+                'owner': owner,
+                'repo': repo,
+                'ref': ref,
+                'options': options,
+                'progress': {'stage': None, 'completed': 0, 'total': len(STAGES)},
+                'result': None,
+                'error': None,
+                'status_code': None,
+                'created_at': now,
+                'updated_at': now
+            }
+            self.store.save(job)
+            self._inflight[key] = job['id']
+
+        self._pool.submit(self._run, job['id'], key)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.store.get(job_id)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {'inflight': len(self._inflight), 'queued': self._pool._work_queue.qsize()}
+
+    def _update(self, job_id: str, progress: Optional[Dict] = None, **fields) -> None:
+        # Progress calls come from pipeline threads, so read-modify-write under a lock
+        with self._update_lock:
+            job = self.store.get(job_id)
+            if progress:
+                job['progress'] = {**job['progress'], **progress}
+            job.update(fields, updated_at=datetime.now().isoformat())
+            self.store.save(job)
+
+    def _run(self, job_id: str, key: tuple) -> None:
+        job = self.store.get(job_id)
+        self._update(job_id, status='running')
+        files_done = [0]
+
+        def progress(stage: str, **details) -> None:
+            if stage == 'file':
+                with self._update_lock:
+                    files_done[0] += 1
+                    self._update(job_id, progress={'files_done': files_done[0]})
+                return
+            # Stage data (repo info, commits, ...) belongs in the result, not the progress record
+            counts = {name: value for name, value in details.items() if isinstance(value, int)}
+            self._update(job_id, progress={'stage': stage, 'completed': STAGES.index(stage) + 1, **counts})
+
+        try:
+            result, status_code = self.runner(job['owner'], job['repo'], job['ref'], progress=progress,
+                                                 **job.get('options', {}))
+            if status_code == 200:
+                self._update(job_id, status='done', result=result, status_code=status_code)
+            else:
+                self._update(job_id, status='failed', error=result.get('error'), status_code=status_code)
+        except Exception as e:
+            self._update(job_id, status='failed', error=f'Analysis failed: {str(e)}', status_code=500)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
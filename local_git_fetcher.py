@@ -0,0 +1,443 @@
+import base64
+import contextlib
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils.rate_limiter import RateLimitExceeded
+
+FULL_SHA = re.compile(r'^[0-9a-f]{40}$')
+# Characters GitHub allows in owner and repository names
+GITHUB_NAME = re.compile(r'^[A-Za-z0-9_.-]+$')
+# git diff --raw status letters, as the GitHub compare API names them
+DIFF_STATUS = {'A': 'added', 'M': 'modified', 'D': 'removed', 'R': 'renamed', 'C': 'copied', 'T': 'changed'}
+USED_MARKER = 'reporeader-last-used'
+
+class GitError(Exception):
+    """A git command failed"""
+
+class LocalGitFetcher:
+    """GitHubFetcher interface backed by shallow bare mirrors on local disk.
+
+    Each repository is fetched into <cache_dir>/<owner>/<repo>.git with
+    git fetch --depth and read straight from the object store (ls-tree,
+    cat-file), so file contents cost no API calls. A ref is fetched again at
+    most every fetch_ttl seconds, full SHAs only when missing. Mirrors beyond
+    max_bytes in total are evicted least recently used first, except ones a
+    call is still reading from.
+
+    Repository metadata git does not have (stars, forks, contributors) comes
+    from the metadata fetcher when one is given and the remote is GitHub;
+    otherwise, or when that fetcher hits the rate limit, it is derived from
+    the local history. remote_url is a template
+    with {owner} and {repo}, so file:// repositories work offline.
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None, depth: int = None, fetch_ttl: float = None,
+                 remote_url: str = None, metadata=None, timeout: float = None):
+        self.cache_dir = cache_dir or os.environ.get('GIT_MIRROR_DIR', 'git_mirrors')
+        self.max_bytes = max_bytes or int(os.environ.get('GIT_MIRROR_MAX_MB', 2048)) * 1024 * 1024
+        self.depth = depth or int(os.environ.get('GIT_FETCH_DEPTH', 50))
+        self.fetch_ttl = fetch_ttl if fetch_ttl is not None else float(os.environ.get('GIT_FETCH_TTL', 60))
+        self.remote_url = remote_url or os.environ.get('GIT_REMOTE_URL', 'https://github.com/{owner}/{repo}.git')
+        self.timeout = timeout or float(os.environ.get('GIT_FETCH_TIMEOUT', 120))
+        self.metadata = metadata if not self.remote_url.startswith('file://') else None
+
+        self._env = {**os.environ, 'GIT_TERMINAL_PROMPT': '0'}
+        github_token = os.environ.get('GITHUB_TOKEN')
+        if github_token and github_token != 'your_github_token_here' and 'github.com' in self.remote_url:
+            # Passed through the environment so the token never shows up in process listings
+            credentials = base64.b64encode(f"x-access-token:{github_token}".encode()).decode()
+            self._env.update({'GIT_CONFIG_COUNT': '1', 'GIT_CONFIG_KEY_0': 'http.https://github.com/.extraheader',
+                              'GIT_CONFIG_VALUE_0': f'Authorization: Basic {credentials}'})
+
+        self._locks: Dict[str, threading.Lock] = {}
+        # Reads in progress per mirror, guarded by _locks_lock; eviction skips mirrors with any
+        self._readers: Dict[str, int] = {}
+        self._locks_lock = threading.Lock()
+        # (mirror path, ref) -> (commit SHA, time fetched)
+        self._resolved: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._sizes: Dict[str, int] = {}
+        self.stats = {'fetches': 0, 'fetch_seconds': 0.0, 'reuses': 0, 'evictions': 0}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    # -- mirror management -------------------------------------------------
+
+    def _git(self, path: Optional[str], *args, input: bytes = None, timeout: float = None) -> bytes:
+        command = ['git'] + (['--git-dir', path] if path else []) + list(args)
+        try:
+            completed = subprocess.run(command, input=input, capture_output=True, env=self._env,
+                                       timeout=timeout or self.timeout)
+        except subprocess.TimeoutExpired:
+            raise GitError(f"git {args[0]} timed out")
+        if completed.returncode != 0:
+            raise GitError(completed.stderr.decode('utf-8', 'replace').strip() or f"git {args[0]} failed")
+        return completed.stdout
+
+    def _mirror_path(self, owner: str, repo: str) -> str:
+        # Both come from a user-supplied URL and must not lead outside cache_dir
+        for name in (owner, repo):
+            if not GITHUB_NAME.match(name) or name in ('.', '..'):
+                raise GitError(f"Invalid repository name: {owner}/{repo}")
+        return os.path.join(self.cache_dir, owner.lower(), f"{repo.lower()}.git")
+
+    def _lock_for(self, path: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(path, threading.Lock())
+
+    @contextlib.contextmanager
+    def _checkout(self, owner: str, repo: str, ref: Optional[str]) -> Iterator[Tuple[str, str]]:
+        """(mirror path, commit SHA) for a ref, kept safe from eviction until the block exits"""
+        path, sha = self._resolve(owner, repo, ref)
+        try:
+            yield path, sha
+        finally:
+            self._release(path)
+
+    def _resolve(self, owner: str, repo: str, ref: Optional[str]) -> Tuple[str, str]:
+        """(mirror path, commit SHA) for a ref, fetching it into the mirror when stale.
+
+        The mirror is registered as being read before its lock is released;
+        callers must pair this with _release (see _checkout).
+        """
+        path = self._mirror_path(owner, repo)
+        ref = ref or 'HEAD'
+        with self._lock_for(path):
+            cached = self._resolved.get((path, ref))
+            if cached and (FULL_SHA.match(ref) or time.monotonic() - cached[1] < self.fetch_ttl):
+                self.stats['reuses'] += 1
+                self._touch(path)
+                self._acquire_reader(path)
+                return path, cached[0]
+
+            if not os.path.exists(path):
+                self._git(None, 'init', '--bare', '--quiet', path)
+                self._git(path, 'remote', 'add', 'origin', self.remote_url.format(owner=owner, repo=repo))
+
+            sha = None
+            if FULL_SHA.match(ref):
+                try:
+                    sha = self._git(path, 'rev-parse', '--verify', '--quiet', f"{ref}^{{commit}}").decode().strip()
+                except GitError:
+                    sha = None
+            if sha is None:
+                start = time.perf_counter()
+                # HEAD is fetched as the remote's default branch; everything lands under one private namespace
+                self._git(path, 'fetch', '--quiet', '--no-tags', f"--depth={self.depth}", 'origin',
+                          f"+{ref}:refs/reporeader/{ref}")
+                self.stats['fetches'] += 1
+                self.stats['fetch_seconds'] += time.perf_counter() - start
+                sha = self._git(path, 'rev-parse', f"refs/reporeader/{ref}^{{commit}}").decode().strip()
+                self._sizes[path] = self._disk_usage(path)
+
+            self._resolved[(path, ref)] = (sha, time.monotonic())
+            self._touch(path)
+            self._acquire_reader(path)
+        self._evict()
+        return path, sha
+
+    def _acquire_reader(self, path: str) -> None:
+        # Only called with the mirror's lock held, so an eviction holding that lock never sees a new reader
+        with self._locks_lock:
+            self._readers[path] = self._readers.get(path, 0) + 1
+
+    def _release(self, path: str) -> None:
+        with self._locks_lock:
+            self._readers[path] -= 1
+            if not self._readers[path]:
+                del self._readers[path]
+
+    def _touch(self, path: str) -> None:
+        marker = os.path.join(path, USED_MARKER)
+        with open(marker, 'a'):
+            pass
+        os.utime(marker)
+
+    def _disk_usage(self, path: str) -> int:
+        total = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.stat(os.path.join(root, name)).st_size
+                except OSError:
+                    pass
+        return total
+
+    def _mirrors(self) -> List[str]:
+        mirrors = []
+        for owner in os.listdir(self.cache_dir):
+            owner_dir = os.path.join(self.cache_dir, owner)
+            if os.path.isdir(owner_dir):
+                mirrors.extend(os.path.join(owner_dir, name) for name in os.listdir(owner_dir) if name.endswith('.git'))
+        return mirrors
+
+    def _last_used(self, path: str) -> float:
+        try:
+            return os.stat(os.path.join(path, USED_MARKER)).st_mtime
+        except OSError:
+            return 0.0
+
+    def _evict(self) -> None:
+        """Delete least recently used mirrors until the cache fits in max_bytes"""
+        mirrors = self._mirrors()
+        for path in mirrors:
+            if path not in self._sizes:
+                # Left by an earlier process
+                self._sizes[path] = self._disk_usage(path)
+        total = sum(self._sizes.get(path, 0) for path in mirrors)
+        for path in sorted(mirrors, key=self._last_used):
+            if total <= self.max_bytes:
+                break
+            lock = self._lock_for(path)
+            # Mirrors being fetched (locked) or read (registered readers) right now are skipped, not waited for
+            if not lock.acquire(blocking=False):
+                continue
+            try:
+                with self._locks_lock:
+                    if self._readers.get(path):
+                        continue
+                shutil.rmtree(path, ignore_errors=True)
+                total -= self._sizes.pop(path, 0)
+                self._resolved = {key: value for key, value in self._resolved.items() if key[0] != path}
+                self.stats['evictions'] += 1
+            finally:
+                lock.release()
+
+    def get_cache_stats(self) -> Dict:
+        mirrors = self._mirrors()
+        return {**self.stats, 'fetch_seconds': round(self.stats['fetch_seconds'], 3), 'mirrors': len(mirrors),
+                'disk_bytes': sum(self._sizes.get(path, 0) for path in mirrors), 'max_bytes': self.max_bytes}
+
+    # -- GitHubFetcher interface -------------------------------------------
+
+    def _ls_tree(self, path: str, sha: str, recursive: bool, subdir: str = '') -> List[Dict]:
+        args = ['ls-tree', '-l', '-z', '--full-tree']
+        if recursive:
+            args += ['-r', '-t']
+        args.append(f"{sha}:{subdir}" if subdir else sha)
+        prefix = f"{subdir.rstrip('/')}/" if subdir else ''
+        entries = []
+        for record in self._git(path, *args).decode('utf-8', 'replace').split('\0'):
+            if not record:
+                continue
+            meta, item_path = record.split('\t', 1)
+            mode, kind, object_sha, size = meta.split()
+            # Submodules show up as 'commit' entries and have no content here
+            if kind not in ('blob', 'tree'):
+                continue
+            item_path = prefix + item_path
+            entries.append({
+                'name': item_path.rsplit('/', 1)[-1],
+                'path': item_path,
+                'type': 'file' if kind == 'blob' else 'dir',
+                'size': int(size) if size != '-' else 0,
+                'mode': mode,
+                'sha': object_sha
+            })
+        return entries
+
+    def get_repo_info(self, owner: str, repo: str) -> Optional[Dict]:
+        """Repository details from the metadata fetcher, or derived from the default branch"""
+        if self.metadata:
+            try:
+                info = self.metadata.get_repo_info(owner, repo)
+            except RateLimitExceeded:
+                # The mirror has what an analysis needs, so fall back instead of failing
+                info = None
+            if info:
+                return info
+        try:
+            with self._checkout(owner, repo, None) as (path, sha):
+                default_branch = self._git(path, 'ls-remote', '--symref', 'origin', 'HEAD').decode()
+                match = re.search(r'ref: refs/heads/(\S+)\s+HEAD', default_branch)
+                updated_at = self._git(path, 'log', '-1', '--format=%cI', sha).decode().strip()
+                files = self._ls_tree(path, sha, recursive=False)
+                license_file = next((entry['name'] for entry in files if entry['name'].upper().startswith(('LICENSE', 'COPYING'))), None)
+                return {
+                    'name': repo,
+                    'full_name': f"{owner}/{repo}",
+                    'description': 'No description available',
+                    'language': 'Unknown',
+                    'stars': 0,
+                    'forks': 0,
+                    'created_at': None,
+                    'updated_at': updated_at,
+                    'size': self._sizes.get(path, 0) // 1024,
+                    'default_branch': match.group(1) if match else 'HEAD',
+                    'topics': [],
+                    'license': license_file or 'No license'
+                }
+        except (GitError, OSError):
+            return None
+
+    def get_repo_overview(self, owner: str, repo: str, ref: Optional[str] = None, commit_limit: int = 10) -> Optional[Dict]:
+        # GraphQL only; callers fall back to the individual methods
+        return None
+
+    def get_repo_files(self, owner: str, repo: str, path: str = "", ref: Optional[str] = None) -> List[Dict]:
+        try:
+            with self._checkout(owner, repo, ref) as (mirror, sha):
+                return self._ls_tree(mirror, sha, recursive=False, subdir=path)
+        except (GitError, OSError):
+            return []
+
+    def get_repo_tree(self, owner: str, repo: str, ref: str = "HEAD") -> Optional[List[Dict]]:
+        try:
+            with self._checkout(owner, repo, ref) as (mirror, sha):
+                return self._ls_tree(mirror, sha, recursive=True)
+        except (GitError, OSError):
+            return None
+
+    def get_file_content(self, owner: str, repo: str, file_path: str, ref: Optional[str] = None) -> Optional[str]:
+        try:
+            with self._checkout(owner, repo, ref) as (mirror, sha):
+                return self._git(mirror, 'cat-file', 'blob', f"{sha}:{file_path}").decode('utf-8')
+        except (GitError, OSError, UnicodeDecodeError):
+            return None
+
+    def iter_tarball_files(self, owner: str, repo: str, ref: str = "HEAD",
+                           wanted: Optional[Callable[[str], bool]] = None,
+                           max_file_size: int = 1_000_000) -> Iterator[Tuple[str, bytes]]:
+        """Yield (path, bytes) for wanted files, read through one git cat-file --batch process"""
+        try:
+            mirror, sha = self._resolve(owner, repo, ref)
+        except (GitError, OSError):
+            return
+        # The mirror stays registered as read until the generator finishes or is closed
+        try:
+            yield from self._read_blobs(mirror, sha, wanted, max_file_size)
+        finally:
+            self._release(mirror)
+
+    def _read_blobs(self, mirror: str, sha: str, wanted: Optional[Callable[[str], bool]],
+                    max_file_size: int) -> Iterator[Tuple[str, bytes]]:
+        try:
+            blobs = [(entry['path'], entry['sha']) for entry in self._ls_tree(mirror, sha, recursive=True)
+                     if entry['type'] == 'file' and entry['size'] <= max_file_size
+                     and (wanted is None or wanted(entry['path']))]
+        except (GitError, OSError):
+            return
+        if not blobs:
+            return
+
+        process = subprocess.Popen(['git', '--git-dir', mirror, 'cat-file', '--batch'], stdin=subprocess.PIPE,
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=self._env)
+
+        def write_requests():
+            # From a separate thread so a full stdout pipe cannot block the request writes
+            try:
+                process.stdin.write(''.join(f"{blob_sha}\n" for _, blob_sha in blobs).encode())
+                process.stdin.close()
+            except OSError:
+                pass
+
+        writer = threading.Thread(target=write_requests, daemon=True)
+        writer.start()
+        try:
+            for blob_path, _ in blobs:
+                header = process.stdout.readline().split()
+                if len(header) < 3 or header[1] != b'blob':
+                    continue
+                data = process.stdout.read(int(header[2]))
+                process.stdout.read(1)
+                yield blob_path, data
+        finally:
+            process.kill()
+            process.wait()
+            process.stdout.close()
+            writer.join(timeout=1)
+
+    def get_commit_sha(self, owner: str, repo: str, ref: str) -> Optional[str]:
+        try:
+            with self._checkout(owner, repo, ref) as (_, sha):
+                return sha
+        except (GitError, OSError):
+            return None
+
+    def compare_commits(self, owner: str, repo: str, base: str, head: str) -> Optional[Dict]:
+        """Files changed between two commits, in the GitHubFetcher.compare_commits shape.
+
+        Returns None when base is not in the (shallow) local history.
+        """
+        try:
+            with self._checkout(owner, repo, head) as (mirror, head_sha):
+                try:
+                    self._git(mirror, 'cat-file', '-e', f"{base}^{{commit}}")
+                except GitError:
+                    return None
+                try:
+                    self._git(mirror, 'merge-base', '--is-ancestor', base, head_sha)
+                    status = 'identical' if base == head_sha else 'ahead'
+                except GitError:
+                    status = 'diverged'
+                ahead_by = int(self._git(mirror, 'rev-list', '--count', f"{base}..{head_sha}").decode().strip() or 0)
+
+                fields = self._git(mirror, 'diff', '--raw', '-z', '-M', '--no-abbrev', base, head_sha).decode(
+                    'utf-8', 'replace').split('\0')
+                files, position = [], 0
+                while position < len(fields) - 1:
+                    meta = fields[position].split()
+                    letter = meta[4][0]
+                    if letter in ('R', 'C'):
+                        previous_path, file_path = fields[position + 1], fields[position + 2]
+                        position += 3
+                    else:
+                        previous_path, file_path = None, fields[position + 1]
+                        position += 2
+                    files.append({
+                        'path': file_path,
+                        'name': file_path.rsplit('/', 1)[-1],
+                        'status': DIFF_STATUS.get(letter, 'changed'),
+                        'sha': meta[3] if letter != 'D' else None,
+                        'previous_path': previous_path
+                    })
+                return {'status': status, 'ahead_by': ahead_by, 'files': files, 'complete': True}
+        except (GitError, OSError, ValueError, IndexError):
+            return None
+
+    def get_recent_commits(self, owner: str, repo: str, limit: int = 10, ref: Optional[str] = None) -> List[Dict]:
+        try:
+            with self._checkout(owner, repo, ref) as (mirror, sha):
+                log = self._git(mirror, 'log', f"-{limit}", '--format=%H%x00%s%x00%an%x00%aI', sha).decode('utf-8', 'replace')
+        except (GitError, OSError):
+            return []
+        web_url = f"https://github.com/{owner}/{repo}" if 'github.com' in self.remote_url else None
+        commits = []
+        for line in log.splitlines():
+            full_sha, message, author, date = line.split('\0')
+            commits.append({
+                'sha': full_sha[:7],
+                'message': message,
+                'author': author,
+                'date': date,
+                'url': f"{web_url}/commit/{full_sha}" if web_url else ''
+            })
+        return commits
+
+    def get_contributors(self, owner: str, repo: str) -> List[Dict]:
+        """Contributors from the metadata fetcher, or commit authors in the fetched history"""
+        if self.metadata:
+            try:
+                contributors = self.metadata.get_contributors(owner, repo)
+            except RateLimitExceeded:
+                contributors = None
+            if contributors:
+                return contributors
+        try:
+            with self._checkout(owner, repo, None) as (mirror, sha):
+                authors = self._git(mirror, 'log', '--format=%an', sha).decode('utf-8', 'replace').splitlines()
+        except (GitError, OSError):
+            return []
+        return [
+            {'login': author, 'contributions': count, 'avatar_url': '', 'profile_url': ''}
+            for author, count in Counter(authors).most_common(10)
+        ]
+
+    def get_rate_limit_info(self, refresh: bool = False) -> Optional[Dict]:
+        return self.metadata.get_rate_limit_info(refresh) if self.metadata else None
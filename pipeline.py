@@ -0,0 +1,404 @@
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+from file_ranker import FileRanker
+from utils.rate_limiter import RateLimitExceeded
+from utils.metrics import STAGE_SECONDS
+
+class AnalysisPipeline:
+    """Fetch and summarize repository files with separate bounded worker pools"""
+
+    def __init__(self, fetcher, summarizer, fetch_workers: int = None, summarize_workers: int = None):
+        self.fetcher = fetcher
+        self.summarizer = summarizer
+        self.fetch_workers = fetch_workers or int(os.environ.get('FETCH_WORKERS', 8))
+        self.summarize_workers = summarize_workers or int(os.environ.get('SUMMARIZE_WORKERS', 4))
+        self.ranker = FileRanker()
+
+        # Pools are shared by every request so the summarize limit is a global
+        # cap on concurrent LLM calls, not a per-request one
+        self._fetch_pool = ThreadPoolExecutor(max_workers=self.fetch_workers, thread_name_prefix='fetch')
+        self._summarize_pool = ThreadPoolExecutor(max_workers=self.summarize_workers, thread_name_prefix='summarize')
+
+    def _fetch(self, fetcher, owner: str, repo: str, file_info: Dict, ref: str = None) -> Tuple[str, float]:
+        start = time.perf_counter()
+        content = fetcher.get_file_content(owner, repo, file_info['path'], ref=ref)
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage='file_fetch')
+        return content, elapsed
+
+    def _summarize_batch(self, batch: List[Tuple[int, str, Optional[str]]], files: List[Dict],
+                         futures: Dict[int, Future]) -> None:
+        start = time.perf_counter()
+        try:
+            # Files with a SHA already missed the cache in _cached_summaries
+            summaries = self.summarizer.summarize_many(
+                [(content, files[index]['name'], files[index].get('sha'), priority)
+                 for index, content, priority in batch], checked=True)
+        except Exception as e:
+            for future in futures.values():
+                future.set_exception(e)
+            return
+
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage='summarize_batch')
+        elapsed = (time.perf_counter() - start) / len(batch)
+        for (index, _, _), (summary, ai_usage) in zip(batch, summaries):
+            futures[index].set_result((summary, ai_usage, elapsed))
+
+    def _submit_batch(self, batch: List[Tuple[int, str, Optional[str]]], files: List[Dict], summarize_futures: Dict,
+                      on_result: Optional[Callable]) -> None:
+        """Summarize a group of fetched (index, content, priority) files in one task, with one future per file"""
+        futures = {index: Future() for index, _, _ in batch}
+        summarize_futures.update(futures)
+        self._notify(files, futures, on_result)
+        self._summarize_pool.submit(self._summarize_batch, batch, files, futures)
+
+    def _add_to_batch(self, pending: List[Tuple[int, str, Optional[str]]], index: int, content: str, files: List[Dict],
+                      summarize_futures: Dict, on_result: Optional[Callable],
+                      priority: Optional[str] = None) -> List[Tuple[int, str, Optional[str]]]:
+        """Queue a fetched file for summarization, returning the still-pending batch"""
+        if not self.summarizer.is_batchable(content):
+            # Large files get their own call and should not wait for a batch to fill
+            self._submit_batch([(index, content, priority)], files, summarize_futures, on_result)
+            return pending
+
+        pending = pending + [(index, content, priority)]
+        pending_tokens = sum(self.summarizer.get_token_usage_estimate(text) for _, text, _ in pending)
+        if len(pending) >= self.summarizer.batch_max_files or pending_tokens >= self.summarizer.batch_token_budget:
+            self._submit_batch(pending, files, summarize_futures, on_result)
+            return []
+        return pending
+
+    def _cached_summaries(self, files: List[Dict]) -> Dict[int, Future]:
+        """Resolve files whose blob SHA is already in the summary cache, skipping their download"""
+        cached = {}
+        for index, file_info in enumerate(files):
+            if not file_info.get('sha'):
+                continue
+            hit = self.summarizer.get_cached_summary(file_info['name'], file_info['sha'])
+            if hit:
+                future = Future()
+                future.set_result((hit[0], hit[1], 0.0))
+                cached[index] = future
+        return cached
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Tasks waiting for a free worker in each pool"""
+        return {
+            'fetch': self._fetch_pool._work_queue.qsize(),
+            'summarize': self._summarize_pool._work_queue.qsize()
+        }
+
+    def _new_run(self, fetch_mode: str) -> Tuple[Dict, Dict]:
+        usage = {'github_api_calls': 0, 'huggingface_api_calls': 0, 'huggingface_tokens_used': 0,
+                 'model_input_tokens': 0, 'model_output_tokens': 0, 'model_cost': 0.0}
+        timings = {'fetch_ms': 0.0, 'summarize_ms': 0.0, 'files_ms': 0.0, 'fetch_mode': fetch_mode,
+                   'fetch_workers': self.fetch_workers, 'summarize_workers': self.summarize_workers}
+        return usage, timings
+
+    def analyze_files(self, owner: str, repo: str, files: List[Dict], ref: str = None,
+                      on_result: Optional[Callable[[int, Dict], None]] = None,
+                      fetcher=None) -> Tuple[List[Dict], Dict, Dict]:
+        """Analyze files concurrently, returning (results in input order, usage, timings).
+
+        on_result, if given, is called as on_result(index, entry) as soon as each
+        file's summary is ready, in completion order. fetcher overrides the
+        pipeline's fetcher for this run; the worker pools stay shared.
+        RateLimitExceeded from a file fetch ends the run, so a cut-short
+        analysis is never mistaken for a complete one.
+        """
+        start = time.perf_counter()
+        usage, timings = self._new_run('contents')
+        summarize_futures = self._cached_summaries(files)
+        self._notify(files, summarize_futures, on_result)
+
+        fetch_futures = {
+            self._fetch_pool.submit(self._fetch, fetcher or self.fetcher, owner, repo, file_info, ref): index
+            for index, file_info in enumerate(files)
+            if index not in summarize_futures
+        }
+
+        # Hand fetched files to the summarize stage in batches as their content arrives
+        pending = []
+        for future in as_completed(fetch_futures):
+            index = fetch_futures[future]
+            usage['github_api_calls'] += 1
+            try:
+                content, elapsed = future.result()
+            except RateLimitExceeded:
+                # Files still queued would be refused too; the caller decides what a cut-short run means
+                for queued in fetch_futures:
+                    queued.cancel()
+                raise
+            except Exception:
+                continue
+            timings['fetch_ms'] += elapsed * 1000
+            if content and not files[index].get('size'):
+                # Files known only from a diff come without a size
+                files[index]['size'] = len(content.encode('utf-8'))
+            if content:
+                pending = self._add_to_batch(pending, index, content, files, summarize_futures, on_result)
+        if pending:
+            self._submit_batch(pending, files, summarize_futures, on_result)
+
+        results = self._collect(files, summarize_futures, usage, timings)
+        timings['files_ms'] = (time.perf_counter() - start) * 1000
+        return results, usage, self._round(timings)
+
+    def analyze_archive(self, owner: str, repo: str, ref: str, files: List[Dict],
+                        on_result: Optional[Callable[[int, Dict], None]] = None,
+                        fetcher=None) -> Tuple[List[Dict], Dict, Dict]:
+        """Like analyze_files, but reads every file from a single streamed tarball"""
+        start = time.perf_counter()
+        usage, timings = self._new_run('tarball')
+        summarize_futures = self._cached_summaries(files)
+        self._notify(files, summarize_futures, on_result)
+
+        index_by_path = {
+            file_info['path']: index for index, file_info in enumerate(files)
+            if index not in summarize_futures
+        }
+        remaining = set(index_by_path)
+        if not remaining:
+            results = self._collect(files, summarize_futures, usage, timings)
+            timings['files_ms'] = (time.perf_counter() - start) * 1000
+            return results, usage, self._round(timings)
+
+        usage['github_api_calls'] += 1
+        archive_files = (fetcher or self.fetcher).iter_tarball_files(owner, repo, ref, wanted=remaining.__contains__)
+        pending = []
+        try:
+            for path, data in archive_files:
+                remaining.discard(path)
+                try:
+                    content = data.decode('utf-8')
+                except UnicodeDecodeError:
+                    content = None
+                if content:
+                    pending = self._add_to_batch(pending, index_by_path[path], content, files,
+                                                 summarize_futures, on_result)
+                # Stop downloading once every wanted file has been seen
+                if not remaining:
+                    break
+        finally:
+            archive_files.close()
+        if pending:
+            self._submit_batch(pending, files, summarize_futures, on_result)
+        timings['fetch_ms'] = (time.perf_counter() - start) * 1000
+
+        results = self._collect(files, summarize_futures, usage, timings)
+        timings['files_ms'] = (time.perf_counter() - start) * 1000
+        return results, usage, self._round(timings)
+
+    def analyze_repository(self, owner: str, repo: str, ref: str, files: List[Dict], readme: Optional[Dict] = None,
+                           summarize_limit: int = 25, token_budget: int = 50000, time_budget: float = 60.0,
+                           on_result: Optional[Callable[[int, Dict], None]] = None,
+                           fetcher=None) -> Tuple[List[Dict], Dict, Dict, Dict]:
+        """Cover every listed file: the highest-ranked ones get model summaries, the rest the rule engine.
+
+        Files are read from one tarball and ranked by FileRanker. In rank order,
+        files are summarized while there are fewer than summarize_limit and their
+        estimated tokens fit in token_budget; summaries not back within
+        time_budget seconds are replaced by rule-based ones. Returns
+        (results in rank order, usage, timings, coverage); each result carries
+        its method and, when it was not summarized by the model, the reason.
+        """
+        start = time.perf_counter()
+        deadline = time.monotonic() + time_budget
+        usage, timings = self._new_run('tarball')
+        max_file_size = 1_000_000
+
+        wanted = {file_info['path'] for file_info in files if (file_info.get('size') or 0) <= max_file_size}
+        if readme:
+            wanted.add(readme['path'])
+        contents = {}
+        usage['github_api_calls'] += 1
+        archive_files = (fetcher or self.fetcher).iter_tarball_files(owner, repo, ref, wanted=wanted.__contains__,
+                                                                     max_file_size=max_file_size)
+        try:
+            for path, data in archive_files:
+                try:
+                    contents[path] = data.decode('utf-8')
+                except UnicodeDecodeError:
+                    pass
+        finally:
+            archive_files.close()
+        timings['fetch_ms'] = (time.perf_counter() - start) * 1000
+
+        ranked = self.ranker.rank(files, contents, contents.get(readme['path']) if readme else None)
+        ranked_files = [item['file'] for item in ranked]
+        coverage = {
+            'mode': 'repository',
+            'total_files': len(files),
+            'summarize_limit': summarize_limit,
+            'token_budget': token_budget,
+            'time_budget_s': time_budget,
+            'estimated_tokens': 0,
+            'methods': {},
+            'reasons': {},
+            'skipped': []
+        }
+
+        # Choose what goes to the model; cache hits cost no tokens
+        summarize_futures = self._cached_summaries(ranked_files)
+        reasons, pending, selected = {}, [], len(summarize_futures)
+        for index, file_info in enumerate(ranked_files):
+            if index in summarize_futures:
+                continue
+            content = contents.get(file_info['path'])
+            if content is None:
+                too_large = (file_info.get('size') or 0) > max_file_size
+                coverage['skipped'].append({'path': file_info['path'], 'reason': 'too_large' if too_large else 'unreadable'})
+                continue
+            tokens = self.summarizer.get_token_usage_estimate(content)
+            if selected >= summarize_limit:
+                reasons[index] = 'summarize_limit'
+            elif coverage['estimated_tokens'] + tokens > token_budget:
+                reasons[index] = 'token_budget'
+            else:
+                selected += 1
+                coverage['estimated_tokens'] += tokens
+                # Below the top SUMMARY_PRIORITY_FILES, files are routed to the cheap backends
+                priority_files = self.summarizer.router.priority_files
+                priority = 'low' if priority_files and selected > priority_files else None
+                pending = self._add_to_batch(pending, index, content, ranked_files, summarize_futures, None,
+                                             priority=priority)
+        if pending:
+            self._submit_batch(pending, ranked_files, summarize_futures, None)
+
+        # Everything else goes through the rule engine while the model calls run
+        entries = {}
+        for index, reason in reasons.items():
+            entries[index] = self._rule_based_entry(ranked_files[index], contents[ranked_files[index]['path']], reason)
+            if on_result:
+                on_result(index, entries[index])
+
+        for index in sorted(summarize_futures):
+            file_info = ranked_files[index]
+            try:
+                summary, ai_usage, elapsed = summarize_futures[index].result(timeout=max(deadline - time.monotonic(), 0))
+            except TimeoutError:
+                # The call keeps running and its summary still lands in the cache for next time
+                entries[index] = self._rule_based_entry(file_info, contents[file_info['path']], 'time_budget')
+            except Exception:
+                entries[index] = self._rule_based_entry(file_info, contents[file_info['path']], 'summarize_failed')
+            else:
+                timings['summarize_ms'] += elapsed * 1000
+                usage['huggingface_api_calls'] += ai_usage.get('api_calls', 0)
+                usage['huggingface_tokens_used'] += ai_usage.get('tokens_used', 0)
+                usage['model_input_tokens'] += ai_usage.get('input_tokens', 0)
+                usage['model_output_tokens'] += ai_usage.get('output_tokens', 0)
+                usage['model_cost'] += ai_usage.get('cost', 0.0)
+                entries[index] = self._entry(file_info, summary, ai_usage)
+            if on_result:
+                on_result(index, entries[index])
+
+        results = []
+        for index in sorted(entries):
+            entry = {**entries[index], 'rank': index + 1, 'score': ranked[index]['score'],
+                     'signals': ranked[index]['reasons']}
+            results.append(entry)
+            coverage['methods'][entry['method']] = coverage['methods'].get(entry['method'], 0) + 1
+            if entry.get('reason'):
+                coverage['reasons'][entry['reason']] = coverage['reasons'].get(entry['reason'], 0) + 1
+
+        timings['files_ms'] = (time.perf_counter() - start) * 1000
+        return results, usage, self._round(timings), coverage
+
+    def analyze_changes(self, owner: str, repo: str, ref: str, files: List[Dict], rule_based: Dict[int, str],
+                        on_result: Optional[Callable[[int, Dict], None]] = None,
+                        fetcher=None) -> Tuple[List[Optional[Dict]], Dict, Dict]:
+        """Re-analyze the files of a diff through the contents API.
+
+        Files whose index is in rule_based get a rule-based summary with that
+        reason, the rest go through analyze_files. Returns (entries by input
+        index, None where a file could not be read, usage, timings).
+        """
+        start = time.perf_counter()
+        entries = [None] * len(files)
+        rule_futures = {
+            self._fetch_pool.submit(self._fetch, fetcher or self.fetcher, owner, repo, files[index], ref): index
+            for index in rule_based
+        }
+
+        summarized = [index for index in range(len(files)) if index not in rule_based]
+        results, usage, timings = self.analyze_files(
+            owner, repo, [files[index] for index in summarized], ref=ref,
+            on_result=(lambda position, entry: on_result(summarized[position], entry)) if on_result else None,
+            fetcher=fetcher)
+        index_by_path = {files[index]['path']: index for index in summarized}
+        for entry in results:
+            entries[index_by_path[entry['path']]] = entry
+
+        for future in as_completed(rule_futures):
+            index = rule_futures[future]
+            usage['github_api_calls'] += 1
+            try:
+                content, elapsed = future.result()
+            except RateLimitExceeded:
+                for queued in rule_futures:
+                    queued.cancel()
+                raise
+            except Exception:
+                continue
+            timings['fetch_ms'] += elapsed * 1000
+            if content:
+                files[index]['size'] = files[index].get('size') or len(content.encode('utf-8'))
+                entries[index] = self._rule_based_entry(files[index], content, rule_based[index])
+                if on_result:
+                    on_result(index, entries[index])
+
+        timings['files_ms'] = (time.perf_counter() - start) * 1000
+        return entries, usage, self._round(timings)
+
+    def _rule_based_entry(self, file_info: Dict, content: str, reason: str) -> Dict:
+        analysis = self.summarizer.analyze_structure(content, file_info['name'])
+        entry = self._entry(file_info, self.summarizer.structure_summary(analysis), {'method_used': 'rule_based'})
+        entry.update(reason=reason, structure=analysis)
+        return entry
+
+    def _entry(self, file_info: Dict, summary: str, ai_usage: Dict) -> Dict:
+        return {
+            'file': file_info['name'],
+            'path': file_info['path'],
+            'summary': summary,
+            'size': file_info.get('size', 0),
+            'tokens_used': ai_usage.get('tokens_used', 0),
+            'cached': ai_usage.get('method_used') == 'cache',
+            'method': ai_usage.get('method_used', 'rule_based'),
+            'backend': ai_usage.get('backend')
+        }
+
+    def _notify(self, files: List[Dict], futures: Dict[int, Future], on_result: Optional[Callable]) -> None:
+        if on_result is None:
+            return
+        for index, future in futures.items():
+            def done(future, index=index):
+                if future.exception() is None:
+                    summary, ai_usage, _ = future.result()
+                    on_result(index, self._entry(files[index], summary, ai_usage))
+            future.add_done_callback(done)
+
+    def _collect(self, files: List[Dict], summarize_futures: Dict, usage: Dict, timings: Dict) -> List[Dict]:
+        results = []
+        for index in sorted(summarize_futures):
+            try:
+                summary, ai_usage, elapsed = summarize_futures[index].result()
+            except Exception:
+                continue
+            timings['summarize_ms'] += elapsed * 1000
+            usage['huggingface_api_calls'] += ai_usage.get('api_calls', 0)
+            usage['huggingface_tokens_used'] += ai_usage.get('tokens_used', 0)
+            usage['model_input_tokens'] += ai_usage.get('input_tokens', 0)
+            usage['model_output_tokens'] += ai_usage.get('output_tokens', 0)
+            usage['model_cost'] += ai_usage.get('cost', 0.0)
+
+            results.append(self._entry(files[index], summary, ai_usage))
+        return results
+
+    def _round(self, timings: Dict) -> Dict:
+        for key in ('fetch_ms', 'summarize_ms', 'files_ms'):
+            timings[key] = round(timings[key], 1)
+        return timings
@@ -1,27 +1,63 @@
-import google.generativeai as genai
+import ast
+import json
 import os
-from typing import Optional, Dict, Tuple
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Tuple
 from dotenv import load_dotenv
 from pathlib import Path
+from utils.summary_cache import summary_cache, git_blob_sha
+from code_analyzer import CodeAnalyzer
+from utils.metrics import LLM_REQUEST_SECONDS
+from utils.token_counter import token_counter
+from summarizer_backends import (BackendRouter, GeminiBackend, HuggingFaceBackend, LocalBackend,
+                                 SummarizerBackend)
 
 # Load .env from the same directory
 load_dotenv(dotenv_path=Path(__file__).parent / ".env")
 
+# Bump whenever the analysis prompts change so cached summaries are not reused
+PROMPT_VERSION = '1'
+
+# Lines that start a top-level definition in the non-Python languages we read
+TOP_LEVEL_DEFINITION = re.compile(
+    r'^(export\s+)?(default\s+)?(public\s+|private\s+|protected\s+|internal\s+)?(static\s+)?(async\s+)?'
+    r'(def|class|function|func|fn|pub|impl|struct|interface|trait|enum|module|object|type|const|let|var|CREATE)\b'
+)
+
 class CodeSummarizer:
-    def __init__(self):
-        self.gemini_api_key = os.environ.get('GEMINI_API_KEY')
-        self.model = None
-        
-        if self.gemini_api_key and self.gemini_api_key != 'your_gemini_api_key_here':
-            try:
-                genai.configure(api_key=self.gemini_api_key)
-                self.model = genai.GenerativeModel('gemini-1.5-flash')
-                print("✅ Gemini API configured successfully.")
-            except Exception as e:
-                print(f"❌ Failed to configure Gemini API: {e}")
-                self.model = None
-        else:
-            print("❌ Gemini API key missing or invalid.")
+    def __init__(self, cache=None, backends: Optional[List[SummarizerBackend]] = None,
+                 router: Optional[BackendRouter] = None):
+        self.backends = {backend.name: backend
+                         for backend in backends or (GeminiBackend(), HuggingFaceBackend(), LocalBackend())}
+        # Explicit backends are tried in the order given
+        self.router = router or (BackendRouter(self.backends) if backends is None
+                                 else BackendRouter(self.backends, chain=list(self.backends), cheap_chain=[]))
+        self.cache = cache if cache is not None else summary_cache
+        self.analyzer = CodeAnalyzer()
+
+        # Small files are packed into shared prompts up to this many tokens / files
+        self.batch_token_budget = int(os.environ.get('SUMMARY_BATCH_TOKENS', 6000))
+        self.batch_max_files = int(os.environ.get('SUMMARY_BATCH_MAX_FILES', 8))
+
+        # Code tokens sent in a single prompt; larger files are summarized in chunks (map-reduce)
+        self.max_prompt_tokens = int(os.environ.get('SUMMARY_MAX_PROMPT_TOKENS', 2000))
+        self.max_chunks = int(os.environ.get('SUMMARY_MAX_CHUNKS', 12))
+        self._chunk_pool = ThreadPoolExecutor(max_workers=int(os.environ.get('SUMMARY_CHUNK_WORKERS', 4)),
+                                              thread_name_prefix='chunk')
+
+    @property
+    def model(self):
+        """The Gemini backend's model, configured on first access"""
+        return self.backends['gemini'].model
+
+    @model.setter
+    def model(self, model) -> None:
+        self.backends['gemini'].model = model
+
+    def get_status(self) -> Dict:
+        """Routing and backend configuration for /health, without configuring any client"""
+        return self.router.get_status()
 
     def is_code_file(self, filename: str) -> bool:
         code_extensions = {
@@ -32,20 +68,52 @@ class CodeSummarizer:
         }
         return any(filename.lower().endswith(ext) for ext in code_extensions)
 
-    def summarize_code(self, code_content: str, filename: str) -> Tuple[str, Dict]:
+    def _cache_key(self, filename: str, blob_sha: str, backend: SummarizerBackend) -> str:
+        return self.cache.make_key(blob_sha, self._get_file_type(filename), PROMPT_VERSION, backend.model_name)
+
+    def get_cached_summary(self, filename: str, blob_sha: str) -> Optional[Tuple[str, Dict]]:
+        """Look up a summary by git blob SHA without needing the file content.
+
+        Every backend's key is tried, but the cache counts one hit or miss per lookup.
+        """
+        for backend in self.router.cache_order():
+            cached = self.cache.get(self._cache_key(filename, blob_sha, backend), count=False)
+            if cached:
+                self.cache.record(hit=True)
+                summary, usage_info = cached
+                return summary, {**usage_info, **self._new_usage(), 'cost': 0.0, 'method_used': 'cache'}
+        self.cache.record(hit=False)
+        return None
+
+    def summarize_code(self, code_content: str, filename: str, blob_sha: Optional[str] = None,
+                       priority: Optional[str] = None, check_cache: bool = True) -> Tuple[str, Dict]:
+        """Summarize one file with the first routed backend that succeeds, else the rule engine.
+
+        priority 'low' sends the file to the cheap backends (see BackendRouter).
+        check_cache=False skips the cache lookup for a file the caller already missed on.
+        """
         usage_info = {
-            'api_calls': 0,
-            'tokens_used': 0,
+            **self._new_usage(),
             'method_used': 'rule_based',
-            'model_used': None
+            'model_used': None,
+            'cost': 0.0
         }
 
         try:
-            if self.model:
-                ai_summary, ai_usage = self._ai_summarize(code_content, filename)
+            blob_sha = blob_sha or git_blob_sha(code_content)
+            cached = self.get_cached_summary(filename, blob_sha) if check_cache else None
+            if cached:
+                return cached
+
+            for backend in self.router.route(self.get_token_usage_estimate(code_content), priority):
+                ai_summary, ai_usage = self._summarize_with(backend, code_content, filename)
+                if ai_usage['api_calls']:
+                    # Calls that came back unusable from earlier backends are paid for too
+                    self._merge_usage(usage_info, ai_usage)
+                    usage_info['cost'] += backend.cost(ai_usage['input_tokens'], ai_usage['output_tokens'])
                 if ai_summary:
-                    usage_info.update(ai_usage)
-                    usage_info['method_used'] = 'ai'
+                    usage_info.update(method_used='ai', model_used=backend.model_name, backend=backend.name)
+                    self.cache.put(self._cache_key(filename, blob_sha, backend), ai_summary, usage_info)
                     return ai_summary, usage_info
 
             summary = self._rule_based_summary(code_content, filename)
@@ -56,29 +124,218 @@ class CodeSummarizer:
             summary = self._rule_based_summary(code_content, filename)
             return summary, usage_info
 
-    def _ai_summarize(self, code_content: str, filename: str) -> Tuple[Optional[str], Dict]:
-        usage_info = {
-            'api_calls': 0,
-            'tokens_used': 0,
-            'model_used': 'gemini-1.5-flash'
-        }
+    def _summarize_with(self, backend: SummarizerBackend, code_content: str,
+                        filename: str) -> Tuple[Optional[str], Dict]:
+        if not backend.prompted:
+            return self._direct_summarize(backend, code_content, filename)
+        if token_counter.count(code_content) > self.max_prompt_tokens:
+            return self._map_reduce_summarize(backend, code_content, filename)
+        return self._ai_summarize(backend, code_content, filename)
+
+    def is_batchable(self, code_content: str) -> bool:
+        """Whether a file is small enough to share a prompt with others"""
+        return self.get_token_usage_estimate(code_content) <= self.batch_token_budget // 2
+
+    def summarize_many(self, files: List[Tuple], checked: bool = False) -> List[Tuple[str, Dict]]:
+        """Summarize several files, packing small ones into shared JSON prompts.
+
+        files holds (code_content, filename[, blob_sha[, priority]]) tuples;
+        results come back in the same order. Small files whose first routed
+        backend takes prompts are batched per backend. Large files, and files
+        whose summary is missing from a batch reply, go through summarize_code.
+        checked=True means the caller already looked up every file given with
+        a blob SHA, so only the others are looked up here.
+        """
+        results = [None] * len(files)
+        pending = {}
+
+        for index, item in enumerate(files):
+            code_content, filename = item[0], item[1]
+            blob_sha = item[2] if len(item) > 2 else None
+            priority = item[3] if len(item) > 3 else None
+            looked_up = checked and blob_sha
+            blob_sha = blob_sha or git_blob_sha(code_content)
+            cached = None if looked_up else self.get_cached_summary(filename, blob_sha)
+            if cached:
+                results[index] = cached
+                continue
+            backends = self.router.route(self.get_token_usage_estimate(code_content), priority)
+            if backends and backends[0].batchable and self.is_batchable(code_content):
+                pending.setdefault(backends[0].name, []).append((index, code_content, filename, blob_sha, priority))
+            else:
+                results[index] = self.summarize_code(code_content, filename, blob_sha, priority, check_cache=False)
+
+        for name, backend_pending in pending.items():
+            backend = self.backends[name]
+            for batch in self._pack_batches(backend_pending):
+                summaries, batch_usage = self._ai_summarize_batch(backend, batch) if len(batch) > 1 else ({}, {})
+                batch_usage = batch_usage or self._new_usage(backend)
+                # The call is charged to the batch's first file and its tokens are shared out by each
+                # file's code (input) and summary (output), whether or not the file's summary came back
+                input_shares = self._shares(batch_usage['input_tokens'],
+                                            [token_counter.count(item[1]) for item in batch])
+                output_shares = self._shares(batch_usage['output_tokens'],
+                                             [token_counter.count(summaries.get(item[0], '')) for item in batch])
+
+                for position, (index, code_content, filename, blob_sha, priority) in enumerate(batch):
+                    input_tokens, output_tokens = input_shares[position], output_shares[position]
+                    batch_share = {
+                        'api_calls': batch_usage['api_calls'] if position == 0 else 0,
+                        'tokens_used': input_tokens + output_tokens,
+                        'input_tokens': input_tokens,
+                        'output_tokens': output_tokens,
+                        'token_source': batch_usage['token_source']
+                    }
+                    summary = summaries.get(index)
+                    if not summary:
+                        # Only the files that did not come back parsed are retried, on top of their batch share
+                        summary, retry_usage = self.summarize_code(code_content, filename, blob_sha, priority,
+                                                                   check_cache=False)
+                        usage_info = {**retry_usage, 'cost': retry_usage.get('cost', 0.0) +
+                                      backend.cost(input_tokens, output_tokens)}
+                        self._merge_usage(usage_info, batch_share)
+                        results[index] = (summary, usage_info)
+                        continue
+                    usage_info = {
+                        **batch_share,
+                        'method_used': 'ai',
+                        'model_used': backend.model_name,
+                        'backend': backend.name,
+                        'cost': backend.cost(input_tokens, output_tokens),
+                        'batch_size': len(batch)
+                    }
+                    self.cache.put(self._cache_key(filename, blob_sha, backend), summary, usage_info)
+                    results[index] = (summary, usage_info)
+
+        return results
+
+    @staticmethod
+    def _shares(total: int, weights: List[int]) -> List[int]:
+        """Split total in proportion to weights, rounding so the shares add up to total"""
+        if not any(weights):
+            weights = [1] + [0] * (len(weights) - 1)
+        shares = [total * weight // sum(weights) for weight in weights]
+        shares[0] += total - sum(shares)
+        return shares
+
+    def _pack_batches(self, pending: List[Tuple]) -> List[List[Tuple]]:
+        batches, current, current_tokens = [], [], 0
+        for item in pending:
+            tokens = self.get_token_usage_estimate(item[1])
+            if current and (current_tokens + tokens > self.batch_token_budget or len(current) >= self.batch_max_files):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(item)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _new_usage(self, backend: Optional[SummarizerBackend] = None) -> Dict:
+        usage_info = {'api_calls': 0, 'tokens_used': 0, 'input_tokens': 0, 'output_tokens': 0, 'token_source': None}
+        if backend is not None:
+            usage_info['model_used'] = backend.model_name
+        return usage_info
+
+    def _merge_usage(self, usage_info: Dict, call_usage: Dict) -> None:
+        for key in ('api_calls', 'tokens_used', 'input_tokens', 'output_tokens'):
+            usage_info[key] += call_usage[key]
+        source = call_usage['token_source']
+        if source and usage_info['token_source'] not in (None, source):
+            source = 'mixed'
+        usage_info['token_source'] = source or usage_info['token_source']
+
+    def _generate(self, backend: SummarizerBackend, prompt: str, kind: str, usage_info: Dict) -> Optional[str]:
+        """One model call, timed per model and call kind ('file', 'batch', 'chunk', 'reduce').
+
+        The call and its tokens are added to usage_info: as the model reported
+        them, and otherwise counted locally with token_counter.
+        """
+        with LLM_REQUEST_SECONDS.time(model=backend.model_name, kind=kind, outcome='error') as labels:
+            text, reported = backend.generate(prompt)
+            labels['outcome'] = 'ok'
+        reported = reported or {}
+        input_tokens = reported.get('input_tokens') or token_counter.count(prompt)
+        output_tokens = reported.get('output_tokens') or token_counter.count(text or '')
+        if reported.get('input_tokens') and reported.get('output_tokens'):
+            source = 'reported'
+        else:
+            source = 'partial' if reported else 'tokenizer'
+        self._merge_usage(usage_info, {'api_calls': 1, 'tokens_used': input_tokens + output_tokens,
+                                       'input_tokens': input_tokens, 'output_tokens': output_tokens,
+                                       'token_source': source})
+        return text
+
+    def _ai_summarize_batch(self, backend: SummarizerBackend, batch: List[Tuple]) -> Tuple[Dict[int, str], Dict]:
+        """One model call for several files, returning ({index: summary}, usage)"""
+        usage_info = self._new_usage(backend)
+        try:
+            prompt = self._create_batch_prompt(batch)
+
+            print(f"🔁 Sending batch of {len(batch)} files to {backend.name}...")
+            text = self._generate(backend, prompt, 'batch', usage_info)
+
+            if not text:
+                print(f"❌ {backend.name} returned an empty response")
+                return {}, usage_info
+            return self._parse_batch_response(text, batch), usage_info
+
+        except Exception as e:
+            print(f"❌ Exception in _ai_summarize_batch: {e}")
+            return {}, usage_info
+
+    def _create_batch_prompt(self, batch: List[Tuple]) -> str:
+        sections = []
+        for file_id, (_, code_content, filename, *_) in enumerate(batch, 1):
+            sections.append(f"=== File {file_id}: {filename} ({self._get_file_type(filename)}) ===\n{code_content}")
+        files_text = "\n\n".join(sections)
+
+        return f"""Analyze each of the following {len(batch)} code files and provide a concise, technical summary in 1-2 sentences per file.
+
+Each summary should describe:
+1. What the code does (main purpose/functionality)
+2. Key components (classes, functions, modules used)
+3. Any notable patterns or complexity
+
+Respond with only a JSON object that maps each file number to its summary, for example {{"1": "...", "2": "..."}}.
+Start each summary directly with the description (no "This code" prefix).
+
+{files_text}"""
+
+    def _parse_batch_response(self, text: str, batch: List[Tuple]) -> Dict[int, str]:
+        # Models often wrap JSON in a code fence or add a sentence around it
+        start, end = text.find('{'), text.rfind('}')
+        if start == -1 or end <= start:
+            return {}
+        try:
+            parsed = json.loads(text[start:end + 1])
+        except ValueError:
+            return {}
+        if not isinstance(parsed, dict):
+            return {}
+
+        summaries = {}
+        for file_id, (index, *_) in enumerate(batch, 1):
+            summary = parsed.get(str(file_id))
+            if isinstance(summary, str) and summary.strip():
+                summaries[index] = self._clean_summary(summary.strip())
+        return summaries
+
+    def _ai_summarize(self, backend: SummarizerBackend, code_content: str, filename: str) -> Tuple[Optional[str], Dict]:
+        usage_info = self._new_usage(backend)
 
         try:
             prompt = self._create_analysis_prompt(code_content, filename)
-            
-            # Estimate token usage (Gemini counts tokens differently, but this is an approximation)
-            usage_info['tokens_used'] = len(prompt) // 4
 
-            print("🔁 Sending request to Gemini...")
-            response = self.model.generate_content(prompt)
-            usage_info['api_calls'] = 1
+            print(f"🔁 Sending request to {backend.name}...")
+            text = self._generate(backend, prompt, 'file', usage_info)
 
-            if response and response.text:
-                summary = self._clean_summary(response.text.strip())
+            if text:
+                summary = self._clean_summary(text.strip())
                 if summary:
                     return summary, usage_info
             else:
-                print("❌ Gemini API returned empty response")
+                print(f"❌ {backend.name} returned an empty response")
 
             return None, usage_info
 
@@ -86,12 +343,148 @@ class CodeSummarizer:
             print(f"❌ Exception in _ai_summarize: {e}")
             return None, usage_info
 
+    def _direct_summarize(self, backend: SummarizerBackend, code_content: str,
+                          filename: str) -> Tuple[Optional[str], Dict]:
+        """Summary from a backend that reads the code itself rather than a prompt"""
+        usage_info = self._new_usage(backend)
+        try:
+            text = self._generate(backend, code_content[:backend.max_input_chars], 'file', usage_info)
+            if text and text.strip():
+                return self._clean_summary(text.strip()), usage_info
+        except Exception as e:
+            print(f"❌ Exception in _direct_summarize ({backend.name}): {e}")
+        return None, usage_info
+
+    def _map_reduce_summarize(self, backend: SummarizerBackend, code_content: str,
+                              filename: str) -> Tuple[Optional[str], Dict]:
+        """Summarize a large file chunk by chunk in parallel, then combine the chunk summaries"""
+        usage_info = self._new_usage(backend)
+        chunks = self._split_chunks(code_content, filename)
+        omitted = max(len(chunks) - self.max_chunks, 0)
+        chunks = chunks[:self.max_chunks]
+
+        chunk_results = list(self._chunk_pool.map(
+            lambda numbered: self._summarize_chunk(backend, numbered[1], filename, numbered[0], len(chunks)),
+            enumerate(chunks, 1)
+        ))
+        for _, chunk_usage in chunk_results:
+            self._merge_usage(usage_info, chunk_usage)
+
+        chunk_summaries = [summary for summary, _ in chunk_results if summary]
+        if not chunk_summaries:
+            return None, usage_info
+        if omitted:
+            chunk_summaries.append(f"({omitted} further sections were not summarized)")
+
+        try:
+            prompt = self._create_reduce_prompt(chunk_summaries, filename)
+            print(f"🔁 Combining {len(chunk_summaries)} chunk summaries with {backend.name}...")
+            text = self._generate(backend, prompt, 'reduce', usage_info)
+            if text:
+                return self._clean_summary(text.strip()), usage_info
+            print(f"❌ {backend.name} returned an empty response")
+        except Exception as e:
+            print(f"❌ Exception in _map_reduce_summarize: {e}")
+        return None, usage_info
+
+    def _summarize_chunk(self, backend: SummarizerBackend, chunk: str, filename: str, part: int,
+                         total: int) -> Tuple[Optional[str], Dict]:
+        # Chunks are cached by their own content, so an edit only re-summarizes its chunk;
+        # the hit/miss counters are per file, so chunk lookups are not counted
+        key = self.cache.make_key(git_blob_sha(chunk), self._get_file_type(filename), f"{PROMPT_VERSION}-chunk",
+                                  backend.model_name)
+        cached = self.cache.get(key, count=False)
+        if cached:
+            return cached[0], self._new_usage()
+
+        usage_info = self._new_usage()
+        try:
+            prompt = self._create_chunk_prompt(chunk, filename, part, total)
+            text = self._generate(backend, prompt, 'chunk', usage_info)
+            if text:
+                summary = text.strip()
+                self.cache.put(key, summary, usage_info)
+                return summary, usage_info
+        except Exception as e:
+            print(f"❌ Exception in _summarize_chunk: {e}")
+        return None, usage_info
+
+    def _split_chunks(self, code_content: str, filename: str) -> List[str]:
+        """Split code into chunks of up to max_prompt_tokens on top-level definition boundaries"""
+        lines = code_content.splitlines(keepends=True)
+        starts = self._definition_starts(code_content, lines, filename)
+
+        # Segments run from one top-level definition to the next
+        bounds = sorted(set([0] + starts)) + [len(lines)]
+        segments = [''.join(lines[begin:end]) for begin, end in zip(bounds, bounds[1:]) if end > begin]
+
+        budget = self.max_prompt_tokens
+        chunks, current, current_tokens = [], '', 0
+        for segment in segments:
+            tokens = token_counter.count(segment)
+            if current and current_tokens + tokens > budget:
+                chunks.append(current)
+                current, current_tokens = '', 0
+            if tokens > budget:
+                # A single oversized definition is cut on line boundaries
+                for line in segment.splitlines(keepends=True):
+                    line_tokens = token_counter.count(line)
+                    if current and current_tokens + line_tokens > budget:
+                        chunks.append(current)
+                        current, current_tokens = '', 0
+                    if line_tokens > budget:
+                        line, line_tokens = token_counter.truncate(line, budget), budget
+                    current += line
+                    current_tokens += line_tokens
+            else:
+                current += segment
+                current_tokens += tokens
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _definition_starts(self, code_content: str, lines: List[str], filename: str) -> List[int]:
+        """0-based line numbers where top-level definitions begin"""
+        if filename.lower().endswith('.py'):
+            try:
+                tree = ast.parse(code_content)
+                return [
+                    min([node.lineno] + [decorator.lineno for decorator in node.decorator_list]) - 1
+                    for node in tree.body
+                    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+                ]
+            except (SyntaxError, ValueError):
+                pass
+        return [number for number, line in enumerate(lines) if TOP_LEVEL_DEFINITION.match(line)]
+
+    def _create_chunk_prompt(self, chunk: str, filename: str, part: int, total: int) -> str:
+        file_type = self._get_file_type(filename)
+        return f"""This is part {part} of {total} of the {file_type} file {filename}. Summarize what this part defines and does in 1-2 technical sentences, naming its key classes and functions.
+
+Code:
+{chunk}"""
+
+    def _create_reduce_prompt(self, chunk_summaries: List[str], filename: str) -> str:
+        file_type = self._get_file_type(filename)
+        sections = "\n".join(f"- {summary}" for summary in chunk_summaries)
+        return f"""These are summaries of consecutive sections of the {file_type} file {filename}:
+
+{sections}
+
+Combine them into a concise, technical summary of the whole file in 1-2 sentences that describes:
+1. What this code does (main purpose/functionality)
+2. Key components (classes, functions, modules used)
+3. Any notable patterns or complexity
+
+Keep the summary concise and technical, starting directly with the description (no "This code" prefix)."""
+
     def _create_analysis_prompt(self, code_content: str, filename: str) -> str:
         file_type = self._get_file_type(filename)
         
         # Truncate code if too long to avoid token limits
-        if len(code_content) > 8000:
-            code_content = code_content[:8000] + "\n... (truncated)"
+        truncated = token_counter.truncate(code_content, self.max_prompt_tokens)
+        if len(truncated) < len(code_content):
+            code_content = truncated + "\n... (truncated)"
         
         return f"""Analyze this {file_type} code and provide a concise, technical summary in 1-2 sentences.
 
@@ -127,12 +520,11 @@ Keep the summary concise and technical, starting directly with the description (
         return summary
 
     def _rule_based_summary(self, code_content: str, filename: str) -> str:
-        lines = code_content.splitlines()
-        total_lines = len(lines)
-        file_type = self._get_file_type(filename)
-        analysis = self._analyze_code_structure(lines, file_type)
+        return self.structure_summary(self.analyze_structure(code_content, filename))
 
-        summary = [f"This {file_type} file contains {total_lines} lines of code"]
+    def structure_summary(self, analysis: Dict) -> str:
+        """Plain-language summary of an analyze_structure result"""
+        summary = [f"This {analysis['language']} file contains {analysis['lines']} lines of code"]
         
         if analysis['functions']:
             summary.append(f"{analysis['functions']} function(s)")
@@ -146,43 +538,17 @@ Keep the summary concise and technical, starting directly with the description (
             summary.append("appears to be complex with multiple components")
         elif analysis['complexity'] == 'medium':
             summary.append("has moderate complexity")
+        if analysis['cyclomatic_complexity'] > 1:
+            summary.append(f"estimated cyclomatic complexity {analysis['cyclomatic_complexity']}")
 
         return ". ".join(summary) + '.'
 
-    def _analyze_code_structure(self, lines: list, file_type: str) -> Dict:
-        analysis = {'functions': 0, 'classes': 0, 'imports': 0, 'purpose': '', 'complexity': 'low'}
-        
-        for line in lines:
-            s = line.strip()
-            if any(p in s for p in ['def ', 'function ', 'func ', 'fn ']):
-                analysis['functions'] += 1
-            if any(p in s for p in ['class ', 'interface ', 'struct ']):
-                analysis['classes'] += 1
-            if any(s.startswith(p) for p in ['import ', 'from ', '#include', 'require(', 'use ']):
-                analysis['imports'] += 1
-
-        # Look for purpose in comments
-        for line in lines[:15]:
-            s = line.strip()
-            if any(s.startswith(p) for p in ['# ', '// ', '/* ', '* ', '"""', "'''"]):
-                comment = s
-                for p in ['# ', '// ', '/* ', '* ', '"""', "'''"]:
-                    comment = comment.replace(p, '').strip()
-                if len(comment) > 20 and not comment.lower().startswith(('todo', 'fixme', 'hack')):
-                    analysis['purpose'] = comment[:100] + ('...' if len(comment) > 100 else '')
-                    break
-
-        # Determine complexity
-        total = analysis['functions'] + analysis['classes']
-        if total > 10:
-            analysis['complexity'] = 'high'
-        elif total > 3:
-            analysis['complexity'] = 'medium'
-
-        return analysis
+    def analyze_structure(self, code_content: str, filename: str) -> Dict:
+        """Functions, classes, imports, docstrings and complexity of a file, without calling the model"""
+        return self.analyzer.analyze(code_content, self._get_file_type(filename), filename)
 
     def get_token_usage_estimate(self, text: str) -> int:
-        return max(1, len(text) // 4)
+        return max(1, token_counter.count(text))
 
     def _get_file_type(self, filename: str) -> str:
         ext = filename.lower().split('.')[-1] if '.' in filename else ''
@@ -0,0 +1,354 @@
+import importlib.util
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from utils.circuit_breaker import CircuitBreaker, CircuitOpen
+from utils.rate_limiter import AdaptiveLimiter
+
+RULE_BASED = 'rule_based'
+
+class BackendBusy(Exception):
+    """No concurrency slot of a backend freed up within its timeout"""
+
+def is_overload(error: Exception) -> bool:
+    """Whether an error means the backend is overloaded (HTTP 429 or a timeout) rather than broken"""
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None) or getattr(error, 'code', None)
+    if status in (429, 504):
+        return True
+    # google.api_core raises ResourceExhausted / DeadlineExceeded, requests raises Timeout
+    return isinstance(error, TimeoutError) or type(error).__name__ in (
+        'ResourceExhausted', 'DeadlineExceeded', 'Timeout', 'ReadTimeout', 'ConnectTimeout')
+
+class SummarizerBackend:
+    """A model that summarizes code, with its own concurrency limit, timeout and cost.
+
+    Prompted backends take the prompts CodeSummarizer builds (single file,
+    batch, chunk and reduce); the others are given the code itself. Limits
+    and prices come from SUMMARY_<NAME>_CONCURRENCY, SUMMARY_<NAME>_TIMEOUT
+    and SUMMARY_<NAME>_COST_PER_1K (input tokens; output tokens are priced
+    by SUMMARY_<NAME>_OUTPUT_COST_PER_1K, the input price by default). The
+    timeout covers waiting for a free
+    slot as well as the call, so a saturated backend fails fast with
+    BackendBusy and the file moves on to the next backend.
+
+    Concurrency adapts between SUMMARY_<NAME>_MIN_CONCURRENCY and the
+    configured maximum (AdaptiveLimiter, on SUMMARY_<NAME>_LATENCY_TARGET
+    and 429s), and SUMMARY_<NAME>_BREAKER_FAILURES consecutive failures
+    open the backend's circuit breaker: the router skips it until a
+    background probe, every SUMMARY_<NAME>_BREAKER_RECOVERY seconds at
+    first, succeeds.
+    """
+
+    name = ''
+    prompted = True
+    batchable = True
+    default_concurrency = 4
+    default_timeout = 60.0
+    default_latency_target = 15.0
+    default_cost_per_1k = 0.0
+    default_output_cost_per_1k = None
+    probe_text = 'Reply with the single word OK.'
+
+    def __init__(self, model_name: str, concurrency: int = None, timeout: float = None, cost_per_1k: float = None,
+                 output_cost_per_1k: float = None):
+        prefix = f"SUMMARY_{self.name.upper()}_"
+        self.model_name = model_name
+        self.concurrency = concurrency or int(os.environ.get(prefix + 'CONCURRENCY', self.default_concurrency))
+        self.timeout = timeout or float(os.environ.get(prefix + 'TIMEOUT', self.default_timeout))
+        self.cost_per_1k = (cost_per_1k if cost_per_1k is not None
+                            else float(os.environ.get(prefix + 'COST_PER_1K', self.default_cost_per_1k)))
+        default_output_cost = (self.default_output_cost_per_1k if self.default_output_cost_per_1k is not None
+                               else self.cost_per_1k)
+        self.output_cost_per_1k = (output_cost_per_1k if output_cost_per_1k is not None
+                                   else float(os.environ.get(prefix + 'OUTPUT_COST_PER_1K', default_output_cost)))
+        self.limiter = AdaptiveLimiter(
+            self.concurrency, min_limit=int(os.environ.get(prefix + 'MIN_CONCURRENCY', 1)),
+            latency_target=float(os.environ.get(prefix + 'LATENCY_TARGET', self.default_latency_target)))
+        self.breaker = CircuitBreaker(
+            self.name, probe=self._probe, failure_threshold=int(os.environ.get(prefix + 'BREAKER_FAILURES', 5)),
+            recovery_time=float(os.environ.get(prefix + 'BREAKER_RECOVERY', 30)))
+        self._stats_lock = threading.Lock()
+        self.stats = {'calls': 0, 'errors': 0, 'busy': 0}
+
+    def available(self) -> bool:
+        """Whether the backend is configured; must not load or contact the model"""
+        raise NotImplementedError
+
+    def _call(self, text: str, timeout: float) -> Tuple[Optional[str], Optional[Dict]]:
+        """Generated text and the token usage the model reported ({'input_tokens', 'output_tokens'},
+        either may be missing), or None when it reports none"""
+        raise NotImplementedError
+
+    def accepting(self) -> bool:
+        """Configured and not cut off by an open circuit breaker"""
+        return self.available() and self.breaker.allow()
+
+    def generate(self, text: str) -> Tuple[Optional[str], Optional[Dict]]:
+        """Text generated for a prompt (or summary of code, for unprompted backends) and reported usage"""
+        if not self.breaker.allow():
+            raise CircuitOpen(f"{self.name}: circuit open")
+        start = time.monotonic()
+        if not self.limiter.acquire(timeout=self.timeout):
+            self._count('busy')
+            raise BackendBusy(f"{self.name}: all {self.limiter.get_state()['limit']} slots busy for {self.timeout:g}s")
+        call_start = time.monotonic()
+        try:
+            result = self._call(text, max(self.timeout - (call_start - start), 1.0))
+        except Exception as e:
+            self._count('errors')
+            overloaded = is_overload(e)
+            self.limiter.release(time.monotonic() - call_start, 'overload' if overloaded else 'error')
+            self.breaker.record_failure(e)
+            raise
+        self._count('calls')
+        self.limiter.release(time.monotonic() - call_start)
+        self.breaker.record_success()
+        return result
+
+    def _probe(self) -> None:
+        """One small call outside the limiter, run by the circuit breaker to test recovery"""
+        if not self.available():
+            raise RuntimeError(f"{self.name} is not configured")
+        self._call(self.probe_text, self.timeout)
+
+    def cost(self, input_tokens: int, output_tokens: int = 0) -> float:
+        return input_tokens / 1000 * self.cost_per_1k + output_tokens / 1000 * self.output_cost_per_1k
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def get_status(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {'model': self.model_name, 'available': self.available(), 'timeout_s': self.timeout,
+                'cost_per_1k': self.cost_per_1k, 'output_cost_per_1k': self.output_cost_per_1k,
+                'concurrency': self.limiter.get_state(),
+                'breaker': self.breaker.get_state(), **stats}
+
+class GeminiBackend(SummarizerBackend):
+    name = 'gemini'
+    default_concurrency = 8
+    default_cost_per_1k = 0.0002
+
+    def __init__(self, api_key: str = None, model_name: str = None, **limits):
+        super().__init__(model_name or os.environ.get('GEMINI_MODEL', 'gemini-1.5-flash'), **limits)
+        self.api_key = api_key if api_key is not None else os.environ.get('GEMINI_API_KEY')
+        # The Gemini client is imported and configured on first use (see model)
+        self._model = None
+        self._model_configured = False
+        self._model_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """Gemini model, or None without a usable API key; set up on first access"""
+        if not self._model_configured:
+            with self._model_lock:
+                if not self._model_configured:
+                    self._model = self._configure_model()
+                    self._model_configured = True
+        return self._model
+
+    @model.setter
+    def model(self, model) -> None:
+        self._model = model
+        self._model_configured = True
+
+    def _configure_model(self):
+        if not self.api_key_set():
+            print("❌ Gemini API key missing or invalid.")
+            return None
+        try:
+            # Importing the client library alone takes about a second, so it waits until needed
+            import google.generativeai as genai
+            genai.configure(api_key=self.api_key)
+            model = genai.GenerativeModel(self.model_name)
+            print("✅ Gemini API configured successfully.")
+            return model
+        except Exception as e:
+            print(f"❌ Failed to configure Gemini API: {e}")
+            return None
+
+    def api_key_set(self) -> bool:
+        return bool(self.api_key) and self.api_key != 'your_gemini_api_key_here'
+
+    def available(self) -> bool:
+        return self._model is not None if self._model_configured else self.api_key_set()
+
+    def _call(self, text: str, timeout: float) -> Tuple[Optional[str], Optional[Dict]]:
+        model = self.model
+        if model is None:
+            raise RuntimeError('Gemini is not configured')
+        response = model.generate_content(text, request_options={'timeout': timeout})
+        if not response:
+            return None, None
+        metadata = getattr(response, 'usage_metadata', None)
+        usage = None
+        if metadata is not None and getattr(metadata, 'prompt_token_count', None):
+            usage = {'input_tokens': metadata.prompt_token_count,
+                     'output_tokens': getattr(metadata, 'candidates_token_count', None)}
+        return response.text, usage
+
+    def get_status(self) -> Dict:
+        return {**super().get_status(), 'api_key_set': self.api_key_set(),
+                'client_configured': self._model is not None if self._model_configured else None}
+
+class HuggingFaceBackend(SummarizerBackend):
+    """Text generation through the Hugging Face Inference API"""
+
+    name = 'huggingface'
+    default_cost_per_1k = 0.0002
+
+    def __init__(self, token: str = None, model_name: str = None, **limits):
+        super().__init__(model_name or os.environ.get('HF_SUMMARY_MODEL', 'mistralai/Mistral-7B-Instruct-v0.3'),
+                         **limits)
+        self.token = token if token is not None else os.environ.get('HUGGING_FACE_TOKEN')
+        self.url = os.environ.get('HF_INFERENCE_URL',
+                                  'https://api-inference.huggingface.co/models/{model}').format(model=self.model_name)
+        self.max_new_tokens = int(os.environ.get('HF_MAX_NEW_TOKENS', 512))
+        self._session = requests.Session()
+
+    def available(self) -> bool:
+        return bool(self.token) and self.token != 'your_hugging_face_token_here'
+
+    def _call(self, text: str, timeout: float) -> Tuple[Optional[str], Optional[Dict]]:
+        response = self._session.post(self.url, headers={'Authorization': f'Bearer {self.token}'}, json={
+            'inputs': text,
+            'parameters': {'max_new_tokens': self.max_new_tokens, 'return_full_text': False, 'details': True},
+            'options': {'wait_for_model': True}
+        }, timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+        if isinstance(data, list) and data:
+            data = data[0]
+        if not isinstance(data, dict):
+            return None, None
+        # Text generation only reports the generated token count
+        generated = (data.get('details') or {}).get('generated_tokens')
+        return data.get('generated_text'), {'output_tokens': generated} if generated else None
+
+class LocalBackend(SummarizerBackend):
+    """A code summarization model run on the CPU with transformers, without network access.
+
+    The model (LOCAL_SUMMARY_MODEL, a seq2seq model or a local path to one)
+    is loaded on first use. It is given the start of the file rather than a
+    prompt, and its calls are not batched.
+    """
+
+    name = 'local'
+    prompted = False
+    batchable = False
+    default_concurrency = 1
+    default_timeout = 120.0
+    default_latency_target = 60.0
+    probe_text = 'def probe():\n    return True\n'
+
+    def __init__(self, model_name: str = None, max_input_chars: int = None, **limits):
+        super().__init__(model_name or os.environ.get('LOCAL_SUMMARY_MODEL', 'Salesforce/codet5-base-multi-sum'),
+                         **limits)
+        self.max_input_chars = max_input_chars or int(os.environ.get('LOCAL_SUMMARY_MAX_CHARS', 2000))
+        self._installed = importlib.util.find_spec('transformers') is not None
+        self._pipeline = None
+        self._load_failed = False
+        self._load_lock = threading.Lock()
+
+    def available(self) -> bool:
+        return self._installed and not self._load_failed
+
+    def _load(self):
+        with self._load_lock:
+            if self._pipeline is None and not self._load_failed:
+                try:
+                    from transformers import pipeline
+                    self._pipeline = pipeline('text2text-generation', model=self.model_name, device=-1)
+                    print(f"✅ Local summarization model {self.model_name} loaded.")
+                except Exception as e:
+                    self._load_failed = True
+                    print(f"❌ Failed to load local summarization model {self.model_name}: {e}")
+        return self._pipeline
+
+    def _call(self, text: str, timeout: float) -> Tuple[Optional[str], Optional[Dict]]:
+        model = self._load()
+        if model is None:
+            raise RuntimeError('Local summarization model is not loaded')
+        text = text[:self.max_input_chars]
+        output = model(text, max_length=128, truncation=True)
+        if not output:
+            return None, None
+        summary = output[0]['generated_text']
+        # Counted with the model's own tokenizer, so as exact as a reported count
+        tokenizer = model.tokenizer
+        return summary, {'input_tokens': min(len(tokenizer.encode(text)), tokenizer.model_max_length),
+                         'output_tokens': len(tokenizer.encode(summary))}
+
+class BackendRouter:
+    """Chooses, per file, the backends to try in order.
+
+    Files go through SUMMARY_BACKENDS. Files estimated at no more than
+    SUMMARY_CHEAP_MAX_TOKENS tokens, and low-priority ones (ranked below the
+    top SUMMARY_PRIORITY_FILES in repository scope), go through
+    SUMMARY_CHEAP_BACKENDS instead, unless none of those is available.
+    Unavailable backends are skipped; 'rule_based' in a list ends it there,
+    and the rule engine is always the last resort.
+    """
+
+    def __init__(self, backends: Dict[str, SummarizerBackend], chain: List[str] = None, cheap_chain: List[str] = None,
+                 cheap_max_tokens: int = None, priority_files: int = None):
+        self.backends = backends
+        self.chain = (chain if chain is not None
+                      else self._names(os.environ.get('SUMMARY_BACKENDS', 'gemini,huggingface')))
+        self.cheap_chain = (cheap_chain if cheap_chain is not None
+                            else self._names(os.environ.get('SUMMARY_CHEAP_BACKENDS', 'local')))
+        self.cheap_max_tokens = (cheap_max_tokens if cheap_max_tokens is not None
+                                 else int(os.environ.get('SUMMARY_CHEAP_MAX_TOKENS', 0)))
+        # 0 treats every selected file as high priority
+        self.priority_files = (priority_files if priority_files is not None
+                               else int(os.environ.get('SUMMARY_PRIORITY_FILES', 0)))
+        for name in self.chain + self.cheap_chain:
+            if name != RULE_BASED and name not in backends:
+                raise ValueError(f"Unknown summarizer backend \"{name}\"; expected one of: "
+                                 f"{', '.join(list(backends) + [RULE_BASED])}")
+
+    @staticmethod
+    def _names(value: str) -> List[str]:
+        return [name.strip() for name in value.split(',') if name.strip()]
+
+    def _resolve(self, names: List[str]) -> Tuple[List[SummarizerBackend], bool]:
+        """(available backends in order, whether the list ends at rule_based)"""
+        backends = []
+        for name in names:
+            if name == RULE_BASED:
+                return backends, True
+            if self.backends[name].accepting():
+                backends.append(self.backends[name])
+        return backends, False
+
+    def is_cheap(self, tokens: int, priority: Optional[str] = None) -> bool:
+        return priority == 'low' or tokens <= self.cheap_max_tokens
+
+    def route(self, tokens: int, priority: Optional[str] = None) -> List[SummarizerBackend]:
+        """Backends to try for a file, best first; empty means the rule engine"""
+        if self.is_cheap(tokens, priority):
+            backends, ends_rule_based = self._resolve(self.cheap_chain)
+            if backends or ends_rule_based:
+                return backends
+        return self._resolve(self.chain)[0]
+
+    def cache_order(self) -> List[SummarizerBackend]:
+        """Every backend whose cached summaries can be reused, preferred first"""
+        names = [name for name in self.chain + self.cheap_chain if name != RULE_BASED]
+        return [self.backends[name] for name in dict.fromkeys(names)]
+
+    def get_status(self) -> Dict:
+        return {
+            'chain': self.chain,
+            'cheap_chain': self.cheap_chain,
+            'cheap_max_tokens': self.cheap_max_tokens,
+            'priority_files': self.priority_files,
+            'backends': {name: backend.get_status() for name, backend in self.backends.items()}
+        }
@@ -0,0 +1,58 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+from fake_services import FakeGeminiModel, FakeGitHubServer
+from load_test import load_app, state_environment
+from utils.rate_limiter import RateLimitScheduler
+
+# Modules read their state paths when first imported, and some test modules
+# import them at collection, before any fixture runs
+STATE_DIR = tempfile.mkdtemp(prefix='reporeader-tests-')
+os.environ.update(state_environment(STATE_DIR))
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(STATE_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope='session')
+def github():
+    """Fake GitHub API shared by the session; its rate limit can be changed per test"""
+    server = FakeGitHubServer(repo_files=30, file_size=400, org_repos=5).start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture(scope='session')
+def app_module(github):
+    """app.py against the fake GitHub API and model, with its state in STATE_DIR"""
+    module = load_app(STATE_DIR, github.url)
+    module.code_summarizer.model = FakeGeminiModel(latency=0, per_1k_tokens=0)
+    yield module
+    module.token_tracker.close()
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def rate_limit(app_module, github, monkeypatch):
+    """set_limit(limit, **scheduler_options): a fresh GitHub rate limit window and app scheduler.
+
+    The scheduler never waits for a reset, so an exhausted budget fails at once.
+    """
+    def set_limit(limit: int, **scheduler_options):
+        github.reset_rate_limit(limit)
+        monkeypatch.setattr(app_module.github_fetcher, 'scheduler', RateLimitScheduler(max_wait=0, **scheduler_options))
+
+    yield set_limit
+    github.reset_rate_limit(5000)
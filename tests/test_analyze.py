@@ -0,0 +1,54 @@
+def test_sample_scope_reads_a_large_repository_from_the_tarball(app_module, github):
+    before = github.get_stats()['calls']
+
+    result, status = app_module.run_analysis('acme', 'bulk-sample', scope='sample', incremental=False)
+
+    assert status == 200
+    assert result['timings']['fetch_mode'] == 'tarball'
+    assert result['total_files_analyzed'] == app_module.MAX_ANALYZED_FILES
+    calls = github.get_stats()['calls']
+    assert calls['tarball'] - before.get('tarball', 0) == 1
+    assert calls.get('contents', 0) == before.get('contents', 0)
+
+
+def test_sample_scope_fetches_files_one_by_one_below_the_threshold(app_module, github, monkeypatch):
+    monkeypatch.setattr(app_module, 'BULK_DOWNLOAD_THRESHOLD', 100)
+    before = github.get_stats()['calls']
+
+    result, status = app_module.run_analysis('acme', 'per-file-sample', scope='sample', incremental=False)
+
+    assert status == 200
+    assert result['timings']['fetch_mode'] == 'contents'
+    assert github.get_stats()['calls'].get('tarball', 0) == before.get('tarball', 0)
+
+
+def test_incremental_run_reanalyzes_changed_files_and_carries_the_rest_forward(app_module, github, monkeypatch):
+    first, status = app_module.run_analysis('acme', 'carry-forward', scope='sample', incremental=False)
+    assert status == 200
+    entries = first['file_analysis']
+    modified, removed = entries[0]['path'], entries[1]['path']
+    # Store the analysis as if it were of an earlier commit, so the next run diffs against it
+    key = app_module.analysis_store.make_key('acme', 'carry-forward', 'main', 'sample')
+    app_module.analysis_store.save(key, 'base-sha', first)
+    diff = {'status': 'ahead', 'ahead_by': 1, 'complete': True, 'files': [
+        {'path': modified, 'name': modified.rsplit('/', 1)[-1], 'status': 'modified',
+         'sha': entries[0].get('sha'), 'previous_path': None},
+        {'path': removed, 'name': removed.rsplit('/', 1)[-1], 'status': 'removed', 'sha': None, 'previous_path': None},
+    ]}
+    monkeypatch.setattr(app_module.github_fetcher, 'compare_commits', lambda *args: diff)
+    before = github.get_stats()['calls']
+
+    second, status = app_module.run_analysis('acme', 'carry-forward', scope='sample', incremental=True)
+
+    assert status == 200
+    assert second['timings']['fetch_mode'] == 'incremental'
+    assert second['coverage']['incremental'] == {
+        'base_sha': 'base-sha', 'changed_files': 2, 'reanalyzed_files': 1, 'removed_files': 1,
+        'carried_forward': len(entries) - 2
+    }
+    paths = [entry['path'] for entry in second['file_analysis']]
+    assert removed not in paths and modified in paths
+    assert len(paths) == len(entries) - 1
+    calls = github.get_stats()['calls']
+    assert calls.get('contents', 0) - before.get('contents', 0) == 1
+    assert calls.get('tarball', 0) == before.get('tarball', 0)
@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from batch import BatchStore
+
+
+def run(app_module, batch_id):
+    records = list(app_module.batch_runner.run(batch_id))
+    return [record for record in records if record['type'] == 'result'], records[-1]
+
+
+def test_rate_limited_org_batch_leaves_the_rest_pending_and_resumes(app_module, rate_limit):
+    # The org listing and about two analyses fit in the window
+    rate_limit(13)
+    batch_id = app_module.batch_runner.create(owner='acme', scope='sample', incremental=False, backend='github')
+
+    results, summary = run(app_module, batch_id)
+
+    assert summary['stopped'] == 'rate_limited'
+    assert summary['pending'] > 0
+    assert summary['done'] + summary['failed'] + summary['pending'] == 5
+    for record in results:
+        # Nothing is stored as done with its files silently missing
+        assert record['status_code'] == 200
+        assert record['result']['total_files_analyzed'] == app_module.MAX_ANALYZED_FILES
+    counts = app_module.batch_runner.get(batch_id)['counts']
+    assert counts.get('pending') == summary['pending']
+
+    rate_limit(5000)
+    resumed_results, resumed_summary = run(app_module, batch_id)
+
+    assert resumed_summary['stopped'] is None
+    assert resumed_summary['pending'] == 0
+    assert resumed_summary['done'] == summary['pending']
+    assert sum(1 for record in resumed_results if record.get('resumed')) == len(results)
+    assert app_module.batch_runner.get(batch_id)['counts'] == {'done': 5}
+
+
+def test_analyses_in_flight_are_stored_when_the_stream_is_closed(app_module):
+    batch_id = app_module.batch_runner.create(repos=[('acme', f'closed-{n}') for n in range(3)],
+                                              scope='sample', incremental=False, backend='github')
+    records = app_module.batch_runner.run(batch_id)
+    assert next(records)['type'] == 'batch'
+    # Every repository is submitted before the first result comes back
+    assert next(records)['type'] == 'result'
+    records.close()
+
+    deadline = time.monotonic() + 30
+    while app_module.batch_runner.get(batch_id)['counts'].get('done', 0) < 3 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert app_module.batch_runner.get(batch_id)['counts'] == {'done': 3}
+
+
+def test_batch_store_keeps_outcomes_across_instances(tmp_path):
+    path = str(tmp_path / 'batches.db')
+    store = BatchStore(path)
+    batch_id = store.create({'owner': None, 'ref': None, 'options': {}},
+                            [{'owner': 'acme', 'repo': 'one', 'repo_info': {'name': 'one'}},
+                             {'owner': 'acme', 'repo': 'two'}])
+    store.finish(batch_id, 1, 'done', {'repository': 'acme/two'})
+
+    reopened = BatchStore(path)
+    assert reopened.get(batch_id)['counts'] == {'pending': 1, 'done': 1}
+    assert [(item['repo'], item['status'], item['repo_info'], item['line']) for item in reopened.items(batch_id)] == [
+        ('one', 'pending', {'name': 'one'}, None), ('two', 'done', None, {'repository': 'acme/two'})]
+    assert reopened.get('missing') is None
+
+
+def test_batch_skips_duplicate_repositories_and_rejects_empty_ones(app_module):
+    batch_id = app_module.batch_runner.create(repos=[('acme', 'dup'), ('ACME', 'Dup'), ('acme', 'other')])
+
+    assert app_module.batch_runner.get(batch_id)['total'] == 2
+    with pytest.raises(ValueError):
+        app_module.batch_runner.create(repos=[])
@@ -0,0 +1,51 @@
+import threading
+import time
+
+from utils.circuit_breaker import CLOSED, OPEN, CircuitBreaker
+
+
+def wait_for(condition, timeout: float = 2.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return condition()
+
+
+def test_breaker_opens_after_consecutive_failures_only():
+    breaker = CircuitBreaker('test', failure_threshold=3, recovery_time=60)
+    breaker.record_failure(RuntimeError('one'))
+    breaker.record_failure(RuntimeError('two'))
+    breaker.record_success()
+    breaker.record_failure(RuntimeError('three'))
+    assert breaker.allow()
+
+    breaker.record_failure(RuntimeError('four'))
+    breaker.record_failure(RuntimeError('five'))
+
+    assert not breaker.allow()
+    state = breaker.get_state()
+    assert (state['state'], state['opened'], state['last_error']) == (OPEN, 1, 'five')
+
+
+def test_failed_probe_backs_off_and_a_successful_one_closes_the_breaker():
+    healthy = threading.Event()
+    calls = []
+
+    def probe():
+        calls.append(time.time())
+        if not healthy.is_set():
+            raise RuntimeError('still down')
+
+    breaker = CircuitBreaker('test', probe=probe, failure_threshold=1, recovery_time=0.01, max_recovery_time=0.02)
+    breaker.record_failure(RuntimeError('down'))
+
+    assert wait_for(lambda: len(calls) >= 2)
+    assert breaker.get_state()['probe_interval_s'] == 0.02
+    assert not breaker.allow()
+
+    healthy.set()
+    assert wait_for(lambda: breaker.get_state()['state'] == CLOSED)
+    assert breaker.allow()
+    assert breaker.get_state()['consecutive_failures'] == 0
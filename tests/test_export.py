@@ -0,0 +1,34 @@
+import pytest
+
+
+@pytest.fixture(scope='module')
+def analysis_id(app_module):
+    result, status = app_module.run_analysis('acme', 'export', scope='sample', incremental=False)
+    assert status == 200
+    return result['analysis_id']
+
+
+@pytest.mark.parametrize('format, content_type', [
+    ('md', 'text/markdown; charset=utf-8'),
+    ('txt', 'text/plain; charset=utf-8'),
+    ('docx', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'),
+])
+def test_export_headers(client, analysis_id, format, content_type):
+    response = client.get(f'/export/{format}?analysis_id={analysis_id}')
+
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == content_type
+    assert response.headers['Content-Disposition'] == f'attachment; filename="export_analysis.{format}"'
+    assert response.data
+
+
+def test_export_revalidates_with_its_etag(client, analysis_id):
+    first = client.get(f'/export/md?analysis_id={analysis_id}')
+
+    again = client.get(f'/export/md?analysis_id={analysis_id}', headers={'If-None-Match': first.headers['ETag']})
+
+    assert again.status_code == 304
+
+
+def test_export_of_an_unknown_analysis_is_a_404(client):
+    assert client.get('/export/md?analysis_id=missing').status_code == 404
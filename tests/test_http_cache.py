@@ -0,0 +1,81 @@
+import requests
+
+from github_fetcher import GitHubFetcher
+from utils.http_cache import ResponseCache
+from utils.rate_limiter import RateLimitScheduler
+
+
+def response(body: bytes, etag: str = '"v1"') -> requests.Response:
+    reply = requests.Response()
+    reply.status_code = 200
+    reply._content = body
+    reply.headers['ETag'] = etag
+    reply.headers['Content-Type'] = 'application/json'
+    return reply
+
+
+def test_responses_without_validators_are_not_stored():
+    cache = ResponseCache()
+    reply = response(b'{}')
+    del reply.headers['ETag']
+    cache.store('key', reply)
+
+    assert cache.get('key') is None
+
+
+def test_memory_tier_is_bounded_by_body_bytes():
+    cache = ResponseCache(max_entries=100, memory_max_bytes=1000)
+    for n in range(5):
+        cache.store(f"key-{n}", response(b'x' * 240))
+
+    # 4 x 240 bytes fit; the oldest entry made room for the fifth
+    assert cache.get_stats()['memory_bytes'] == 960
+    assert cache.get('key-0') is None
+    assert cache.get('key-4')['body'] == b'x' * 240
+
+
+def test_replacing_an_entry_does_not_count_its_old_body():
+    cache = ResponseCache(memory_max_bytes=1000)
+    cache.store('key', response(b'x' * 200))
+    cache.store('key', response(b'y' * 100, etag='"v2"'))
+
+    assert cache.get_stats()['memory_bytes'] == 100
+    assert cache.get('key')['etag'] == '"v2"'
+
+
+def test_large_bodies_are_kept_on_disk_only(tmp_path):
+    cache = ResponseCache(cache_dir=str(tmp_path), memory_max_bytes=1000)
+    cache.store('small', response(b's' * 100))
+    cache.store('large', response(b'L' * 300))
+
+    stats = cache.get_stats()
+    assert stats['memory_entries'] == 1
+    assert stats['memory_bytes'] == 100
+    assert cache.get('large')['body'] == b'L' * 300
+    # A fresh cache on the same directory finds both on disk
+    assert ResponseCache(cache_dir=str(tmp_path)).get('small')['body'] == b's' * 100
+
+
+def test_disk_tier_evicts_the_least_recently_used_files(tmp_path):
+    cache = ResponseCache(cache_dir=str(tmp_path), disk_max_bytes=1000)
+    for n in range(6):
+        cache.store(f"key-{n}", response(b'x' * 120))
+
+    assert cache.get_stats()['disk_bytes'] <= 1000
+    assert not (tmp_path / 'key-0.json').exists()
+    assert (tmp_path / 'key-5.json').exists()
+
+
+def test_not_modified_replies_are_served_from_the_cache_and_refunded(github):
+    github.reset_rate_limit(5000)
+    fetcher = GitHubFetcher(base_url=github.url, response_cache=ResponseCache(),
+                            scheduler=RateLimitScheduler(max_wait=0))
+    first = fetcher.get_repo_info('acme', 'revalidated')
+    used = fetcher.get_rate_limit_info()['remaining']
+
+    second = fetcher.get_repo_info('acme', 'revalidated')
+
+    assert second == first
+    assert fetcher.response_cache.get_stats()['revalidated'] == 1
+    # The 304 was not charged against the rate limit
+    assert fetcher.get_rate_limit_info()['remaining'] == used
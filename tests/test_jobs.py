@@ -0,0 +1,78 @@
+import threading
+import time
+
+from jobs import JobQueue, MemoryJobStore, SQLiteJobStore
+
+
+def wait_for_job(queue: JobQueue, job_id: str, timeout: float = 2.0) -> dict:
+    deadline = time.time() + timeout
+    job = queue.get(job_id)
+    while job['status'] in ('queued', 'running') and time.time() < deadline:
+        time.sleep(0.005)
+        job = queue.get(job_id)
+    return job
+
+
+def test_identical_requests_share_one_job_while_it_runs():
+    release = threading.Event()
+    calls = []
+
+    def runner(owner, repo, ref, progress, **options):
+        calls.append((owner, repo, ref, options))
+        progress('repo_info', repo_info={'name': repo})
+        progress('file', index=0, file={})
+        release.wait(2)
+        return {'repo': repo}, 200
+
+    queue = JobQueue(runner, workers=2, store=MemoryJobStore())
+    first = queue.submit('acme', 'Widget', scope='sample')
+    second = queue.submit('ACME', 'widget', scope='sample')
+    other = queue.submit('acme', 'widget', scope='repository')
+    release.set()
+
+    assert second['id'] == first['id']
+    assert other['id'] != first['id']
+    job = wait_for_job(queue, first['id'])
+    assert (job['status'], job['status_code'], job['result']) == ('done', 200, {'repo': 'Widget'})
+    assert job['progress'] == {'stage': 'repo_info', 'completed': 1, 'total': 5, 'files_done': 1}
+    wait_for_job(queue, other['id'])
+    assert sorted(call[3]['scope'] for call in calls) == ['repository', 'sample']
+    # A finished job is no longer merged with new requests
+    assert queue.submit('acme', 'widget', scope='sample')['id'] != first['id']
+
+
+def test_failed_runs_record_the_error():
+    def runner(owner, repo, ref, progress):
+        if repo == 'missing':
+            return {'error': 'not found'}, 404
+        raise RuntimeError('boom')
+
+    queue = JobQueue(runner, workers=1, store=MemoryJobStore())
+    missing = wait_for_job(queue, queue.submit('acme', 'missing')['id'])
+    crashed = wait_for_job(queue, queue.submit('acme', 'crashed')['id'])
+
+    assert (missing['status'], missing['status_code'], missing['error']) == ('failed', 404, 'not found')
+    assert (crashed['status'], crashed['status_code'], crashed['error']) == ('failed', 500, 'Analysis failed: boom')
+
+
+def test_sqlite_store_fails_jobs_interrupted_by_a_restart(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    store = SQLiteJobStore(path)
+    store.save({'id': 'running', 'status': 'running', 'updated_at': '2024-01-01T00:00:00'})
+    store.save({'id': 'done', 'status': 'done', 'updated_at': '2024-01-01T00:00:00'})
+
+    reopened = SQLiteJobStore(path)
+
+    assert reopened.get('running')['status'] == 'failed'
+    assert reopened.get('running')['error'] == 'Interrupted by server restart'
+    assert reopened.get('done')['status'] == 'done'
+
+
+def test_memory_store_drops_the_oldest_finished_jobs_first():
+    store = MemoryJobStore(max_jobs=2)
+    store.save({'id': 'old', 'status': 'done'})
+    store.save({'id': 'pending', 'status': 'queued'})
+    store.save({'id': 'new', 'status': 'done'})
+
+    assert store.get('old') is None
+    assert store.get('pending') and store.get('new')
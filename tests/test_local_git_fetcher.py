@@ -0,0 +1,62 @@
+import os
+import subprocess
+
+import pytest
+
+from local_git_fetcher import LocalGitFetcher
+
+
+def git(cwd, *args):
+    subprocess.run(['git', '-c', 'user.name=Test', '-c', 'user.email=test@example.com', *args],
+                   cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def remotes(tmp_path):
+    """Three local repositories, acme/one to acme/three, with a few Python files each"""
+    for name in ('one', 'two', 'three'):
+        path = tmp_path / 'remotes' / 'acme' / name
+        path.mkdir(parents=True)
+        git(path, 'init', '--quiet', '--initial-branch=main')
+        for n in range(3):
+            (path / f'module_{n}.py').write_text(f"def handler_{n}():\n    return {n}\n")
+        git(path, 'add', '.')
+        git(path, 'commit', '--quiet', '-m', f'Add {name}')
+    return tmp_path / 'remotes'
+
+
+@pytest.fixture
+def fetcher(tmp_path, remotes):
+    # max_bytes of 1 evicts every mirror that is not in use as soon as another is resolved
+    return LocalGitFetcher(cache_dir=str(tmp_path / 'mirrors'), max_bytes=1,
+                           remote_url=f"file://{remotes}/{{owner}}/{{repo}}")
+
+
+def test_mirror_being_read_is_not_evicted(fetcher):
+    files = fetcher.iter_tarball_files('acme', 'one')
+    first_path, _ = next(files)
+    mirror = fetcher._mirror_path('acme', 'one')
+
+    assert fetcher.get_repo_tree('acme', 'two') is not None
+
+    assert os.path.isdir(mirror)
+    assert [path for path, _ in files] == [f'module_{n}.py' for n in range(3) if f'module_{n}.py' != first_path]
+
+    assert fetcher.get_repo_tree('acme', 'three') is not None
+    assert not os.path.exists(mirror)
+    assert fetcher.get_cache_stats()['evictions'] == 2
+
+
+def test_closed_reader_releases_its_mirror(fetcher):
+    files = fetcher.iter_tarball_files('acme', 'one')
+    next(files)
+    files.close()
+
+    fetcher.get_file_content('acme', 'two', 'module_0.py')
+
+    assert not os.path.exists(fetcher._mirror_path('acme', 'one'))
+
+
+def test_names_outside_the_mirror_directory_are_rejected(fetcher):
+    assert fetcher.get_repo_tree('..', 'one') is None
+    assert fetcher.get_file_content('acme', '../../etc', 'passwd') is None
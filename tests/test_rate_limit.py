@@ -0,0 +1,46 @@
+import pytest
+
+from github_fetcher import GitHubFetcher
+from utils.rate_limiter import RateLimitExceeded, RateLimitScheduler
+
+
+def test_analysis_is_a_429_when_a_required_request_runs_out_of_budget(app_module, rate_limit):
+    # Repository, commit SHA and tree fit; the tarball does not
+    rate_limit(3)
+
+    result, status = app_module.run_analysis('acme', 'exhausted', scope='sample', incremental=False)
+
+    assert status == 429
+    assert 'rate limit' in result['error']
+
+
+def test_shed_low_priority_sections_are_listed_in_coverage(app_module, rate_limit):
+    rate_limit(40, low_priority_reserve=0.95)
+
+    result, status = app_module.run_analysis('acme', 'shed-sections', scope='sample', incremental=False)
+
+    assert status == 200
+    assert result['total_files_analyzed'] == app_module.MAX_ANALYZED_FILES
+    assert result['commits'] == [] and result['contributors'] == []
+    assert result['coverage']['shed_sections'] == ['commits', 'contributors']
+
+
+def test_analyze_endpoint_returns_429(client, rate_limit):
+    rate_limit(1)
+
+    response = client.post('/analyze', json={'github_url': 'acme/endpoint-limit', 'incremental': False})
+
+    assert response.status_code == 429
+
+
+def test_fetcher_raises_on_a_rate_limit_reply_it_did_not_expect(github, rate_limit):
+    rate_limit(1)
+    # Two fetchers share the server's budget, but each only knows its own requests
+    first = GitHubFetcher(base_url=github.url, scheduler=RateLimitScheduler(max_wait=0))
+    second = GitHubFetcher(base_url=github.url, scheduler=RateLimitScheduler(max_wait=0))
+    assert first.get_repo_info('acme', 'shared-budget') is not None
+
+    with pytest.raises(RateLimitExceeded):
+        second.get_file_content('acme', 'shared-budget', 'README.md')
+    with pytest.raises(RateLimitExceeded):
+        second.get_recent_commits('acme', 'shared-budget')
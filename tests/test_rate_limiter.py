@@ -0,0 +1,105 @@
+import time
+
+import pytest
+
+from utils.rate_limiter import AdaptiveLimiter, RateLimitExceeded, RateLimitScheduler
+
+
+def headers(remaining: int, reset: float, limit: int = 100) -> dict:
+    return {'X-RateLimit-Remaining': str(remaining), 'X-RateLimit-Reset': str(int(reset)),
+            'X-RateLimit-Limit': str(limit)}
+
+
+def test_budget_is_unknown_until_a_response_reports_it():
+    scheduler = RateLimitScheduler(max_wait=0)
+    scheduler.acquire()
+
+    assert scheduler.get_rate_limit_info() is None
+
+
+def test_server_count_wins_over_local_reservations():
+    scheduler = RateLimitScheduler(max_wait=0)
+    reset = time.time() + 600
+    scheduler.update(headers(50, reset))
+    for _ in range(10):
+        scheduler.acquire()
+
+    # 304 revalidations are not charged, so the server may report more than was reserved locally
+    scheduler.update(headers(48, reset))
+
+    assert scheduler.get_rate_limit_info()['remaining'] == 48
+
+
+def test_late_response_from_the_previous_window_is_ignored():
+    scheduler = RateLimitScheduler(max_wait=0)
+    scheduler.update(headers(99, time.time() + 600))
+    scheduler.update(headers(3, time.time() - 10))
+
+    assert scheduler.get_rate_limit_info()['remaining'] == 99
+
+
+def test_low_priority_requests_are_shed_inside_the_reserve():
+    scheduler = RateLimitScheduler(low_priority_reserve=0.1, max_wait=0)
+    scheduler.update(headers(10, time.time() + 600))
+
+    with pytest.raises(RateLimitExceeded):
+        scheduler.acquire('low')
+    scheduler.acquire('high')
+
+    assert scheduler.get_state()['shed'] == 1
+    assert scheduler.get_rate_limit_info()['remaining'] == 9
+
+
+def test_exhausted_budget_is_rejected_when_the_reset_is_too_far_away():
+    scheduler = RateLimitScheduler(max_wait=5)
+    scheduler.update(headers(0, time.time() + 600))
+
+    with pytest.raises(RateLimitExceeded):
+        scheduler.acquire('high')
+    assert scheduler.get_state()['rejected'] == 1
+
+
+def test_release_gives_budget_back_up_to_the_limit():
+    scheduler = RateLimitScheduler(max_wait=0)
+    scheduler.update(headers(99, time.time() + 600))
+    scheduler.acquire()
+    scheduler.release()
+    scheduler.release()
+
+    assert scheduler.get_rate_limit_info()['remaining'] == 100
+
+
+def test_adaptive_limiter_grows_on_fast_calls_and_halves_on_overload():
+    limiter = AdaptiveLimiter(max_limit=8, min_limit=1, latency_target=1.0, cooldown=0)
+    limiter.limit = 4.0
+
+    assert limiter.acquire(timeout=0)
+    limiter.release(0.1)
+    assert limiter.limit == pytest.approx(4.25)
+
+    assert limiter.acquire(timeout=0)
+    limiter.release(0.1, outcome='overload')
+    assert limiter.limit == pytest.approx(2.125)
+
+    # Errors that are not overloads leave the limit alone
+    assert limiter.acquire(timeout=0)
+    limiter.release(0.1, outcome='error')
+    assert limiter.limit == pytest.approx(2.125)
+
+
+def test_adaptive_limiter_counts_a_burst_of_overloads_once_per_cooldown():
+    limiter = AdaptiveLimiter(max_limit=8, latency_target=1.0, cooldown=60)
+    for _ in range(3):
+        assert limiter.acquire(timeout=0)
+    for _ in range(3):
+        limiter.release(5.0)
+
+    assert limiter.get_state()['limit'] == 4
+    assert limiter.get_state()['overloads'] == 3
+
+
+def test_adaptive_limiter_times_out_when_every_slot_is_taken():
+    limiter = AdaptiveLimiter(max_limit=1)
+    assert limiter.acquire(timeout=0)
+
+    assert not limiter.acquire(timeout=0.01)
@@ -0,0 +1,63 @@
+import time
+
+from fake_services import FakeGeminiModel
+from summarizer import CodeSummarizer
+from summarizer_backends import GeminiBackend
+from utils.summary_cache import SummaryCache, git_blob_sha
+
+
+def make_summarizer(tmp_path) -> CodeSummarizer:
+    backend = GeminiBackend(api_key='fake')
+    backend.model = FakeGeminiModel(latency=0, per_1k_tokens=0)
+    return CodeSummarizer(cache=SummaryCache(path=str(tmp_path / 'summaries.db')), backends=[backend])
+
+
+def large_module(functions: int = 300) -> str:
+    return ''.join(f"def handler_{n}(request):\n    return {{'id': {n}, 'path': request.path}}\n\n\n"
+                   for n in range(functions))
+
+
+def test_chunked_file_counts_one_cache_lookup_per_file(tmp_path):
+    summarizer = make_summarizer(tmp_path)
+    content = large_module()
+    assert not summarizer.is_batchable(content)
+
+    summarizer.summarize_code(content, 'handlers.py')
+    # An edit at the end re-summarizes the last chunk only, from cached chunk summaries
+    summarizer.summarize_code(content + "def extra():\n    pass\n", 'handlers.py')
+    summarizer.summarize_code(content, 'handlers.py')
+
+    stats = summarizer.cache.get_stats()
+    assert (stats['hits'], stats['misses']) == (1, 2)
+
+
+def test_summary_cache_evicts_least_recently_used_entries(tmp_path):
+    cache = SummaryCache(path=str(tmp_path / 'summaries.db'), max_entries=2)
+    cache.put('a', 'summary a', {'input_tokens': 1})
+    cache.put('b', 'summary b', {'input_tokens': 1})
+    assert cache.get('a') == ('summary a', {'input_tokens': 1})
+    cache.put('c', 'summary c', {'input_tokens': 1})
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    stats = cache.get_stats()
+    assert (stats['entries'], stats['evictions']) == (2, 1)
+    assert (stats['hits'], stats['misses']) == (2, 1)
+
+
+def test_summary_cache_drops_expired_entries(tmp_path, monkeypatch):
+    cache = SummaryCache(path=str(tmp_path / 'summaries.db'), ttl_seconds=60)
+    cache.put('key', 'summary', {})
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 120)
+
+    assert cache.get('key') is None
+    assert cache.get_stats()['entries'] == 0
+
+
+def test_summary_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / 'summaries.db')
+    SummaryCache(path=path).put(SummaryCache.make_key(git_blob_sha('x = 1\n'), 'python', 'v1', 'model'), 'summary', {})
+
+    reopened = SummaryCache(path=path)
+    assert reopened.get(SummaryCache.make_key(git_blob_sha('x = 1\n'), 'python', 'v1', 'model')) == ('summary', {})
@@ -0,0 +1,50 @@
+import pytest
+
+from utils.token_counter import TokenCounter, estimate_tokens
+
+
+def test_estimator_splits_code_like_a_bpe_vocabulary():
+    assert estimate_tokens('') == 0
+    assert estimate_tokens('getUserName') == 3
+    assert estimate_tokens('if (x == 10):\n    return') == 8
+
+
+def test_counts_are_cached_per_text():
+    counter = TokenCounter(method='estimate', cache_size=2)
+    for text in ('alpha beta', 'gamma', 'alpha beta', 'delta', 'gamma'):
+        counter.count(text)
+
+    stats = counter.get_stats()
+    assert (stats['method'], stats['hits'], stats['misses'], stats['cached_counts']) == ('estimate', 1, 4, 2)
+
+
+def test_truncate_keeps_the_longest_prefix_within_the_budget():
+    text = 'one two three four five six'
+    estimated = TokenCounter(method='estimate')
+    chars = TokenCounter(method='chars')
+
+    assert estimated.count(estimated.truncate(text, 3)) <= 3
+    assert estimated.truncate(text, 3) == 'one two three '
+    assert chars.truncate(text, 2) == 'one two '
+    assert chars.truncate(text, 100) == text
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        TokenCounter(method='words')
+
+
+def test_forced_tiktoken_fails_when_the_encoding_is_not_cached(tmp_path, monkeypatch):
+    pytest.importorskip('tiktoken')
+    monkeypatch.setenv('TIKTOKEN_CACHE_DIR', str(tmp_path))
+
+    with pytest.raises(FileNotFoundError):
+        TokenCounter(method='tiktoken').count('text')
+
+
+def test_auto_falls_back_to_the_estimator_when_the_encoding_is_not_cached(tmp_path, monkeypatch):
+    monkeypatch.setenv('TIKTOKEN_CACHE_DIR', str(tmp_path))
+    counter = TokenCounter(method='auto')
+
+    assert counter.count('getUserName') == 3
+    assert counter.get_method() == 'estimate'
@@ -0,0 +1,60 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+class AnalysisStore:
+    """Completed analyses by repository, ref, scope and commit, for incremental re-runs"""
+
+    def __init__(self, path: str = None, max_per_repo: int = None):
+        self.path = path or os.environ.get('ANALYSIS_STORE_PATH', 'analysis_store.db')
+        self.max_per_repo = max_per_repo or int(os.environ.get('ANALYSIS_STORE_MAX_PER_REPO', 5))
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS analyses ('
+            'id TEXT PRIMARY KEY, repo_key TEXT NOT NULL, commit_sha TEXT NOT NULL, '
+            'data TEXT NOT NULL, created REAL NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS analyses_repo_key ON analyses (repo_key, created)')
+
+    @staticmethod
+    def make_key(owner: str, repo: str, ref: str, scope: str) -> str:
+        return f"{owner.lower()}/{repo.lower()}:{ref}:{scope}"
+
+    def latest(self, repo_key: str) -> Optional[Dict]:
+        """The most recent analysis stored under a key, with its id and commit_sha"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT id, commit_sha, data FROM analyses WHERE repo_key = ? ORDER BY created DESC LIMIT 1',
+                (repo_key,)).fetchone()
+        if row is None:
+            return None
+        return {'id': row[0], 'commit_sha': row[1], 'result': json.loads(row[2])}
+
+    def get(self, analysis_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute('SELECT id, commit_sha, data FROM analyses WHERE id = ?', (analysis_id,)).fetchone()
+        if row is None:
+            return None
+        return {'id': row[0], 'commit_sha': row[1], 'result': json.loads(row[2])}
+
+    def save(self, repo_key: str, commit_sha: str, result: Dict) -> str:
+        """Store a result and return its id; only the newest max_per_repo per key are kept"""
+        analysis_id = uuid.uuid4().hex
+        with self._lock, self._db:
+            self._db.execute('INSERT INTO analyses (id, repo_key, commit_sha, data, created) VALUES (?, ?, ?, ?, ?)',
+                             (analysis_id, repo_key, commit_sha, json.dumps(result), time.time()))
+            self._db.execute(
+                'DELETE FROM analyses WHERE repo_key = ? AND id NOT IN '
+                '(SELECT id FROM analyses WHERE repo_key = ? ORDER BY created DESC LIMIT ?)',
+                (repo_key, repo_key, self.max_per_repo))
+        return analysis_id
+
+# Global analysis store instance
+analysis_store = AnalysisStore()
@@ -0,0 +1,92 @@
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a backend whose circuit breaker is open"""
+
+class CircuitBreaker:
+    """Stops calls to a failing backend and probes it for recovery in the background.
+
+    After failure_threshold consecutive failures the breaker opens: allow()
+    returns False, so callers skip the backend without waiting on it. After
+    recovery_time seconds a background thread runs probe(); success closes
+    the breaker, failure keeps it open and doubles the wait, up to
+    max_recovery_time. No regular traffic is let through while open or while
+    the probe runs (half_open).
+    """
+
+    def __init__(self, name: str, probe: Optional[Callable[[], None]] = None, failure_threshold: int = 5,
+                 recovery_time: float = 30.0, max_recovery_time: float = 300.0):
+        self.name = name
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.max_recovery_time = max(max_recovery_time, recovery_time)
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self.stats = {'opened': 0, 'probes': 0}
+        self._wait = recovery_time
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        return self.state == CLOSED
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+
+    def record_failure(self, error: Exception) -> None:
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)[:200]
+            if self.state != CLOSED or self.failures < self.failure_threshold:
+                return
+            self.state = OPEN
+            self.opened_at = time.time()
+            self.stats['opened'] += 1
+            self._wait = self.recovery_time
+        print(f"⚡ {self.name} circuit opened after {self.failure_threshold} consecutive failures: {self.last_error}")
+        self._schedule_probe()
+
+    def _schedule_probe(self) -> None:
+        timer = threading.Timer(self._wait, self._run_probe)
+        timer.daemon = True
+        timer.start()
+
+    def _run_probe(self) -> None:
+        with self._lock:
+            self.state = HALF_OPEN
+            self.stats['probes'] += 1
+        try:
+            if self.probe:
+                self.probe()
+        except Exception as e:
+            with self._lock:
+                self.state = OPEN
+                self.last_error = str(e)[:200]
+                self._wait = min(self._wait * 2, self.max_recovery_time)
+            self._schedule_probe()
+            return
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = None
+        print(f"✅ {self.name} circuit closed; recovery probe succeeded")
+
+    def get_state(self) -> Dict:
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'failure_threshold': self.failure_threshold,
+                'opened_at': datetime.fromtimestamp(self.opened_at).isoformat() if self.opened_at else None,
+                'probe_interval_s': self._wait if self.state != CLOSED else None,
+                'last_error': self.last_error,
+                **self.stats
+            }
@@ -0,0 +1,172 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Response headers worth keeping with a cached body
+STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Link')
+
+class ResponseCache:
+    """Conditional-request cache for API responses: memory LRU plus optional disk tier.
+
+    The memory tier is bounded by entry count and by body bytes; a body larger
+    than a quarter of memory_max_bytes is kept on disk only, so one big tree
+    listing cannot flush everything else.
+    """
+
+    def __init__(self, max_entries: int = None, cache_dir: str = None, disk_max_bytes: int = None,
+                 memory_max_bytes: int = None):
+        self.max_entries = max_entries or int(os.environ.get('GITHUB_CACHE_MAX_ENTRIES', 512))
+        self.memory_max_bytes = memory_max_bytes or int(os.environ.get('GITHUB_CACHE_MEMORY_MAX_MB', 32)) * 1024 * 1024
+        self.cache_dir = cache_dir or os.environ.get('GITHUB_CACHE_DIR') or None
+        self.disk_max_bytes = disk_max_bytes or int(os.environ.get('GITHUB_CACHE_DISK_MAX_MB', 100)) * 1024 * 1024
+        self.stats = {'revalidated': 0, 'stored': 0, 'misses': 0}
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        self._disk_bytes = 0
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._disk_bytes = sum(entry.stat().st_size for entry in os.scandir(self.cache_dir) if entry.is_file())
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict], authorization: Optional[str]) -> str:
+        # Different tokens can see different data, so the credential is part of the key
+        query = json.dumps(params or {}, sort_keys=True)
+        identity = hashlib.sha256((authorization or '').encode()).hexdigest()[:16]
+        return hashlib.sha256(f"{url}|{query}|{identity}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+
+        entry = self._read_disk(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def validators(self, entry: Dict) -> Dict:
+        """Headers that turn the next request for this entry into a conditional one"""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, key: str, response: requests.Response) -> None:
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+
+        entry = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'headers': {name: response.headers[name] for name in STORED_HEADERS if name in response.headers},
+            'body': response.content
+        }
+        self._remember(key, entry)
+        self._write_disk(key, entry)
+        with self._lock:
+            self.stats['stored'] += 1
+
+    def revalidated(self, entry: Dict, not_modified: requests.Response) -> requests.Response:
+        """Build a 200 response from a cached entry after the server answered 304"""
+        response = requests.Response()
+        response.status_code = 200
+        response._content = entry['body']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        # Fresh headers (rate limit counters, new validators) win over stored ones
+        response.headers.update(not_modified.headers)
+        response.url = not_modified.url
+        response.request = not_modified.request
+        response.encoding = 'utf-8'
+        with self._lock:
+            self.stats['revalidated'] += 1
+        return response
+
+    def record_miss(self) -> None:
+        with self._lock:
+            self.stats['misses'] += 1
+
+    def _remember(self, key: str, entry: Dict) -> None:
+        size = len(entry['body'])
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous['body'])
+            if size > self.memory_max_bytes // 4:
+                return
+            self._memory[key] = entry
+            self._memory_bytes += size
+            while len(self._memory) > self.max_entries or self._memory_bytes > self.memory_max_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted['body'])
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[Dict]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(key), 'r') as f:
+                entry = json.load(f)
+            entry['body'] = base64.b64decode(entry['body'])
+            os.utime(self._disk_path(key))
+            return entry
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_disk(self, key: str, entry: Dict) -> None:
+        if not self.cache_dir:
+            return
+        try:
+            path = self._disk_path(key)
+            payload = json.dumps({**entry, 'body': base64.b64encode(entry['body']).decode('ascii')})
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+
+            with self._lock:
+                self._disk_bytes += len(payload) - previous
+                if self._disk_bytes > self.disk_max_bytes:
+                    self._evict_disk()
+        except OSError as e:
+            print(f"Error writing response cache: {e}")
+
+    def _evict_disk(self) -> None:
+        # Oldest-used files first, down to 90% of the cap to avoid evicting on every write
+        entries = sorted((entry for entry in os.scandir(self.cache_dir) if entry.is_file()),
+                         key=lambda entry: entry.stat().st_mtime)
+        for entry in entries:
+            if self._disk_bytes <= self.disk_max_bytes * 0.9:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self._disk_bytes -= size
+            except OSError:
+                pass
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self.stats,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'disk_bytes': self._disk_bytes if self.cache_dir else None
+            }
@@ -0,0 +1,152 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Seconds; spans a cached GitHub response through a slow multi-file Gemini call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _label_key(labels: Dict) -> Tuple:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels: Tuple, extra: Tuple = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic count per label set"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket latency histogram per label set"""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][position] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[Dict]:
+        """Observe the duration of a with block; labels can be added to the yielded dict inside it"""
+        labels = dict(labels)
+        start = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series['counts']):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, (('le', repr(bound)),))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', '+Inf'),))} {series['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series['sum'])}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+class Gauge:
+    """Value read at scrape time from a callback returning a number or {labels tuple: number}"""
+
+    def __init__(self, name: str, help_text: str, callback: Callable):
+        self.name = name
+        self.help = help_text
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            values = self.callback()
+        except Exception:
+            # A broken collector should not take the whole endpoint down
+            return lines
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in sorted(values.items()):
+            if value is not None:
+                lines.append(f"{self.name}{_format_labels(tuple(labels))} {_format_value(value)}")
+        return lines
+
+class MetricsRegistry:
+    """In-process metrics rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, name: str, factory: Callable):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(name, lambda: Counter(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: Optional[Tuple[float, ...]] = None) -> Histogram:
+        return self._register(name, lambda: Histogram(name, help_text, buckets or DEFAULT_BUCKETS))
+
+    def gauge(self, name: str, help_text: str, callback: Callable) -> Gauge:
+        """Register (or replace) a scrape-time gauge"""
+        with self._lock:
+            metric = self._metrics[name] = Gauge(name, help_text, callback)
+            return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+# Global metrics registry
+metrics = MetricsRegistry()
+
+STAGE_SECONDS = metrics.histogram('analysis_stage_seconds', 'Duration of each analysis stage')
+GITHUB_REQUEST_SECONDS = metrics.histogram('github_request_seconds', 'GitHub API request latency by endpoint and status')
+LLM_REQUEST_SECONDS = metrics.histogram('llm_request_seconds', 'LLM request latency by model, call kind and outcome')
@@ -0,0 +1,166 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Mapping, Optional
+
+class RateLimitExceeded(Exception):
+    """Raised when a request cannot be made within the current rate limit window"""
+
+class RateLimitScheduler:
+    """Live GitHub rate-limit budget fed by the X-RateLimit-* headers of every response.
+
+    High-priority requests wait for the window to reset (up to max_wait) once the
+    budget is spent; low-priority ones are shed while the budget is inside the
+    reserve kept for high-priority work.
+    """
+
+    def __init__(self, low_priority_reserve: float = None, max_wait: float = None):
+        self.low_priority_reserve = low_priority_reserve if low_priority_reserve is not None else float(
+            os.environ.get('GITHUB_LOW_PRIORITY_RESERVE', 0.1))
+        self.max_wait = max_wait if max_wait is not None else float(os.environ.get('GITHUB_RATE_LIMIT_MAX_WAIT', 10))
+        self.limit = None
+        self.remaining = None
+        self.reset = None
+        self.updated_at = None
+        self.stats = {'requests': 0, 'shed': 0, 'delayed': 0, 'rejected': 0, 'wait_seconds': 0.0}
+        self._lock = threading.Lock()
+
+    def update(self, headers: Mapping) -> None:
+        """Refresh the budget from a response's X-RateLimit-* headers"""
+        try:
+            remaining = int(headers['X-RateLimit-Remaining'])
+            reset = int(headers['X-RateLimit-Reset'])
+            limit = int(headers.get('X-RateLimit-Limit', self.limit or remaining))
+        except (KeyError, TypeError, ValueError):
+            return
+
+        with self._lock:
+            if self.reset is not None and reset < self.reset:
+                # A late response from the previous window
+                return
+            # The server's count is authoritative: local reservations also cover
+            # requests GitHub does not charge for, such as 304 revalidations
+            self.remaining = remaining
+            self.limit = limit
+            self.reset = reset
+            self.updated_at = time.time()
+
+    def acquire(self, priority: str = 'high') -> None:
+        """Reserve budget for one request, waiting or shedding as needed"""
+        with self._lock:
+            self.stats['requests'] += 1
+            if self.remaining is None:
+                return
+            now = time.time()
+            if self.reset is not None and now >= self.reset:
+                # Window has rolled over; the next response will tell us the new budget
+                self.remaining = None
+                return
+
+            if priority == 'low' and self.remaining <= self.limit * self.low_priority_reserve:
+                self.stats['shed'] += 1
+                raise RateLimitExceeded('Low-priority request shed to preserve rate limit budget')
+
+            if self.remaining > 0:
+                self.remaining -= 1
+                return
+
+            wait = self.reset - now + 1
+            if wait > self.max_wait:
+                self.stats['rejected'] += 1
+                raise RateLimitExceeded(f'GitHub rate limit exhausted; resets in {int(wait)}s')
+            self.stats['delayed'] += 1
+            self.stats['wait_seconds'] += wait
+
+        time.sleep(wait)
+        with self._lock:
+            self.remaining = None
+
+    def release(self) -> None:
+        """Give back the budget reserved for a request GitHub did not charge for (a 304)"""
+        with self._lock:
+            if self.remaining is not None and self.limit is not None:
+                self.remaining = min(self.remaining + 1, self.limit)
+
+    def get_rate_limit_info(self) -> Optional[Dict]:
+        """Current budget in the shape of GitHubFetcher.get_rate_limit_info, or None if unknown"""
+        with self._lock:
+            if self.remaining is None or self.reset is None:
+                return None
+            return {
+                'limit': self.limit,
+                'remaining': self.remaining,
+                'reset': self.reset,
+                'reset_time': datetime.fromtimestamp(self.reset).isoformat()
+            }
+
+    def get_state(self) -> Dict:
+        with self._lock:
+            return {
+                'limit': self.limit,
+                'remaining': self.remaining,
+                'reset_time': datetime.fromtimestamp(self.reset).isoformat() if self.reset else None,
+                'updated_at': datetime.fromtimestamp(self.updated_at).isoformat() if self.updated_at else None,
+                'low_priority_reserve': self.low_priority_reserve,
+                'max_wait': self.max_wait,
+                **self.stats
+            }
+
+class AdaptiveLimiter:
+    """Concurrency limit that adapts to a backend with AIMD.
+
+    Each call that comes back within latency_target raises the limit by
+    1/limit (about one more slot per limit's worth of calls); an overload
+    (HTTP 429, a timeout or a call slower than latency_target) multiplies it
+    by backoff, and other errors leave it alone. Decreases happen at most
+    once per cooldown, so a burst of failures from calls already in flight
+    counts once. The limit stays between min_limit and max_limit and starts
+    at max_limit.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, latency_target: float = 15.0, backoff: float = 0.5,
+                 cooldown: float = None):
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.cooldown = cooldown if cooldown is not None else latency_target
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.stats = {'increases': 0, 'decreases': 0, 'overloads': 0}
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: float) -> bool:
+        """Take a slot, waiting up to timeout seconds; False if none freed up"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            self.in_flight += 1
+            return True
+
+    def release(self, latency: float, outcome: str = 'ok') -> None:
+        """Return a slot with the call's latency and outcome: 'ok', 'overload' (429 or timeout) or 'error'"""
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if outcome == 'overload' or (outcome == 'ok' and latency > self.latency_target):
+                self.stats['overloads'] += 1
+                if now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self._last_decrease = now
+                    self.stats['decreases'] += 1
+            elif outcome == 'ok' and self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self.stats['increases'] += 1
+            self._condition.notify_all()
+
+    def get_state(self) -> Dict:
+        with self._condition:
+            return {'limit': int(self.limit), 'min_limit': self.min_limit, 'max_limit': self.max_limit,
+                    'in_flight': self.in_flight, 'latency_target_s': self.latency_target, **self.stats}
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+def git_blob_sha(content: str) -> str:
+    """SHA of content as git stores it, i.e. the blob SHA GitHub reports for the file"""
+    data = content.encode('utf-8')
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+class SummaryCache:
+    """Persistent content-addressed cache of file summaries with LRU/TTL eviction"""
+
+    def __init__(self, path: str = None, max_entries: int = None, ttl_seconds: int = None):
+        self.path = path or os.environ.get('SUMMARY_CACHE_PATH', 'summary_cache.db')
+        self.max_entries = max_entries or int(os.environ.get('SUMMARY_CACHE_MAX_ENTRIES', 10000))
+        self.ttl_seconds = ttl_seconds or int(os.environ.get('SUMMARY_CACHE_TTL', 30 * 24 * 3600))
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS summaries ('
+            'key TEXT PRIMARY KEY, summary TEXT NOT NULL, usage TEXT NOT NULL, '
+            'created REAL NOT NULL, last_access REAL NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS summaries_last_access ON summaries (last_access)')
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM summaries WHERE created < ?', (time.time() - self.ttl_seconds,))
+
+    @staticmethod
+    def make_key(blob_sha: str, file_type: str, prompt_version: str, model_name: str) -> str:
+        return f"{blob_sha}:{file_type}:{prompt_version}:{model_name}"
+
+    def get(self, key: str, count: bool = True) -> Optional[Tuple[str, Dict]]:
+        """Return (summary, usage) for a key, or None on a miss.
+
+        count=False leaves the hit/miss counters alone, for callers that try
+        several keys for one lookup and record its outcome with record(), and
+        for lookups that are not of a whole file, such as chunks.
+        """
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute('SELECT summary, usage, created FROM summaries WHERE key = ?', (key,)).fetchone()
+            if row is None or row[2] < now - self.ttl_seconds:
+                if row is not None:
+                    self._db.execute('DELETE FROM summaries WHERE key = ?', (key,))
+                    self.stats['evictions'] += 1
+                if count:
+                    self.stats['misses'] += 1
+                return None
+
+            self._db.execute('UPDATE summaries SET last_access = ? WHERE key = ?', (now, key))
+            if count:
+                self.stats['hits'] += 1
+            return row[0], json.loads(row[1])
+
+    def record(self, hit: bool) -> None:
+        """Count one lookup made of uncounted get() calls"""
+        with self._lock:
+            self.stats['hits' if hit else 'misses'] += 1
+
+    def put(self, key: str, summary: str, usage: Dict) -> None:
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO summaries (key, summary, usage, created, last_access) VALUES (?, ?, ?, ?, ?)',
+                (key, summary, json.dumps(usage), now, now)
+            )
+            overflow = self._count() - self.max_entries
+            if overflow > 0:
+                # Least recently used entries go first
+                self._db.execute(
+                    'DELETE FROM summaries WHERE key IN (SELECT key FROM summaries ORDER BY last_access LIMIT ?)',
+                    (overflow,)
+                )
+                self.stats['evictions'] += overflow
+
+    def _count(self) -> int:
+        return self._db.execute('SELECT COUNT(*) FROM summaries').fetchone()[0]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'entries': self._count(),
+                'max_entries': self.max_entries,
+                'hit_ratio': round(self.stats['hits'] / lookups, 3) if lookups else 0.0
+            }
+
+# Global summary cache instance
+summary_cache = SummaryCache()
@@ -0,0 +1,151 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# One match per token, following how BPE vocabularies like cl100k split code:
+# a camelCase hump or word (long rare ones split about every 10 letters),
+# acronyms and digit runs in threes, punctuation in pairs like () == ->,
+# a newline with its indentation, and runs of spaces. A single space or
+# underscore merges into the word after it, so it is not matched on its own
+TOKEN = re.compile(r"[A-Z]?[a-z]{1,10}|[A-Z]{1,3}(?![a-z])|[^\W\d_]{1,10}|\d{1,3}|__+|[^\w\s]{1,2}"
+                   r"|\n[ \t]*|[ \t]{2,}|\s(?=\s)")
+
+def estimate_tokens(text: str) -> int:
+    """Token count of text from a regex pre-tokenizer, without a vocabulary"""
+    return len(TOKEN.findall(text))
+
+# Where tiktoken downloads its BPE files from; the local cache file is named after the URL's SHA-1
+ENCODING_URL = 'https://openaipublic.blob.core.windows.net/encodings/{name}.tiktoken'
+
+def local_encoding_path(name: str) -> Optional[str]:
+    """The encoding's file in the tiktoken cache (TIKTOKEN_CACHE_DIR), or None if it is not there"""
+    cache_dir = (os.environ.get('TIKTOKEN_CACHE_DIR') or os.environ.get('DATA_GYM_CACHE_DIR')
+                 or os.path.join(tempfile.gettempdir(), 'data-gym-cache'))
+    path = os.path.join(cache_dir, hashlib.sha1(ENCODING_URL.format(name=name).encode()).hexdigest())
+    return path if os.path.isfile(path) else None
+
+def load_local_encoding(name: str):
+    """A tiktoken encoding read from the local cache only, never downloaded.
+
+    Raises ImportError without tiktoken and FileNotFoundError when the
+    encoding is not cached.
+    """
+    import tiktoken
+    if local_encoding_path(name) is None:
+        raise FileNotFoundError(f"{name} is not in the tiktoken cache; set TIKTOKEN_CACHE_DIR to a directory holding it")
+    # With the file cached, get_encoding reads it instead of downloading
+    return tiktoken.get_encoding(name)
+
+class TokenCounter:
+    """Counts tokens locally for prompt budgets and for usage a model does not report.
+
+    With TOKENIZER=auto (the default) the tiktoken encoding TOKENIZER_ENCODING
+    is used when tiktoken is installed and the encoding is in the local
+    tiktoken cache (TIKTOKEN_CACHE_DIR); it is never downloaded. It loads in
+    the background on first use, and the regex estimator counts until it is
+    ready or when it is unavailable. 'tiktoken' (loaded on first use, and an
+    error if missing), 'estimate' and 'chars' (4 characters per token) force
+    one. Counts of recently seen texts are cached, since the same file is
+    measured for routing, batching and budgets.
+    """
+
+    METHODS = ('auto', 'tiktoken', 'estimate', 'chars')
+
+    def __init__(self, method: str = None, encoding: str = None, cache_size: int = None):
+        self.method = method or os.environ.get('TOKENIZER', 'auto')
+        if self.method not in self.METHODS:
+            raise ValueError(f"Unknown tokenizer \"{self.method}\"; expected one of: {', '.join(self.METHODS)}")
+        self.encoding_name = encoding or os.environ.get('TOKENIZER_ENCODING', 'cl100k_base')
+        self.cache_size = cache_size or int(os.environ.get('TOKEN_COUNT_CACHE_SIZE', 4096))
+        self._encoding = None
+        self._load_started = self.method in ('estimate', 'chars')
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        # Separate from _lock so counting never waits on loading the encoding
+        self._load_lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    @property
+    def encoding(self):
+        """The tiktoken encoding, or None while counting falls back to the estimator"""
+        if not self._load_started:
+            with self._load_lock:
+                if not self._load_started:
+                    self._load_started = True
+                    if self.method == 'tiktoken':
+                        self._set_encoding(load_local_encoding(self.encoding_name))
+                    else:
+                        threading.Thread(target=self._load_encoding, name='token-counter-load', daemon=True).start()
+        return self._encoding
+
+    def _load_encoding(self) -> None:
+        try:
+            self._set_encoding(load_local_encoding(self.encoding_name))
+        except Exception as e:
+            print(f"⚠️  tiktoken encoding {self.encoding_name} unavailable ({e}); estimating tokens")
+
+    def _set_encoding(self, encoding) -> None:
+        with self._lock:
+            self._encoding = encoding
+            # Counts made by the estimator while loading are replaced as texts come back
+            self._cache.clear()
+
+    def get_method(self) -> str:
+        """What counts are based on now: 'tiktoken:<encoding>', 'estimate' or 'chars'"""
+        if self.method == 'chars':
+            return 'chars'
+        return f"tiktoken:{self.encoding_name}" if self._encoding is not None else 'estimate'
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        key = (len(text), hash(text))
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats['hits'] += 1
+                return cached
+            self.stats['misses'] += 1
+
+        encoding = self.encoding
+        if self.method == 'chars':
+            tokens = max(1, len(text) // 4)
+        elif encoding is not None:
+            tokens = len(encoding.encode_ordinary(text))
+        else:
+            tokens = estimate_tokens(text)
+
+        with self._lock:
+            if encoding is not self._encoding:
+                # The encoding finished loading meanwhile; do not cache an estimate
+                return tokens
+            self._cache[key] = tokens
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return tokens
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """The longest prefix of text within max_tokens"""
+        if self.count(text) <= max_tokens:
+            return text
+        encoding = self.encoding
+        if self.method == 'chars':
+            return text[:max_tokens * 4]
+        if encoding is not None:
+            return encoding.decode(encoding.encode_ordinary(text)[:max_tokens])
+        for index, match in enumerate(TOKEN.finditer(text)):
+            if index == max_tokens:
+                return text[:match.start()]
+        return text
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {'method': self.get_method(), 'cached_counts': len(self._cache), **self.stats}
+
+# Global token counter instance
+token_counter = TokenCounter()
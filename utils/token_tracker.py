@@ -1,122 +1,264 @@
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional
+import atexit
 import json
 import os
+import threading
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, appends stay line-atomic in practice
+    fcntl = None
+
+COUNTERS = ('github_api_calls', 'huggingface_api_calls', 'huggingface_tokens_used', 'total_cost')
+
+def _empty_counts() -> Dict:
+    return {'github_api_calls': 0, 'huggingface_api_calls': 0, 'huggingface_tokens_used': 0, 'total_cost': 0.0}
 
 class TokenTracker:
-    """Track API token usage across sessions"""
-    
-    def __init__(self, storage_file='token_usage.json'):
-        self.storage_file = storage_file
-        self.usage_data = self._load_usage_data()
-    
-    def _load_usage_data(self) -> Dict:
-        """Load usage data from storage"""
-        if os.path.exists(self.storage_file):
+    """Track API token usage across sessions.
+
+    Usage is kept as in-memory daily, monthly and total aggregates and
+    persisted to an append-only JSON-lines ledger. record_usage only updates
+    memory; a background thread appends pending records in batches (every
+    flush_interval seconds or once flush_size are pending) under a file lock,
+    and picks up records other processes appended. The ledger is compacted to
+    one record per day on startup.
+    """
+
+    def __init__(self, storage_file: str = None, flush_interval: float = None, flush_size: int = None):
+        self.storage_file = storage_file or os.environ.get('TOKEN_USAGE_PATH', 'token_usage.jsonl')
+        self.flush_interval = flush_interval or float(os.environ.get('TOKEN_USAGE_FLUSH_SECONDS', 5))
+        self.flush_size = flush_size or int(os.environ.get('TOKEN_USAGE_FLUSH_SIZE', 100))
+        # Records this process wrote are tagged so reading the ledger back does not count them twice
+        self.writer_id = uuid.uuid4().hex[:12]
+
+        self._lock = threading.Lock()
+        self._pending: List[Dict] = []
+        self._offset = 0
+        self._inode = None
+        self._wake = threading.Event()
+        self._stopped = False
+
+        self._compact()
+        self._reload()
+        self._flusher = threading.Thread(target=self._flush_loop, name='token-ledger', daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def _empty_usage(self) -> Dict:
+        return {'daily_usage': {}, 'monthly_usage': {}, 'total_usage': _empty_counts()}
+
+    def _apply(self, usage_data: Dict, record: Dict) -> None:
+        """Add one ledger record to the aggregates"""
+        date = record.get('date')
+        month = record.get('month') or (date[:7] if date else None)
+        targets = [usage_data['total_usage']]
+        if date:
+            targets.append(usage_data['daily_usage'].setdefault(date, _empty_counts()))
+        if month:
+            targets.append(usage_data['monthly_usage'].setdefault(month, _empty_counts()))
+        for counts in targets:
+            for key in COUNTERS:
+                counts[key] += record.get(key, 0)
+
+    def _read_records(self, handle) -> List[Dict]:
+        records = []
+        for line in handle:
             try:
-                with open(self.storage_file, 'r') as f:
-                    return json.load(f)
-            except:
-                pass
-        
-        return {
-            'daily_usage': {},
-            'monthly_usage': {},
-            'total_usage': {
-                'github_api_calls': 0,
-                'huggingface_api_calls': 0,
-                'huggingface_tokens_used': 0,
-                'total_cost': 0.0
-            }
-        }
-    
-    def _save_usage_data(self):
-        """Save usage data to storage"""
+                records.append(json.loads(line))
+            except ValueError:
+                # A torn line from a crashed writer; everything else is still usable
+                continue
+        return records
+
+    def _lock_file(self, handle, exclusive: bool) -> None:
+        if fcntl:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+    def _compact(self) -> None:
+        """Rewrite the ledger as one record per day (plus month/total remainders)"""
+        usage_data = self._empty_usage()
+        legacy = os.path.splitext(self.storage_file)[0] + '.json'
+        try:
+            with open(self.storage_file, 'a+') as handle:
+                self._lock_file(handle, exclusive=True)
+                handle.seek(0)
+                records = self._read_records(handle)
+                if not records and os.path.exists(legacy):
+                    records = self._legacy_records(legacy)
+                for record in records:
+                    self._apply(usage_data, record)
+
+                compacted = []
+                for date, counts in sorted(usage_data['daily_usage'].items()):
+                    compacted.append({'date': date, **counts})
+                # Totals that predate per-day records (imported from the old JSON file)
+                for month, counts in sorted(usage_data['monthly_usage'].items()):
+                    remainder = self._remainder(counts, [c for d, c in usage_data['daily_usage'].items()
+                                                         if d.startswith(month)])
+                    if remainder:
+                        compacted.append({'month': month, **remainder})
+                remainder = self._remainder(usage_data['total_usage'], list(usage_data['monthly_usage'].values()))
+                if remainder:
+                    compacted.append(remainder)
+
+                tmp_path = f"{self.storage_file}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w') as tmp:
+                    tmp.writelines(json.dumps(record) + '\n' for record in compacted)
+                # Replaced while still holding the lock on the old file, so no append is lost
+                os.replace(tmp_path, self.storage_file)
+        except OSError as e:
+            print(f"Error compacting usage data: {e}")
+
+    def _remainder(self, counts: Dict, parts: List[Dict]) -> Optional[Dict]:
+        remainder = {key: counts[key] - sum(part[key] for part in parts) for key in COUNTERS}
+        return remainder if any(abs(value) > 1e-9 for value in remainder.values()) else None
+
+    def _legacy_records(self, path: str) -> List[Dict]:
+        """Convert the old token_usage.json aggregates into ledger records"""
+        try:
+            with open(path, 'r') as f:
+                legacy = json.load(f)
+        except (OSError, ValueError):
+            return []
+        records = [{'date': date, **counts} for date, counts in legacy.get('daily_usage', {}).items()]
+        usage_data = self._empty_usage()
+        for record in records:
+            self._apply(usage_data, record)
+        for month, counts in legacy.get('monthly_usage', {}).items():
+            remainder = self._remainder({**_empty_counts(), **counts},
+                                        [usage_data['monthly_usage'].get(month, _empty_counts())])
+            if remainder:
+                records.append({'month': month, **remainder})
+                self._apply(usage_data, {'month': month, **remainder})
+        remainder = self._remainder({**_empty_counts(), **legacy.get('total_usage', {})}, [usage_data['total_usage']])
+        if remainder:
+            records.append(remainder)
+        return records
+
+    def _reload(self) -> None:
+        """Rebuild the aggregates from the whole ledger plus records not yet flushed"""
+        usage_data = self._empty_usage()
         try:
-            with open(self.storage_file, 'w') as f:
-                json.dump(self.usage_data, f, indent=2)
-        except Exception as e:
+            with open(self.storage_file, 'r') as handle:
+                self._lock_file(handle, exclusive=False)
+                for record in self._read_records(handle):
+                    self._apply(usage_data, record)
+                offset, inode = handle.tell(), os.fstat(handle.fileno()).st_ino
+        except OSError:
+            offset, inode = 0, None
+        with self._lock:
+            for record in self._pending:
+                self._apply(usage_data, record)
+            self.usage_data = usage_data
+            self._offset, self._inode = offset, inode
+
+    def _sync(self) -> None:
+        """Apply records other processes appended since the last read"""
+        try:
+            with open(self.storage_file, 'r') as handle:
+                self._lock_file(handle, exclusive=False)
+                stat = os.fstat(handle.fileno())
+                if stat.st_ino != self._inode or stat.st_size < self._offset:
+                    # Another process compacted the ledger
+                    handle.close()
+                    self._reload()
+                    return
+                handle.seek(self._offset)
+                records = [record for record in self._read_records(handle) if record.get('writer') != self.writer_id]
+                offset = handle.tell()
+        except OSError:
+            return
+        with self._lock:
+            for record in records:
+                self._apply(self.usage_data, record)
+            self._offset = offset
+
+    def flush(self) -> None:
+        """Append pending records to the ledger in one write"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        data = ''.join(json.dumps(record) + '\n' for record in pending)
+        try:
+            while True:
+                with open(self.storage_file, 'a') as handle:
+                    self._lock_file(handle, exclusive=True)
+                    # A compaction may have replaced the file while we waited for the lock
+                    if os.fstat(handle.fileno()).st_ino != os.stat(self.storage_file).st_ino:
+                        continue
+                    handle.write(data)
+                    break
+        except OSError as e:
             print(f"Error saving usage data: {e}")
-    
+            with self._lock:
+                self._pending = pending + self._pending
+
+    def _flush_loop(self) -> None:
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+            self._sync()
+
+    def close(self) -> None:
+        """Stop the background thread and write what is still pending"""
+        self._stopped = True
+        self._wake.set()
+        self.flush()
+
     def record_usage(self, usage_info: Dict):
-        """Record API usage"""
-        today = datetime.now().strftime('%Y-%m-%d')
-        month = datetime.now().strftime('%Y-%m')
-        
-        # Initialize daily usage if not exists
-        if today not in self.usage_data['daily_usage']:
-            self.usage_data['daily_usage'][today] = {
-                'github_api_calls': 0,
-                'huggingface_api_calls': 0,
-                'huggingface_tokens_used': 0,
-                'total_cost': 0.0
-            }
-        
-        # Initialize monthly usage if not exists
-        if month not in self.usage_data['monthly_usage']:
-            self.usage_data['monthly_usage'][month] = {
-                'github_api_calls': 0,
-                'huggingface_api_calls': 0,
-                'huggingface_tokens_used': 0,
-                'total_cost': 0.0
-            }
-        
-        # Update usage counters
+        """Record API usage; memory only, the ledger write happens in the background"""
+        now = datetime.now()
+        record = {'date': now.strftime('%Y-%m-%d'), 'writer': self.writer_id}
         for key in ['github_api_calls', 'huggingface_api_calls', 'huggingface_tokens_used', 'total_cost_estimate']:
             if key in usage_info:
-                value = usage_info[key]
-                storage_key = key.replace('_estimate', '')
-                
-                self.usage_data['daily_usage'][today][storage_key] += value
-                self.usage_data['monthly_usage'][month][storage_key] += value
-                self.usage_data['total_usage'][storage_key] += value
-        
-        # Clean old daily data (keep last 30 days)
-        self._cleanup_old_data()
-        
-        # Save updated data
-        self._save_usage_data()
-    
-    def _cleanup_old_data(self):
-        """Remove usage data older than 30 days"""
-        cutoff_date = datetime.now() - timedelta(days=30)
-        cutoff_str = cutoff_date.strftime('%Y-%m-%d')
-        
-        # Remove old daily data
-        old_dates = [date for date in self.usage_data['daily_usage'].keys() if date < cutoff_str]
-        for date in old_dates:
-            del self.usage_data['daily_usage'][date]
-    
+                record[key.replace('_estimate', '')] = usage_info[key]
+
+        with self._lock:
+            self._apply(self.usage_data, record)
+            self._pending.append(record)
+            if len(self._pending) >= self.flush_size:
+                self._wake.set()
+
     def get_usage_summary(self) -> Dict:
         """Get usage summary for display"""
         today = datetime.now().strftime('%Y-%m-%d')
         month = datetime.now().strftime('%Y-%m')
-        
-        return {
-            'today': self.usage_data['daily_usage'].get(today, {}),
-            'this_month': self.usage_data['monthly_usage'].get(month, {}),
-            'total': self.usage_data['total_usage'],
-            'daily_history': dict(list(self.usage_data['daily_usage'].items())[-7:])  # Last 7 days
-        }
-    
+        # Daily history older than 30 days stays in the ledger but is not shown
+        cutoff_str = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+
+        with self._lock:
+            recent_days = sorted((date, dict(counts)) for date, counts in self.usage_data['daily_usage'].items()
+                                 if date >= cutoff_str)
+            return {
+                'today': dict(self.usage_data['daily_usage'].get(today, {})),
+                'this_month': dict(self.usage_data['monthly_usage'].get(month, {})),
+                'total': dict(self.usage_data['total_usage']),
+                'daily_history': dict(recent_days[-7:])  # Last 7 days
+            }
+
     def get_rate_limit_status(self, github_remaining: int, github_limit: int) -> Dict:
         """Get rate limit status and recommendations"""
         usage_percentage = ((github_limit - github_remaining) / github_limit) * 100
-        
+
         status = {
             'percentage_used': usage_percentage,
             'remaining': github_remaining,
             'limit': github_limit,
             'status': 'good'
         }
-        
+
         if usage_percentage > 80:
             status['status'] = 'warning'
             status['message'] = 'Approaching rate limit. Consider adding a GitHub token.'
         elif usage_percentage > 95:
             status['status'] = 'critical'
             status['message'] = 'Rate limit almost exceeded. Add a GitHub token immediately.'
-        
+
         return status
 
 # Global token tracker instance
@@ -4,17 +4,59 @@ Quiet token validation - minimal output
 """
 import requests
 import os
+import threading
+import time
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Optional
 from dotenv import load_dotenv
 
 class QuietTokenValidator:
     """Silent token validation with minimal output"""
     
-    def __init__(self):
+    def __init__(self, ttl_seconds: int = None):
         load_dotenv()
         self.github_token = os.environ.get('GITHUB_TOKEN')
         self.hf_token = os.environ.get('HUGGING_FACE_TOKEN')
+        self.ttl_seconds = ttl_seconds or int(os.environ.get('TOKEN_STATUS_TTL', 600))
+        self._results: Optional[Dict] = None
+        self._checked_at: Optional[float] = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+    
+    def refresh_in_background(self, announce: bool = False) -> bool:
+        """Start validating tokens on a daemon thread; False if a check is already running"""
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+
+        def refresh():
+            try:
+                results = self.validate_all_tokens_quiet()
+                with self._lock:
+                    self._results, self._checked_at = results, time.time()
+                if announce:
+                    self._print_status(results)
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=refresh, name='token-validation', daemon=True).start()
+        return True
+    
+    def get_cached_status(self) -> Dict:
+        """Last validation result without waiting on the network; stale results trigger a background refresh"""
+        with self._lock:
+            results, checked_at, refreshing = self._results, self._checked_at, self._refreshing
+        stale = checked_at is None or time.time() - checked_at > self.ttl_seconds
+        if stale and not refreshing:
+            self.refresh_in_background()
+        return {
+            'state': 'pending' if results is None else 'stale' if stale else 'fresh',
+            'checked_at': datetime.fromtimestamp(checked_at).isoformat() if checked_at else None,
+            'ttl_seconds': self.ttl_seconds,
+            **(results or {})
+        }
     
     def validate_all_tokens_quiet(self) -> Dict:
         """Validate tokens silently"""
@@ -78,8 +120,9 @@ class QuietTokenValidator:
     
     def print_simple_status(self) -> None:
         """Print a simple one-line status"""
-        results = self.validate_all_tokens_quiet()
-        
+        self._print_status(self.validate_all_tokens_quiet())
+    
+    def _print_status(self, results: Dict) -> None:
         github_status = "✅" if results['github']['valid'] else "❌"
         hf_status = "✅" if results['huggingface']['valid'] else "❌"
         
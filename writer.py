@@ -1,85 +1,238 @@
-import tempfile
+import hashlib
+import io
+import json
 import os
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Iterator, Optional
+
+# Parts of an analysis result a report is rendered from; usage and timing data are left out
+REPORT_FIELDS = ('repo_info', 'ref', 'commit_sha', 'analyzed_at', 'file_analysis', 'coverage', 'commits', 'contributors')
+# DOCX is a zip archive, so it can only be sent once fully built; this is the chunk size it goes out in
+DOCX_CHUNK_SIZE = 64 * 1024
 
 class ReportWriter:
-    def __init__(self):
-        self.temp_dir = tempfile.gettempdir()
-    
-    def create_markdown_report(self, data: Dict) -> str:
-        """Create a markdown report"""
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"repo_analysis_{timestamp}.md"
-        filepath = os.path.join(self.temp_dir, filename)
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(f"# Repository Analysis Report\n\n")
-            f.write(f"**Repository:** {data.get('repo_name', 'Unknown')}\n")
-            f.write(f"**Analysis Date:** {data.get('analysis_date', 'Unknown')}\n")
-            f.write(f"**Description:** {data.get('description', 'No description available')}\n\n")
-            
-            f.write("## Repository Overview\n\n")
-            repo_info = data.get('repo_info', {})
-            if repo_info:
-                f.write(f"- **Language:** {repo_info.get('language', 'Unknown')}\n")
-                f.write(f"- **Stars:** {repo_info.get('stars', 0)}\n")
-                f.write(f"- **Forks:** {repo_info.get('forks', 0)}\n")
-                f.write(f"- **Size:** {repo_info.get('size', 0)} KB\n")
-                f.write(f"- **License:** {repo_info.get('license', 'No license')}\n\n")
-            
-            f.write("## File Analysis\n\n")
-            files = data.get('files', [])
-            for file_info in files:
-                f.write(f"### {file_info['name']}\n")
-                f.write(f"{file_info['summary']}\n\n")
-            
-            f.write("## Recent Commits\n\n")
-            commits = data.get('commits', [])
-            for commit in commits:
-                f.write(f"- **{commit['sha']}** - {commit['message']} by {commit['author']}\n")
-            
-            f.write("\n## Contributors\n\n")
-            contributors = data.get('contributors', [])
-            for contributor in contributors:
-                f.write(f"- **{contributor['login']}** - {contributor['contributions']} contributions\n")
-            
-            f.write(f"\n---\n*Report generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n")
-        
-        return filepath
-    
-    def create_docx_report(self, data: Dict) -> str:
-        """Create a DOCX report (simplified version without python-docx dependency)"""
-        # For this demo, we'll create a text file instead of DOCX
-        # In a real implementation, you'd use python-docx library
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"repo_analysis_{timestamp}.txt"
-        filepath = os.path.join(self.temp_dir, filename)
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write("REPOSITORY ANALYSIS REPORT\n")
-            f.write("=" * 50 + "\n\n")
-            f.write(f"Repository: {data.get('repo_name', 'Unknown')}\n")
-            f.write(f"Analysis Date: {data.get('analysis_date', 'Unknown')}\n")
-            f.write(f"Description: {data.get('description', 'No description available')}\n\n")
-            
-            f.write("REPOSITORY OVERVIEW\n")
-            f.write("-" * 20 + "\n")
-            repo_info = data.get('repo_info', {})
-            if repo_info:
-                f.write(f"Language: {repo_info.get('language', 'Unknown')}\n")
-                f.write(f"Stars: {repo_info.get('stars', 0)}\n")
-                f.write(f"Forks: {repo_info.get('forks', 0)}\n")
-                f.write(f"Size: {repo_info.get('size', 0)} KB\n")
-                f.write(f"License: {repo_info.get('license', 'No license')}\n\n")
-            
-            f.write("FILE ANALYSIS\n")
-            f.write("-" * 15 + "\n")
-            files = data.get('files', [])
-            for file_info in files:
-                f.write(f"\n{file_info['name']}:\n")
-                f.write(f"  {file_info['summary']}\n")
-            
-            f.write(f"\n\nReport generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        
-        return filepath
+    """Renders analysis results as Markdown, plain text or DOCX reports.
+
+    Reports are produced as generators of bytes so they can be streamed
+    straight into a response without temporary files. Rendered reports are
+    kept in a small LRU cache keyed by a hash of the analysis, so repeated
+    downloads of the same analysis are served from memory.
+    """
+
+    # format -> (Content-Type header, file extension)
+    FORMATS = {
+        'md': ('text/markdown; charset=utf-8', 'md'),
+        'txt': ('text/plain; charset=utf-8', 'txt'),
+        'docx': ('application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'docx')
+    }
+
+    def __init__(self, cache_size: int = None):
+        self.cache_size = cache_size or int(os.environ.get('REPORT_CACHE_SIZE', 32))
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def report_key(self, result: Dict, format: str) -> str:
+        """Hash of the report-relevant parts of an analysis, per format"""
+        data = {field: result.get(field) for field in REPORT_FIELDS}
+        encoded = json.dumps(data, sort_keys=True, default=str).encode('utf-8')
+        return f"{format}-{hashlib.sha256(encoded).hexdigest()[:32]}"
+
+    def stream(self, result: Dict, format: str, key: Optional[str] = None) -> Iterator[bytes]:
+        """Report bytes for an analysis result, from the cache or rendered as they are sent"""
+        if format not in self.FORMATS:
+            raise ValueError(f'Unsupported format "{format}"')
+        key = key or self.report_key(result, format)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._hits += 1
+            else:
+                self._misses += 1
+        if cached is not None:
+            return iter((cached,))
+        return self._render_and_cache(key, self._render(result, format))
+
+    def _render(self, result: Dict, format: str) -> Iterator[bytes]:
+        if format == 'docx':
+            return self.iter_docx(result)
+        lines = self.iter_markdown(result) if format == 'md' else self.iter_text(result)
+        return (line.encode('utf-8') for line in lines)
+
+    def _render_and_cache(self, key: str, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        rendered = []
+        for chunk in chunks:
+            rendered.append(chunk)
+            yield chunk
+        # Only reached when the whole report was rendered (not on client disconnect)
+        with self._lock:
+            self._cache[key] = b''.join(rendered)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {'entries': len(self._cache), 'hits': self._hits, 'misses': self._misses}
+
+    def _repo_name(self, result: Dict) -> str:
+        repo_info = result.get('repo_info') or {}
+        return repo_info.get('full_name') or repo_info.get('name') or 'Unknown'
+
+    def _analysis_date(self, result: Dict) -> str:
+        analyzed_at = result.get('analyzed_at')
+        if not analyzed_at:
+            return 'Unknown'
+        try:
+            return datetime.fromisoformat(analyzed_at).strftime('%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            return analyzed_at
+
+    def _overview(self, result: Dict) -> Dict:
+        repo_info = result.get('repo_info') or {}
+        overview = {
+            'Language': repo_info.get('language') or 'Unknown',
+            'Stars': repo_info.get('stars', 0),
+            'Forks': repo_info.get('forks', 0),
+            'Size': f"{repo_info.get('size', 0)} KB",
+            'License': repo_info.get('license') or 'No license'
+        }
+        if result.get('ref'):
+            overview['Ref'] = result['ref']
+        if result.get('commit_sha'):
+            overview['Commit'] = result['commit_sha'][:12]
+        return overview
+
+    def _coverage_line(self, result: Dict) -> Optional[str]:
+        coverage = result.get('coverage')
+        if not coverage:
+            return None
+        methods = ', '.join(f"{count} {method.replace('_', ' ')}"
+                            for method, count in sorted(coverage.get('methods', {}).items()))
+        line = f"{len(result.get('file_analysis', []))} of {coverage.get('total_files', 0)} files analyzed"
+        line = f"{line} ({methods})" if methods else line
+        if coverage.get('shed_sections'):
+            line += f"; {' and '.join(coverage['shed_sections'])} left out to stay within the GitHub rate limit"
+        return line
+
+    def iter_markdown(self, result: Dict) -> Iterator[str]:
+        """Markdown report, one section line at a time"""
+        repo_info = result.get('repo_info') or {}
+        yield "# Repository Analysis Report\n\n"
+        yield f"**Repository:** {self._repo_name(result)}\n"
+        yield f"**Analysis Date:** {self._analysis_date(result)}\n"
+        yield f"**Description:** {repo_info.get('description') or 'No description available'}\n\n"
+
+        yield "## Repository Overview\n\n"
+        for label, value in self._overview(result).items():
+            yield f"- **{label}:** {value}\n"
+        yield "\n"
+
+        yield "## File Analysis\n\n"
+        coverage_line = self._coverage_line(result)
+        if coverage_line:
+            yield f"*{coverage_line}*\n\n"
+        for file_info in result.get('file_analysis', []):
+            yield f"### {file_info.get('path') or file_info['file']}\n"
+            yield f"{file_info['summary']}\n\n"
+
+        yield "## Recent Commits\n\n"
+        for commit in result.get('commits', []):
+            yield f"- **{commit['sha']}** - {commit['message']} by {commit['author']}\n"
+
+        yield "\n## Contributors\n\n"
+        for contributor in result.get('contributors', []):
+            yield f"- **{contributor['login']}** - {contributor['contributions']} contributions\n"
+
+        yield f"\n---\n*Report generated from the analysis of {self._analysis_date(result)}*\n"
+
+    def iter_text(self, result: Dict) -> Iterator[str]:
+        """Plain-text report, one section line at a time"""
+        repo_info = result.get('repo_info') or {}
+        yield "REPOSITORY ANALYSIS REPORT\n"
+        yield "=" * 50 + "\n\n"
+        yield f"Repository: {self._repo_name(result)}\n"
+        yield f"Analysis Date: {self._analysis_date(result)}\n"
+        yield f"Description: {repo_info.get('description') or 'No description available'}\n\n"
+
+        yield "REPOSITORY OVERVIEW\n"
+        yield "-" * 20 + "\n"
+        for label, value in self._overview(result).items():
+            yield f"{label}: {value}\n"
+        yield "\n"
+
+        yield "FILE ANALYSIS\n"
+        yield "-" * 15 + "\n"
+        coverage_line = self._coverage_line(result)
+        if coverage_line:
+            yield f"{coverage_line}\n"
+        for file_info in result.get('file_analysis', []):
+            yield f"\n{file_info.get('path') or file_info['file']}:\n"
+            yield f"  {file_info['summary']}\n"
+
+        yield "\n\nRECENT COMMITS\n"
+        yield "-" * 15 + "\n"
+        for commit in result.get('commits', []):
+            yield f"{commit['sha']} - {commit['message']} by {commit['author']}\n"
+
+        yield "\nCONTRIBUTORS\n"
+        yield "-" * 15 + "\n"
+        for contributor in result.get('contributors', []):
+            yield f"{contributor['login']} - {contributor['contributions']} contributions\n"
+
+        yield f"\n\nReport generated from the analysis of {self._analysis_date(result)}\n"
+
+    def iter_docx(self, result: Dict) -> Iterator[bytes]:
+        """Word document built in memory with python-docx, sent in chunks"""
+        try:
+            from docx import Document
+        except ImportError:
+            raise RuntimeError('DOCX export requires python-docx (pip install python-docx)')
+
+        repo_info = result.get('repo_info') or {}
+        document = Document()
+        document.add_heading('Repository Analysis Report', level=0)
+        for label, value in (('Repository', self._repo_name(result)),
+                             ('Analysis Date', self._analysis_date(result)),
+                             ('Description', repo_info.get('description') or 'No description available')):
+            paragraph = document.add_paragraph()
+            paragraph.add_run(f"{label}: ").bold = True
+            paragraph.add_run(str(value))
+
+        document.add_heading('Repository Overview', level=1)
+        overview = self._overview(result)
+        table = document.add_table(rows=len(overview), cols=2)
+        table.style = 'Light List'
+        for row, (label, value) in zip(table.rows, overview.items()):
+            row.cells[0].text = label
+            row.cells[1].text = str(value)
+
+        document.add_heading('File Analysis', level=1)
+        coverage_line = self._coverage_line(result)
+        if coverage_line:
+            document.add_paragraph().add_run(coverage_line).italic = True
+        for file_info in result.get('file_analysis', []):
+            document.add_heading(file_info.get('path') or file_info['file'], level=2)
+            document.add_paragraph(file_info['summary'])
+
+        document.add_heading('Recent Commits', level=1)
+        for commit in result.get('commits', []):
+            paragraph = document.add_paragraph(style='List Bullet')
+            paragraph.add_run(commit['sha']).bold = True
+            paragraph.add_run(f" - {commit['message']} by {commit['author']}")
+
+        document.add_heading('Contributors', level=1)
+        for contributor in result.get('contributors', []):
+            paragraph = document.add_paragraph(style='List Bullet')
+            paragraph.add_run(contributor['login']).bold = True
+            paragraph.add_run(f" - {contributor['contributions']} contributions")
+
+        buffer = io.BytesIO()
+        document.save(buffer)
+        data = buffer.getbuffer()
+        for start in range(0, len(data), DOCX_CHUNK_SIZE):
+            yield bytes(data[start:start + DOCX_CHUNK_SIZE])